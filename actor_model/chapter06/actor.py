@@ -4,15 +4,55 @@
 --------------------
 """
 
+import queue
+import sys
 import threading
 import uuid
 
 from .actor_ref import ActorRef
 from . import messages
 from .actor_register import ActorRegistry
+from .metrics import instrument
 
 __all__ = ["Actor"]
 
+# actor 自己处理的消息, 不会交给 on_receive / on_receive_batch.
+_INTERNAL_MESSAGES = (
+    messages._ActorStop,
+    messages.ProxyCall,
+    messages.ProxyGetAttr,
+    messages.ProxySetAttr,
+    messages.ProxyBatchCall,
+)
+
+
+def _get_batch(inbox, envelopes, limit):
+    """
+    不阻塞地从信箱再取最多 ``limit - len(envelopes)`` 封信件, 追加到 envelopes.
+    信箱有 ``get_batch`` 就用它; ``queue.Queue`` 只拿一次锁批量取出.
+    """
+    count = limit - len(envelopes)
+    if count <= 0:
+        return envelopes
+    get_batch = getattr(inbox, 'get_batch', None)
+    if get_batch is not None:
+        envelopes.extend(get_batch(count))
+    elif isinstance(inbox, queue.Queue):
+        with inbox.mutex:
+            items = inbox.queue
+            count = min(count, len(items))
+            for _ in range(count):
+                envelopes.append(items.popleft())
+            if count:
+                inbox.not_full.notify(count)
+    else:
+        for _ in range(count):
+            try:
+                envelopes.append(inbox.get_nowait())
+            except queue.Empty:
+                break
+    return envelopes
+
 
 class Actor:
     """
@@ -70,11 +110,33 @@ class Actor:
     #: continue processing messages. Use :meth:`stop` to change it.
     actor_stopped = None
 
+    #: 每次唤醒最多从信箱取出的信件数量. 1 表示一封一封处理;
+    #: 大于 1 时突发流量下一次拿多封信件, 少付几次锁和条件变量的开销.
+    inbox_batch_size = 1
+
+    #: 收集运行指标(处理耗时, 信箱深度, 排队时间 ...), 见 :mod:`metrics` 和 :meth:`ActorRef.metrics`.
+    collect_metrics = False
+
+    #: 每多少封信件采样一次处理耗时和排队时间, 1 表示每封都记.
+    metrics_sample_every = 16
+
+    #: :class:`metrics.ActorMetrics`, 没有打开 ``collect_metrics`` 是 None.
+    actor_metrics = None
+
+    #: 消息类型 -> 处理函数, 见 :meth:`_handle_receive`.
+    #: 每个 actor 类一份(第一个实例创建时建), 子类覆盖的 ``_receive_*`` 照样生效.
+    _receive_handlers = None
+
     def __init__(self, *args, **kwargs):
         # Notes: 统一资源名称 https://zh.wikipedia.org/wiki/%E7%BB%9F%E4%B8%80%E8%B5%84%E6%BA%90%E5%90%8D%E7%A7%B0
         self.actor_urn = uuid.uuid4().urn
         self.actor_inbox = self._create_actor_inbox()
         self.actor_stopped = threading.Event()
+        cls = type(self)
+        if '_receive_handlers' not in cls.__dict__:
+            cls._receive_handlers = {}
+        if self.collect_metrics:
+            instrument(self)
         # access the actor in a safe manner
         # 更安全的访问actor
         self.actor_ref = ActorRef(self)
@@ -108,34 +170,105 @@ class Actor:
         3. 获得消息 reply to future(对回复信箱的管理类)
         :return:
         """
+        self._handle_start()
+        # 线程等待阻塞等待
+        while not self.actor_stopped.is_set():
+            envelope = self.actor_inbox.get()
+            if self.inbox_batch_size > 1:
+                envelopes = _get_batch(
+                    self.actor_inbox, [envelope], self.inbox_batch_size
+                )
+                self._handle_envelopes(envelopes)
+            else:
+                self._handle_envelope(envelope)
+
+        self._handle_leftovers()
+
+    def _handle_start(self):
+        """
+        调用 on_start 事件, 在处理第一封信件之前.
+        拆出来给 PooledActor 等共享线程的 runtime 复用.
+        """
         try:
             self.on_start()
 
         except Exception:
             pass
-        # 线程等待阻塞等待
-        self.actor_stopped.is_set()
-        while not self.actor_stopped.is_set():
-            envelope = self.actor_inbox.get()
-            try:
-                response = self._handle_receive(envelope.message)
+
+    def _handle_envelope(self, envelope):
+        """
+        处理一封信件, 有回复地址(reply_to)就把结果放进 future.
+        """
+        try:
+            response = self._handle_receive(envelope.message)
+            if envelope.reply_to is not None:
+                # 把处理的message 聚类
+                # reply to future
+                envelope.reply_to.set(response)
+        except Exception:
+            if self.actor_metrics is not None:
+                self.actor_metrics.swallowed(sys.exc_info()[0])
+        except BaseException:
+            self._stop()
+            ActorRegistry.stop_all()
+
+    def _handle_envelopes(self, envelopes):
+        """
+        处理一批信件.
+        连续的普通消息(不是停止和代理消息)在子类实现了 on_receive_batch 时
+        一起交给 on_receive_batch, 其他的还是一封一封处理, 顺序不变.
+        """
+        batched = type(self).on_receive_batch is not Actor.on_receive_batch
+        run = []
+        for envelope in envelopes:
+            if self.actor_stopped.is_set():
+                # 批次里停止消息后面的信件不再处理.
+                self._handle_leftover(envelope)
+            elif batched and not isinstance(envelope.message, _INTERNAL_MESSAGES):
+                run.append(envelope)
+            else:
+                if run:
+                    self._handle_envelope_run(run)
+                    run = []
+                self._handle_envelope(envelope)
+        if run:
+            self._handle_envelope_run(run)
+
+    def _handle_envelope_run(self, envelopes):
+        try:
+            responses = self.on_receive_batch([e.message for e in envelopes])
+            if responses is None:
+                responses = [None] * len(envelopes)
+            elif len(responses) != len(envelopes):
+                # zip 会把多出来的 ask 扔掉, 它们就永远等不到回复了.
+                error = ValueError('on_receive_batch returned {} replies for {} messages'.format(
+                    len(responses), len(envelopes)))
+                for envelope in envelopes:
+                    if envelope.reply_to is not None:
+                        envelope.reply_to.set_exception((ValueError, error, None))
+                raise error
+            for envelope, response in zip(envelopes, responses):
                 if envelope.reply_to is not None:
-                    # 把处理的message 聚类
-                    # reply to future
                     envelope.reply_to.set(response)
-            except Exception:
-                pass
-            except BaseException:
-                self._stop()
-                ActorRegistry.stop_all()
+        except Exception:
+            if self.actor_metrics is not None:
+                self.actor_metrics.swallowed(sys.exc_info()[0])
+        except BaseException:
+            self._stop()
+            ActorRegistry.stop_all()
 
+    def _handle_leftovers(self):
+        """
+        actor 停止后信箱里剩下的信件.
+        """
         # 信箱非空情况 坏死的邮件处理.
         while not self.actor_inbox.empty():
-            envelope = self.actor_inbox.get()
-            if envelope.reply_to is not None:
-                if isinstance(envelope.message, messages._ActorStop):
-                    envelope.reply_to.set(None)
+            self._handle_leftover(self.actor_inbox.get())
 
+    def _handle_leftover(self, envelope):
+        if envelope.reply_to is not None:
+            if isinstance(envelope.message, messages._ActorStop):
+                envelope.reply_to.set(None)
 
     # on_ 一般表示事件, 当事件发生的时候来处理.
     def on_start(self):
@@ -148,27 +281,79 @@ class Actor:
     def on_receive(self, message):
         pass
 
+    def on_receive_batch(self, messages):
+        """
+        一次处理多条普通消息(例如批量写数据库), 需要 ``inbox_batch_size > 1``.
+        返回和 messages 一样长的回复列表, 或者 None.
+        不重写的话消息还是一条一条交给 on_receive.
+        """
+        return [self.on_receive(message) for message in messages]
+
     def _handle_receive(self, message):
         """Handles messages sent to the actor.
-        五种不同类型的消息
+        五种不同类型的消息, 按消息类型查 ``_receive_handlers`` 分派.
         """
         # todo removed in here.
         # message = messages._upgrade_internal_message(message)
-        if isinstance(message, messages._ActorStop):
-            return self._stop()
+        message_type = type(message)
+        try:
+            handler = self._receive_handlers[message_type]
+        except KeyError:
+            handler = self._find_receive_handler(message_type)
+        return handler(self, message)
+
+    @classmethod
+    def _find_receive_handler(cls, message_type):
+        """
+        第一次见到的消息类型(子类或者用户消息), 按 MRO 找到处理函数记下来.
+        用户的消息类型可能很多, 表满了以后只查不记.
+        """
+        name = '_receive_other'
+        for klass in message_type.__mro__:
+            if klass in _INTERNAL_HANDLERS:
+                name = _INTERNAL_HANDLERS[klass]
+                break
+        handler = getattr(cls, name)
+        handlers = cls.__dict__.get('_receive_handlers')
+        if handlers is not None and len(handlers) < _RECEIVE_HANDLERS_SIZE:
+            handlers[message_type] = handler
+        return handler
+
+    def _receive_stop(self, message):
+        return self._stop()
+
+    def _receive_proxy_call(self, message):
+        return self._call_attr_path(message.attr_path, message.args, message.kwargs)
+
+    def _receive_proxy_batch_call(self, message):
+        results = []
+        for attr_path, args, kwargs in message.calls:
+            try:
+                results.append(self._call_attr_path(attr_path, args, kwargs))
+            except Exception:
+                results.append(messages._BatchCallFailed(sys.exc_info()))
+        return results
 
-        if isinstance(message, messages.ProxyCall):
-            callee = self._get_attribute_from_path(message.attr_path)
-            return callee(*message.args, **message.kwargs)
+    def _call_attr_path(self, attr_path, args, kwargs):
+        """
+        每次都用 getattr 重新找: actor 可能换掉了方法(``self.method = ...``)
+        或者方法所在的对象, 通过 proxy 赋值以外的替换没有办法知道.
+
+        不缓存 attr_path -> 方法: 要安全就得每次看实例上有没有同名属性
+        (``self.__dict__``), CPython 3.11 上这比 getattr 本身还慢;
+        只缓存类上的函数(不检查)也不比 getattr 快. 见 benchmarks/dispatch_bench.py.
+        """
+        return self._get_attribute_from_path(attr_path)(*args, **kwargs)
+
+    def _receive_proxy_get_attr(self, message):
+        return self._get_attribute_from_path(message.attr_path)
 
-        if isinstance(message, messages.ProxyGetAttr):
-            attr = self._get_attribute_from_path(message.attr_path)
-            return attr
+    def _receive_proxy_set_attr(self, message):
+        parent_attr = self._get_attribute_from_path(message.attr_path[:-1])
+        attr_name = message.attr_path[-1]
+        return setattr(parent_attr, attr_name, message.value)
 
-        if isinstance(message, messages.ProxySetAttr):
-            parent_attr = self._get_attribute_from_path(message.attr_path[:-1])
-            attr_name = message.attr_path[-1]
-            return setattr(parent_attr, attr_name, message.value)
+    def _receive_other(self, message):
         return self.on_receive(message)
 
     def _get_attribute_from_path(self, attr_path):
@@ -211,3 +396,16 @@ class Actor:
         if hasattr(obj, "__dict__"):
             result.update(obj.__dict__)
         return result
+
+
+# 内部消息 -> 处理方法名, 子类消息(例如 ProxyCallEnvelope)按 MRO 找.
+_INTERNAL_HANDLERS = {
+    messages._ActorStop: '_receive_stop',
+    messages.ProxyCall: '_receive_proxy_call',
+    messages.ProxyGetAttr: '_receive_proxy_get_attr',
+    messages.ProxySetAttr: '_receive_proxy_set_attr',
+    messages.ProxyBatchCall: '_receive_proxy_batch_call',
+}
+
+# 每个类的 ``_receive_handlers`` 最多记多少种消息类型.
+_RECEIVE_HANDLERS_SIZE = 256
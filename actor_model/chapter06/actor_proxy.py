@@ -1,53 +1,156 @@
 """
+ActorProxy 自省 actor 的属性, 决定 ``proxy.foo`` 是方法调用(CallableProxy),
+可遍历的子对象(ActorProxy) 还是取值(future).
+
+自省是 lazy 的: 创建 proxy 不做任何事, 用到哪条 attr_path 才自省哪条, 结果缓存在
+proxy 上. 类属性的信息按 actor 类缓存, 同一个类的所有 proxy 共用;
+actor 实例上的属性(``self.foo = ...``)每次缓存不命中时重新检查.
+
+不存在的路径(``hasattr(proxy, 'x')``)也缓存, 放在有上限的 LRU 负缓存里.
+actor 实例上直接的属性不看负缓存, 后加的属性照样能找到; 更深的路径
+(可遍历对象上的属性)在 actor 里改了以后, 调用 ``proxy._invalidate_attrs(path)``.
+``proxy._introspection_stats`` 记录自省(缓存不命中)和负缓存命中的次数.
+
+Notes:
+    actor 类创建以后再修改类属性(例如 mock.patch), 要在第一次 ``proxy()`` 之前,
+    或者之后调用 ``ActorProxy._invalidate_class_attrs(actor_class)``.
 """
+import collections
+import functools
+import weakref
 from typing import Dict
 from collections.abc import Callable
 from . import messages
-from .exceptions import ActorDeadError
+from .exceptions import ActorDeadError, BatchAborted
+
+
+# actor 类 -> {属性名: 属性信息}, 见 ActorProxy._get_class_attrs.
+_class_attrs_cache = weakref.WeakKeyDictionary()
 
 
 class ActorProxy:
     actor_ref = None
 
+    #: 负缓存最多记住多少条不存在的 attr_path, 0 表示不缓存.
+    missing_attrs_cache_size = 256
+
     def __init__(self, actor_ref, attr_path=None):
         if not actor_ref.is_alive():
             raise ActorDeadError('{} not found'.format(actor_ref))
         self.actor_ref = actor_ref
         self._actor = actor_ref._actor
         self._attr_path = attr_path or tuple()  # tuple type
-        self._known_attrs = self._introspect_attributes()  # 自声3
+        # attr_path -> 属性信息, 用到哪条路径才自省哪条(lazy).
+        self._known_attrs = {}
+        self._missing_attrs = collections.OrderedDict()
+        self._introspection_stats = {'introspections': 0, 'missing_hits': 0}
         self._actor_proxies = {}
         self._callable_proxies = {}  # 可 调用
 
-    def _introspect_attributes(self):
-        """Introspects the actor's attributes."""
+    def _get_class_attrs(self):
+        """
+        actor 类(和父类)上可以暴露的属性: {属性名: 属性信息}.
+        同一个类的所有 proxy 共用一份, 只在第一次创建这个类的 proxy 时计算.
+        """
+        actor_class = self._actor.__class__
+        try:
+            return _class_attrs_cache[actor_class]
+        except KeyError:
+            pass
         result = {}
-        attr_paths_to_visit = [[attr_name] for attr_name in dir(self._actor)]
-
-        while attr_paths_to_visit:
-            # 1 私有属性排除
-            attr_path = attr_paths_to_visit.pop(0)
-            # todo attr_path  tuple
-            if not self._is_exposable_attribute(attr_path[-1]):
-                continue
-
-            # 如果是actor属性
-            attr = self._actor._introspect_attribute_from_path(attr_path)
-            if self._is_self_proxy(attr):
-                continue
-            # 属性考虑到callable 和可遍历.
-            traversable = self._is_traversable_attribute(attr)
-            result[tuple(attr_path)] = {
-                'callable': self._is_callable_attribute(attr),
-                'traversable': traversable,
-            }
-
-            if traversable:
-                for attr_name in dir(attr):
-                    attr_paths_to_visit.append(attr_path + [attr_name])
-
+        for cls in reversed(actor_class.__mro__):
+            for attr_name, attr in cls.__dict__.items():
+                if self._is_exposable_attribute(attr_name):
+                    result[attr_name] = self._get_attr_info_of(attr)
+        _class_attrs_cache[actor_class] = result
         return result
 
+    def _get_attr_info_of(self, attr):
+        # 属性考虑到callable 和可遍历.
+        return {
+            'callable': self._is_callable_attribute(attr),
+            'traversable': self._is_traversable_attribute(attr),
+        }
+
+    def _get_attr_info(self, attr_path):
+        """attr_path 的属性信息, 不存在(或者不能暴露)返回 None."""
+        try:
+            return self._known_attrs[attr_path]
+        except KeyError:
+            pass
+
+        missing_attrs = self._missing_attrs
+        if attr_path in missing_attrs and not self._is_instance_attr(attr_path):
+            missing_attrs.move_to_end(attr_path)
+            self._introspection_stats['missing_hits'] += 1
+            return None
+
+        self._introspection_stats['introspections'] += 1
+        attr_info = self._introspect_attribute(attr_path)
+        if attr_info is not None:
+            self._known_attrs[attr_path] = attr_info
+            missing_attrs.pop(attr_path, None)
+        elif self.missing_attrs_cache_size > 0:
+            missing_attrs[attr_path] = None
+            if len(missing_attrs) > self.missing_attrs_cache_size:
+                missing_attrs.popitem(last=False)
+        return attr_info
+
+    def _is_instance_attr(self, attr_path):
+        """actor 实例上直接的属性, 随时可能被加上, 不信负缓存."""
+        return (
+            len(attr_path) == 1
+            and attr_path[0] in getattr(self._actor, '__dict__', {})
+        )
+
+    def _introspect_attribute(self, attr_path):
+        """
+        只自省 attr_path 这一条路径.
+        actor 实例上的属性优先于类属性; 多层路径要求父路径是 traversable 的.
+        """
+        attr_name = attr_path[-1]
+        # 1 私有属性排除
+        if not self._is_exposable_attribute(attr_name):
+            return None
+
+        if len(attr_path) == 1:
+            instance_attrs = getattr(self._actor, '__dict__', {})
+            if attr_name not in instance_attrs:
+                return self._get_class_attrs().get(attr_name)
+            attr = instance_attrs[attr_name]
+        else:
+            parent_info = self._get_attr_info(attr_path[:-1])
+            if parent_info is None or not parent_info['traversable']:
+                return None
+            parent = self._actor._get_attribute_from_path(attr_path[:-1])
+            parent_attrs = self._actor._introspect_attributes(parent)
+            if attr_name not in parent_attrs:
+                return None
+            attr = parent_attrs[attr_name]
+
+        if self._is_self_proxy(attr):
+            return None
+        return self._get_attr_info_of(attr)
+
+    def _invalidate_attrs(self, attr_path=()):
+        """
+        丢掉 attr_path (和它下面的路径)的自省结果, 包括负缓存.
+        默认丢掉全部. 通过 proxy 赋值的时候自动调用.
+        """
+        depth = len(attr_path)
+        for cache in (self._known_attrs, self._missing_attrs):
+            for known_path in list(cache):
+                if known_path[:depth] == attr_path:
+                    del cache[known_path]
+
+    @classmethod
+    def _invalidate_class_attrs(cls, actor_class):
+        """
+        丢掉 actor_class 的类属性缓存, 之后创建的 proxy 重新自省.
+        已经存在的 proxy 还要调用 ``_invalidate_attrs()``.
+        """
+        _class_attrs_cache.pop(actor_class, None)
+
     def _is_exposable_attribute(self, attr_name):
         """
         Returns true for any attribute name that may be exposed through
@@ -73,6 +176,21 @@ class ActorProxy:
                 or getattr(attr, 'pykka_traversable', False) is True
         )
 
+    def batch(self):
+        """
+        把多个方法调用攒起来, 离开 with 的时候装在一封信件里发给 actor::
+
+            with proxy.batch() as batch:
+                futures = [batch.resolve(ip) for ip in ips]
+
+        每个调用还是有自己的 future, 但是只有一次 put 和一个回复 future.
+        with 里面抛了异常就不发送.
+
+        Notes:
+            actor 自己有叫 ``batch`` 的属性的话, 通过 proxy 访问不到它.
+        """
+        return ProxyBatch(self)
+
     def __eq__(self, other):
         if not isinstance(other, ActorProxy):
             return False
@@ -94,7 +212,12 @@ class ActorProxy:
         result = ['__class__']
         result += list(self.__class__.__dict__.keys())
         result += list(self.__dict__.keys())
-        result += [attr_path[0] for attr_path in list(self._known_attrs.keys())]
+        attr_names = set(self._get_class_attrs())
+        attr_names.update(
+            attr_name for attr_name in getattr(self._actor, '__dict__', {})
+            if self._get_attr_info((attr_name,)) is not None
+        )
+        result += attr_names
         return sorted(result)
 
     def __getattr__(self, name):
@@ -105,12 +228,10 @@ class ActorProxy:
 
         attr_path = self._attr_path + (name,)
 
-        if attr_path not in self._known_attrs:
-            self._known_attrs = self._introspect_attributes()
-
-        attr_info = self._known_attrs.get(attr_path)
+        attr_info = self._get_attr_info(attr_path)
         if attr_info is None:
             raise AttributeError('{} has no attribute {!r}'.format(self, name))
+        attr_path = messages._intern_attr_path(attr_path)
 
         if attr_info['callable']:
             if attr_path not in self._callable_proxies:
@@ -120,9 +241,11 @@ class ActorProxy:
             return self._callable_proxies[attr_path]
         elif attr_info['traversable']:
             if attr_path not in self._actor_proxies:
-                self._actor_proxies[attr_path] = ActorProxy(
-                    self.actor_ref, attr_path
-                )
+                actor_proxy = self.__class__(self.actor_ref, attr_path)
+                # 子 proxy 和自己共用已经自省过的路径.
+                actor_proxy._known_attrs = self._known_attrs
+                actor_proxy._missing_attrs = self._missing_attrs
+                self._actor_proxies[attr_path] = actor_proxy
             return self._actor_proxies[attr_path]
         else:
             message = messages.ProxyGetAttr(attr_path=attr_path)
@@ -139,7 +262,11 @@ class ActorProxy:
             return super(ActorProxy, self).__setattr__(name, value)
         attr_path = self._attr_path + (name,)
         message = messages.ProxySetAttr(attr_path=attr_path, value=value)
-        return self.actor_ref.ask(message)
+        result = self.actor_ref.ask(message)
+        self._invalidate_attrs(attr_path)
+        self._actor_proxies.pop(attr_path, None)
+        self._callable_proxies.pop(attr_path, None)
+        return result
 
 
 class CallableProxy:
@@ -156,16 +283,120 @@ class CallableProxy:
         self._attr_path = attr_path
 
     def __call__(self, *args, **kwargs):
-        message = messages.ProxyCall(
-            attr_path=self._attr_path, args=args, kwargs=kwargs
-        )
-        return self.actor_ref.ask(message, block=False)
+        return self.actor_ref._call(self._attr_path, args, kwargs)
 
     def defer(self, *args, **kwargs):
-        message = messages.ProxyCall(
-            attr_path=self._attr_path, args=args, kwargs=kwargs
+        return self.actor_ref._call(self._attr_path, args, kwargs, reply=False)
+
+    def map(self, *iterables):
+        """
+        iterables 里的每组参数(和内置的 map 一样 zip 起来)调用一次方法,
+        所有调用装在一封信件里发给 actor.
+        :return: 一个 future, 结果是列表; 有调用抛异常的话抛第一个异常
+        """
+        calls = [(self._attr_path, args, {}) for args in zip(*iterables)]
+        future = self.actor_ref.ask(messages.ProxyBatchCall(calls), block=False)
+        return future.map(_batch_results)
+
+
+def _raise_failed(result):
+    if isinstance(result, messages._BatchCallFailed):
+        raise result.exc_info[1].with_traceback(result.exc_info[2])
+    return result
+
+
+def _batch_results(results):
+    """ProxyBatchCall 的结果列表, 有失败的调用就抛它的异常."""
+    for result in results:
+        _raise_failed(result)
+    return results
+
+
+class ProxyBatch:
+    """
+    :meth:`ActorProxy.batch` 返回的对象, 用法和 proxy 一样,
+    只是方法调用先记下来, :meth:`send` (离开 with)的时候一起发送.
+    只能调用方法, 不能取值和赋值.
+
+    with 里面抛了异常的话不发送, 已经返回的 future 抛 :class:`exceptions.BatchAborted`.
+    """
+
+    def __init__(self, proxy):
+        self._proxy = proxy
+        self._calls = []
+        self._futures = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._proxy, name)
+        if isinstance(attr, CallableProxy):
+            return functools.partial(self._add, attr._attr_path)
+        if isinstance(attr, ActorProxy):
+            # 可遍历的属性, 和自己共用一个调用列表.
+            batch = ProxyBatch(attr)
+            batch._calls = self._calls
+            batch._futures = self._futures
+            return batch
+        raise AttributeError(
+            '{} is not a method, only method calls can be batched'.format(name)
         )
-        return self.actor_ref.tell(message)
+
+    def _add(self, attr_path, *args, **kwargs):
+        future = self._proxy.actor_ref.actor_class._create_future()
+        self._calls.append((attr_path, args, kwargs))
+        self._futures.append(future)
+        return future
+
+    def send(self):
+        """
+        把攒下来的调用发给 actor, 可以多次调用.
+        :raises ActorDeadError: actor 已经停止, 这批调用的 future 抛同样的异常
+        """
+        if not self._calls:
+            return
+        calls, futures = list(self._calls), list(self._futures)
+        del self._calls[:], self._futures[:]
+
+        def on_done(source):
+            try:
+                results = source.get(timeout=0)
+            except Exception:
+                for future in futures:
+                    future.set_exception()
+                return
+            for future, result in zip(futures, results):
+                if isinstance(result, messages._BatchCallFailed):
+                    future.set_exception(result.exc_info)
+                else:
+                    future.set(result)
+
+        message = messages.ProxyBatchCall(calls)
+        actor_ref = self._proxy.actor_ref
+        try:
+            if not actor_ref.is_alive():
+                raise ActorDeadError('{} not found'.format(actor_ref))
+            future = actor_ref.ask(message, block=False)
+        except Exception:
+            # 没发出去(actor 停止了, 信箱满了 ...): 已经返回的 future 不会一直等下去.
+            for future in futures:
+                future.set_exception()
+            raise
+        future.add_done_callback(on_done)
+
+    def __enter__(self):
+        return self
+
+    def abort(self, reason='batch was not sent'):
+        """丢掉攒下来的调用, 它们的 future 抛 BatchAborted."""
+        futures = list(self._futures)
+        del self._calls[:], self._futures[:]
+        for future in futures:
+            future.set_exception((BatchAborted, BatchAborted(reason), None))
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.send()
+        else:
+            self.abort('batch was aborted by {}'.format(exc_type.__name__))
 
 
 def traversable(obj):
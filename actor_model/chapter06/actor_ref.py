@@ -6,7 +6,7 @@ Proxy pattern: 代理可以为这个实体提供一个替代者，来控制它
 from pykka import ActorDeadError
 
 from .actor_proxy import ActorProxy
-from .envelope import Envelope
+from .envelope import Envelope, ProxyCallEnvelope
 from .messages import _ActorStop
 
 
@@ -28,12 +28,16 @@ class ActorRef:
     #: See :attr:`Actor.actor_stopped`.
     actor_stopped = None
 
+    # See :attr:`Actor.actor_metrics`.
+    _metrics = None
+
     def __init__(self, actor):
         self._actor = actor
         self.actor_class = actor.__class__
         self.actor_urn = actor.actor_urn
         self.actor_inbox = actor.actor_inbox
         self.actor_stopped = actor.actor_stopped
+        self._metrics = actor.actor_metrics
 
     def __repr__(self):
         return f"<ActorRef for {self}>"
@@ -50,25 +54,33 @@ class ActorRef:
         return not self.actor_stopped.is_set()
 
     # put letter into envelop
-    def tell(self, message):
+    def tell(self, message, priority=0):
         """
          Send message to actor without waiting for any response.
          投递后 不需要等待是否有回复.
         :param message:
+        :param priority: 数字越小越先处理, 信箱是 :class:`inbox.PriorityInbox` 时生效
         :return:
+        :raises MailboxFull: 有容量限制的信箱满了(``raise`` 策略, 或 ``block`` 策略等待超时)
         """
         if not self.is_alive():
             raise ActorDeadError(f"{self} not found")
-        self.actor_inbox.put(Envelope(message))
+        envelope = Envelope(message, priority=priority)
+        metrics = self._metrics
+        if metrics is not None and metrics.sample_next:
+            metrics.enqueued(envelope)
+        self.actor_inbox.put(envelope)
 
-    def ask(self, message, block=True, timeout=None):
+    def ask(self, message, block=True, timeout=None, priority=0):
         """
          Send message to actor and wait for the reply.
          一直等待消息回复.(显示符合future 特性 in the future. 异步)
         :param message:
         :param block:
         :param timeout:
+        :param priority: 同 :meth:`tell`
         :return: it will immediately return a Future
+        :raises MailboxFull: 同 :meth:`tell`; 被 ``drop_*`` 策略丢掉的信件, future 会抛 MailboxFull
         """
 
         future = self.actor_class._create_future()
@@ -80,13 +92,42 @@ class ActorRef:
             pass
         else:
             # todo reply_to  future.
-            self.actor_inbox.put(Envelope(message, reply_to=future))
+            envelope = Envelope(message, reply_to=future, priority=priority)
+            metrics = self._metrics
+            if metrics is not None and metrics.sample_next:
+                metrics.enqueued(envelope)
+            self.actor_inbox.put(envelope)
 
         if block:
             return future.get(timeout=timeout)
         else:
             return future
 
+    def _call(self, attr_path, args, kwargs, reply=True):
+        """
+        :class:`CallableProxy` 用的 ask(block=False)/tell:
+        信封和 ProxyCall 合成一个 :class:`ProxyCallEnvelope`.
+        :param reply: False 时不要回复, 和 tell 一样返回 None
+        """
+        if not reply:
+            if not self.is_alive():
+                raise ActorDeadError(f"{self} not found")
+            envelope = ProxyCallEnvelope(attr_path, args, kwargs)
+            metrics = self._metrics
+            if metrics is not None and metrics.sample_next:
+                metrics.enqueued(envelope)
+            self.actor_inbox.put(envelope)
+            return None
+
+        future = self.actor_class._create_future()
+        if self.is_alive():
+            envelope = ProxyCallEnvelope(attr_path, args, kwargs, reply_to=future)
+            metrics = self._metrics
+            if metrics is not None and metrics.sample_next:
+                metrics.enqueued(envelope)
+            self.actor_inbox.put(envelope)
+        return future
+
     def __enter__(self):
         """
         nothing.
@@ -129,6 +170,25 @@ class ActorRef:
         else:
             return converted_future
 
+    def metrics(self):
+        """
+        actor 的运行指标(dict, 见 :meth:`metrics.ActorMetrics.snapshot`).
+        actor 类没有打开 ``collect_metrics`` 返回 None.
+        """
+        if self._metrics is None:
+            return None
+        return self._metrics.snapshot()
+
+    def inbox_stats(self):
+        """
+        信箱的统计(dict 的副本), 例如 :class:`inbox.BoundedInbox` 每种溢出策略触发的次数.
+        信箱没有统计(没有容量限制)返回 None.
+        """
+        stats = getattr(self.actor_inbox, 'stats', None)
+        if stats is None:
+            return None
+        return dict(stats)
+
     def proxy(self):
         """
         Wraps the :class:`ActorRef` in an :class:`ActorProxy
@@ -1,16 +1,26 @@
 """
 这个模块比较牵涉注册和广播.
 注册Register alive的actor
-把所有的running actor 放到一个列表里
+把所有的running actor 放到一个字典里
 
 notes:
 -----
-register list
-register and unregister 常使用list or dict 来保持注册的对象, 这里使用list.
-以后根据场景选择适合业务的
+register dict
+register and unregister 常使用list or dict 来保持注册的对象.
+最早用的是list, 查找(get_by_urn)和删除(unregister)都是 O(n),
+几万个actor频繁启动/停止的时候, 注册表就成了锁竞争的热点.
+现在用dict, 再加上几个二级索引, 注册和注销的时候增量维护:
+
+    _actor_refs     ref -> None            (有序集合, 保持注册顺序)
+    _by_urn         urn -> ref
+    _by_class       class -> {ref: None}   (actor类和它MRO上所有的父类)
+    _by_class_name  类名 -> {ref: None}     (只有actor类本身的名字)
 """
 
 import threading
+from collections import defaultdict
+
+from .metrics import aggregate
 
 __all__ = ['ActorRegistry']
 
@@ -22,7 +32,10 @@ class ActorRegistry:
     # protected attribute
     # _member is protected
     # __member is private
-    _actor_refs = []  # register  list, by the way , you can use dict instead.
+    _actor_refs = {}  # register dict, 当作有序集合用.
+    _by_urn = {}
+    _by_class = defaultdict(dict)
+    _by_class_name = defaultdict(dict)
     _actor_refs_lock = threading.RLock()
 
     @classmethod
@@ -42,6 +55,22 @@ class ActorRegistry:
         for ref in targets:
             ref.tell(message)
 
+    @classmethod
+    def metrics(cls, target_class=None):
+        """
+        正在运行的 actor 的运行指标加在一起, target_class 和 :meth:`broadcast` 一样
+        (类或者类名). 只算打开了 ``collect_metrics`` 的 actor, ``actors`` 是它们的数量.
+        :returns: dict, 见 :func:`metrics.aggregate`
+        """
+        if isinstance(target_class, str):
+            refs = cls.get_by_class_name(target_class)
+        elif target_class is not None:
+            refs = cls.get_by_class(target_class)
+        else:
+            refs = cls.get_all()
+        metrics = [getattr(ref, '_metrics', None) for ref in refs]
+        return aggregate([item for item in metrics if item is not None])
+
     @classmethod
     def get_by_class_name(cls, actor_class_name):
         """
@@ -50,24 +79,19 @@ class ActorRegistry:
         :returns: list of :class:`pykka.ActorRef`
         """
         with cls._actor_refs_lock:
-            return [
-                ref for ref in cls._actor_refs
-                if ref.actor_class.__name__ == actor_class_name
-            ]
+            return list(cls._by_class_name.get(actor_class_name, ()))
 
     @classmethod
     def get_by_class(cls, actor_class):
         """
+        actor_class 和它的子类的所有actor.
+        索引按 MRO 建立, 用 ``ABCMeta.register`` 注册的虚拟子类查不到.
         :param actor_class:
         :return:
         :type list
         """
         with cls._actor_refs_lock:
-            return [
-                ref for ref in cls._actor_refs
-                if issubclass(ref.actor_class, actor_class)
-            ]
-
+            return list(cls._by_class.get(actor_class, ()))
 
     @classmethod
     def get_by_urn(cls, actor_urn):
@@ -76,25 +100,28 @@ class ActorRegistry:
         :param actor_urn: actor URN
         :type actor_urn: string
         :returns: :class:`pykka.ActorRef` or :class:`None` if not found
-        :type list
         test test_register_get_by_filter
         """
-        with cls._actor_refs_lock:
-            refs = [
-                ref for ref in cls._actor_refs if ref.actor_urn == actor_urn
-            ]
-            if refs:
-                return refs[0]
+        # dict.get 本身是原子的, 不需要拿锁.
+        return cls._by_urn.get(actor_urn)
 
     @classmethod
     def get_all(cls):
         with cls._actor_refs_lock:
-            return cls._actor_refs[:]
+            return list(cls._actor_refs)
 
     @classmethod
     def register(cls, actor_ref):
         with cls._actor_refs_lock:
-            cls._actor_refs.append(actor_ref)
+            cls._actor_refs[actor_ref] = None
+            actor_urn = getattr(actor_ref, 'actor_urn', None)
+            if actor_urn is not None:
+                cls._by_urn[actor_urn] = actor_ref
+            actor_class = getattr(actor_ref, 'actor_class', None)
+            if actor_class is not None:
+                cls._by_class_name[actor_class.__name__][actor_ref] = None
+                for klass in actor_class.__mro__:
+                    cls._by_class[klass][actor_ref] = None
 
     @classmethod
     def unregister(cls, actor_ref):
@@ -105,8 +132,27 @@ class ActorRegistry:
         :type actor_ref: :class:`pykka.ActorRef`
         """
         with cls._actor_refs_lock:
-            if actor_ref in cls._actor_refs:
-                cls._actor_refs.remove(actor_ref)
+            if actor_ref not in cls._actor_refs:
+                return
+            del cls._actor_refs[actor_ref]
+            actor_urn = getattr(actor_ref, 'actor_urn', None)
+            if cls._by_urn.get(actor_urn) is actor_ref:
+                del cls._by_urn[actor_urn]
+            actor_class = getattr(actor_ref, 'actor_class', None)
+            if actor_class is not None:
+                cls._discard(cls._by_class_name, actor_class.__name__, actor_ref)
+                for klass in actor_class.__mro__:
+                    cls._discard(cls._by_class, klass, actor_ref)
+
+    @staticmethod
+    def _discard(index, key, actor_ref):
+        """从二级索引里删除, 空的桶一起删掉(临时创建的actor类不会泄漏)."""
+        refs = index.get(key)
+        if refs is None:
+            return
+        refs.pop(actor_ref, None)
+        if not refs:
+            del index[key]
 
     @classmethod
     def stop_all(cls, block=True, timeout=True):
@@ -0,0 +1,315 @@
+"""
+asyncio runtime: actor 跑在 event loop 上, 不再每个 actor 一个线程.
+
+future --- > actor
+|               |
+|               |
+AsyncioFuture -->AsyncioActor
+
+- 信箱是 ``asyncio.Queue``, actor loop 是一个 task, 成千上万个 actor 共享一个 loop.
+- future 是 ``loop.create_future()``, 在 loop 里直接 ``await``, 不阻塞 loop.
+- handler 可以是 ``async def``, 返回的协程会在 actor 的 task 里被 await.
+- ``on_start`` / ``on_stop`` 也可以是 ``async def``. actor 的 task 被取消时只停这个 actor.
+
+在 event loop 里 ``start()`` 的 actor 跑在当前 loop 上; 其他线程里
+``start()`` 的 actor 跑在一个共享的后台 loop 线程上, 同步代码照样用
+``future.get()`` 等结果.
+
+Notes:
+    在 loop 线程里不能 ``future.get()`` 阻塞等待还没完成的 future, 用 ``await``.
+"""
+import asyncio
+import inspect
+import queue
+import sys
+import threading
+import time
+
+from .actor import Actor
+from .actor_register import ActorRegistry
+from .exceptions import ActorDeadError, Timeout
+from .future import Future
+
+__all__ = ['AsyncioActor', 'AsyncioFuture']
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+
+def _get_running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _get_loop():
+    """当前线程正在跑的 loop, 没有就用共享的后台 loop."""
+    loop = _get_running_loop()
+    if loop is not None:
+        return loop
+
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=_background_loop.run_forever, name='AsyncioActorLoop'
+            )
+            thread.daemon = True
+            thread.start()
+        return _background_loop
+
+
+def _call_in_loop(loop, func, *args):
+    """在 loop 线程里直接调用, 其他线程通过 call_soon_threadsafe 投递."""
+    if _get_running_loop() is loop:
+        func(*args)
+    else:
+        loop.call_soon_threadsafe(func, *args)
+
+
+class _DoneCallback:
+    """
+    asyncio future 的回调: 调用 ``func(AsyncioFuture)``.
+    按 func 比较, ``remove_done_callback(func)`` 能找到 add 时包的那一个.
+    """
+
+    __slots__ = ['future', 'func']
+
+    def __init__(self, future, func):
+        self.future = future
+        self.func = func
+
+    def __call__(self, _):
+        self.func(self.future)
+
+    def __eq__(self, other):
+        if not isinstance(other, _DoneCallback):
+            return NotImplemented
+        return self.func == other.func
+
+    def __hash__(self):
+        return hash(self.func)
+
+
+class AsyncioFuture(Future):
+    """
+    基于 ``loop.create_future()`` 的 future.
+    """
+
+    def __init__(self, loop=None):
+        super(AsyncioFuture, self).__init__()
+        self._loop = loop or _get_loop()
+        self._future = self._loop.create_future()
+        # 不释放的锁: 第一个 acquire 成功的 set 才算数, 多个线程同时 set 也只有一个成功.
+        self._set_lock = threading.Lock()
+
+    def get(self, timeout=None):
+        try:
+            return super(AsyncioFuture, self).get(timeout=timeout)
+        except NotImplementedError:
+            pass
+
+        if not self._future.done():
+            if _get_running_loop() is self._loop:
+                raise RuntimeError(
+                    'AsyncioFuture.get() would block the event loop, use await'
+                )
+            done = threading.Event()
+            self._loop.call_soon_threadsafe(
+                self._future.add_done_callback, lambda _: done.set()
+            )
+            if not done.wait(timeout):
+                raise Timeout('{} seconds'.format(timeout))
+        return self._future.result()
+
+    def set(self, value=None):
+        self._mark_set()
+        _call_in_loop(self._loop, self._future.set_result, value)
+
+    def set_exception(self, exc_info=None):
+        assert exc_info is None or len(exc_info) == 3
+        exc_info = exc_info or sys.exc_info()
+        self._mark_set()
+        _call_in_loop(self._loop, self._future.set_exception, exc_info[1])
+
+    def _is_done(self):
+        return self._future.done()
+
+    def add_done_callback(self, func):
+        # 回调在 loop 线程里调用, 这时 asyncio future 一定已经完成.
+        _call_in_loop(
+            self._loop, self._future.add_done_callback, _DoneCallback(self, func)
+        )
+
+    def remove_done_callback(self, func):
+        _call_in_loop(
+            self._loop, self._future.remove_done_callback, _DoneCallback(self, func)
+        )
+
+    def _mark_set(self):
+        # 和 ThreadingFuture 一样, 只能 set 一次.
+        if not self._set_lock.acquire(False):
+            raise queue.Full
+
+    def __await__(self):
+        if self._get_hook is not None:
+            # get_hook 是同步函数, 放到线程池里执行.
+            loop = asyncio.get_running_loop()
+            return (yield from loop.run_in_executor(None, self.get).__await__())
+        if _get_running_loop() is self._loop:
+            return (yield from self._future.__await__())
+        # 不同 loop 的 future 不能直接 await, 转一下.
+        return (yield from asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(_wait(self._future), self._loop)
+        ).__await__())
+
+    __iter__ = __await__
+
+
+async def _wait(future):
+    return await future
+
+
+async def _on_stop(coroutine):
+    # 和同步的 on_stop 一样, 异常不往外抛.
+    try:
+        await coroutine
+    except Exception:
+        pass
+
+
+class AsyncioInbox:
+    """
+    ``asyncio.Queue`` 信箱, 任何线程都可以 put, actor 的 task 里 ``await get_async()``.
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop or _get_loop()
+        self._queue = asyncio.Queue()
+
+    def put(self, item, block=True, timeout=None):
+        _call_in_loop(self.loop, self._queue.put_nowait, item)
+
+    async def get_async(self):
+        return await self._queue.get()
+
+    def get(self, block=True, timeout=None):
+        # actor loop 之外(例如停止后清理信箱)只做非阻塞获取.
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            raise queue.Empty
+
+    get_nowait = get
+
+    def empty(self):
+        return self._queue.empty()
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+class AsyncioActor(Actor):
+    """
+    跑在 asyncio event loop 上的 actor.
+
+    Example::
+
+        class Fetcher(AsyncioActor):
+            async def fetch(self, url):
+                ...
+
+        async def main():
+            proxy = Fetcher.start().proxy()
+            body = await proxy.fetch("https://example.com")
+    """
+
+    def _create_actor_inbox(self):
+        return AsyncioInbox()
+
+    @staticmethod
+    def _create_future():
+        return AsyncioFuture()
+
+    def _stop(self):
+        """
+        和 ``Actor._stop`` 一样; ``async def on_stop`` 返回的协程包一层返回,
+        actor loop 会 await 它(停止消息等它跑完才回复).
+        """
+        ActorRegistry.unregister(self.actor_ref)
+        self.actor_stopped.set()
+        try:
+            result = self.on_stop()
+        except Exception:
+            return None
+        if inspect.iscoroutine(result):
+            return _on_stop(result)
+        return None
+
+    def _start_actor_loop(self):
+        loop = self.actor_inbox.loop
+        if _get_running_loop() is loop:
+            self._task = loop.create_task(self._async_actor_loop())
+        else:
+            self._task = asyncio.run_coroutine_threadsafe(
+                self._async_actor_loop(), loop
+            )
+
+    async def _async_actor_loop(self):
+        """
+        和 ``Actor._actor_loop`` 一样, 只是等信件的时候让出 event loop.
+        """
+        try:
+            result = self.on_start()
+            if inspect.iscoroutine(result):
+                await result
+        except Exception:
+            pass
+
+        metrics = self.actor_metrics
+        start = None
+        try:
+            while not self.actor_stopped.is_set():
+                envelope = await self.actor_inbox.get_async()
+                if metrics is not None:
+                    enqueued_at = metrics.dequeued(envelope)
+                    if enqueued_at is not None:
+                        # 协程的处理耗时包括 await 的时间.
+                        start = time.perf_counter()
+                try:
+                    response = self._handle_receive(envelope.message)
+                    # 只 await 协程, 返回的 future 原样交给调用方(嵌套 future).
+                    if inspect.iscoroutine(response):
+                        response = await response
+                    if envelope.reply_to is not None:
+                        envelope.reply_to.set(response)
+                except Exception:
+                    if metrics is not None:
+                        metrics.swallowed(sys.exc_info()[0])
+                except asyncio.CancelledError:
+                    if envelope.reply_to is not None and not envelope.reply_to._is_done():
+                        envelope.reply_to.set_exception(
+                            (ActorDeadError, ActorDeadError('{} was cancelled'.format(self)), None)
+                        )
+                    raise
+                except BaseException:
+                    await self._await_stop()
+                    # 在 loop 里阻塞等待别的 actor 停止会卡住 loop.
+                    ActorRegistry.stop_all(block=False)
+                if start is not None:
+                    metrics.handled(envelope, enqueued_at, start, time.perf_counter())
+                    start = None
+        except asyncio.CancelledError:
+            # task 被取消(例如关闭 loop 之前 cancel 所有 task): 只停这个 actor.
+            if not self.actor_stopped.is_set():
+                await self._await_stop()
+            raise
+        finally:
+            self._handle_leftovers()
+
+    async def _await_stop(self):
+        on_stop = self._stop()
+        if on_stop is not None:
+            await on_stop
@@ -0,0 +1 @@
+from actor_model.chapter06 import *
\ No newline at end of file
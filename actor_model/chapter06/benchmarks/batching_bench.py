@@ -0,0 +1,68 @@
+"""
+benchmark: tell() 洪水下不同 inbox_batch_size 的吞吐量.
+
+每个场景一个 actor, 主线程连续 tell N 条消息, 最后 ask 一次等全部处理完.
+    - on_receive: 只是批量取信件, 还是一条条交给 on_receive
+    - on_receive_batch: 整批消息交给 on_receive_batch
+
+python -m actor_model.chapter06.benchmarks.batching_bench
+python -m actor_model.chapter06.benchmarks.batching_bench --messages 500000
+"""
+import argparse
+import time
+
+from actor_model.chapter06.threading import ThreadingActor
+
+Done = object()
+
+
+class Counter(ThreadingActor):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def on_receive(self, message):
+        if message is Done:
+            return self.count
+        self.count += 1
+
+
+class BatchCounter(Counter):
+    def on_receive_batch(self, messages):
+        responses = [None] * len(messages)
+        for i, message in enumerate(messages):
+            if message is Done:
+                responses[i] = self.count
+            else:
+                self.count += 1
+        return responses
+
+
+def run(actor_class, batch_size, messages):
+    actor_class = type(actor_class.__name__, (actor_class,), {'inbox_batch_size': batch_size})
+    actor_ref = actor_class.start()
+    t0 = time.perf_counter()
+    for i in range(messages):
+        actor_ref.tell(i)
+    count = actor_ref.ask(Done)
+    elapsed = time.perf_counter() - t0
+    actor_ref.stop()
+    assert count == messages
+    return messages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 16, 256])
+    args = parser.parse_args()
+
+    print(f"{'handler':<18}{'batch':>8}{'msg/s':>12}")
+    for name, actor_class in [('on_receive', Counter), ('on_receive_batch', BatchCounter)]:
+        for batch_size in args.batch_sizes:
+            throughput = run(actor_class, batch_size, args.messages)
+            print(f"{name:<18}{batch_size:>8}{throughput:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+benchmark: 典型的代理消息用 pickle 和 :data:`codec.default_codec` 编码/解码的速度和字节数.
+
+    - bytes: 编码后的长度, 也就是线上(管道, TCP)传的字节数
+    - encode/s, decode/s: 每秒编码/解码的消息数
+    - frame: 进程/网络 runtime 真正发送的 ``(urn, reply_id, message)`` tuple
+
+codec 的字节数大约是 pickle 的 1/3 到 1/2, 但每个对象都要调一次 Python 的
+``persistent_id``, 编码/解码的速度比纯 C 的 pickle 慢.
+
+python -m actor_model.chapter06.benchmarks.codec_bench --rounds 100000
+"""
+import argparse
+import pickle
+import time
+
+from actor_model.chapter06.codec import default_codec
+from actor_model.chapter06.messages import ProxyBatchCall, ProxyCall, ProxyGetAttr, ProxySetAttr
+
+URN = 'urn:uuid:6c9c5b5e-0d4f-4a44-9a3b-3e9e0c1b7f41'
+
+MESSAGES = [
+    ('call no args', ProxyCall(('ping',), (), {})),
+    ('call ip', ProxyCall(('resolve',), ('8.8.8.8',), {})),
+    ('call kwargs', ProxyCall(('resolve',), ('8.8.8.8',), {'timeout': 1.5, 'retry': 3})),
+    ('nested get', ProxyGetAttr(('cache', 'stats', 'hits'))),
+    ('set attr', ProxySetAttr(('greeting',), 'hi')),
+    ('batch x4', ProxyBatchCall([(('add',), (i,), {}) for i in range(4)])),
+    ('frame', (URN, 42, ProxyCall(('resolve',), ('8.8.8.8',), {}))),
+]
+
+
+def rate(func, arg, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        func(arg)
+    return rounds / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=100000)
+    args = parser.parse_args()
+
+    def pickle_dumps(obj):
+        return pickle.dumps(obj, protocol=5)
+
+    print(f"{'message':<14} {'codec':<7} {'bytes':>6} {'encode/s':>10} {'decode/s':>10}")
+    for name, message in MESSAGES:
+        for codec_name, dumps, loads in [
+            ('pickle', pickle_dumps, pickle.loads),
+            ('codec', default_codec.dumps, default_codec.loads),
+        ]:
+            data = dumps(message)
+            encode = rate(dumps, message, args.rounds)
+            decode = rate(loads, data, args.rounds)
+            print(f"{name:<14} {codec_name:<7} {len(data):>6} {encode:>10.0f} {decode:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
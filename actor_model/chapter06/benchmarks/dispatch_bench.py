@@ -0,0 +1,92 @@
+"""
+benchmark: 代理方法调用的 actor 端分派.
+
+对照组 LadderActor 是原来的 ``_handle_receive``: 一串 isinstance 判断.
+两边的 ProxyCall 都用 getattr 沿着 attr_path 一层层找方法(actor 可能换掉方法, 不缓存,
+原因见 ``Actor._call_attr_path``).
+    - calls/s: 直接在当前线程调用 ``_handle_receive``, 只算 actor 端的开销
+    - proxy calls/s: 经过 proxy 和信箱, ``defer()`` N 次再等处理完
+
+python -m actor_model.chapter06.benchmarks.dispatch_bench
+"""
+import argparse
+import time
+
+from actor_model.chapter06 import messages
+from actor_model.chapter06.actor_proxy import traversable
+from actor_model.chapter06.threading import ThreadingActor
+
+
+class Nested:
+    def ping(self, value):
+        return value
+
+
+class Target(ThreadingActor):
+    def __init__(self):
+        super().__init__()
+        self.nested = traversable(Nested())
+
+    def ping(self, value):
+        return value
+
+
+class LadderActor(Target):
+    """原来的 _handle_receive."""
+
+    def _handle_receive(self, message):
+        if isinstance(message, messages._ActorStop):
+            return self._stop()
+        if isinstance(message, messages.ProxyCall):
+            callee = self._get_attribute_from_path(message.attr_path)
+            return callee(*message.args, **message.kwargs)
+        if isinstance(message, messages.ProxyGetAttr):
+            return self._get_attribute_from_path(message.attr_path)
+        if isinstance(message, messages.ProxySetAttr):
+            parent_attr = self._get_attribute_from_path(message.attr_path[:-1])
+            return setattr(parent_attr, message.attr_path[-1], message.value)
+        return self.on_receive(message)
+
+
+def calls_per_second(actor_class, attr_path, count):
+    actor = actor_class()
+    message = messages.ProxyCall(attr_path=attr_path, args=(1,), kwargs={})
+    handle_receive = actor._handle_receive
+    t0 = time.perf_counter()
+    for _ in range(count):
+        handle_receive(message)
+    return count / (time.perf_counter() - t0)
+
+
+def proxy_calls_per_second(actor_class, count):
+    proxy = actor_class.start().proxy()
+    ping = proxy.nested.ping
+    t0 = time.perf_counter()
+    for _ in range(count):
+        ping.defer(1)
+    ping(1).get()
+    elapsed = time.perf_counter() - t0
+    proxy.actor_ref.stop()
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"{'actor':<16}{'path':<16}{'calls/s':>12}")
+    for name, actor_class in [('LadderActor', LadderActor), ('Actor', Target)]:
+        for attr_path in [('ping',), ('nested', 'ping')]:
+            print(
+                f"{name:<16}{'.'.join(attr_path):<16}"
+                f"{calls_per_second(actor_class, attr_path, args.count):>12.0f}"
+            )
+    print()
+    print(f"{'actor':<16}{'proxy calls/s':>16}")
+    for name, actor_class in [('LadderActor', LadderActor), ('Actor', Target)]:
+        print(f"{name:<16}{proxy_calls_per_second(actor_class, args.count // 4):>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
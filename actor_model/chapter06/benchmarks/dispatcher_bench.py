@@ -0,0 +1,112 @@
+"""
+benchmark: 一个 actor 一个线程(ThreadingActor) vs 共享线程池(PooledActor).
+
+每个场景在单独的子进程里跑, 互相不影响内存统计:
+    - rss: 启动 N 个 actor 之后进程常驻内存(VmRSS)的增长
+    - start: 启动 N 个 actor 的时间
+    - throughput: 每个 actor tell 若干条消息, 再 ask 一次等处理完, 每秒消息数
+
+python -m actor_model.chapter06.benchmarks.dispatcher_bench
+python -m actor_model.chapter06.benchmarks.dispatcher_bench --counts 1000 10000 --messages 5
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+from actor_model.chapter06.dispatcher import Dispatcher, PooledActor
+from actor_model.chapter06.threading import ThreadingActor
+
+
+class Counter:
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def on_receive(self, message):
+        if message == "get":
+            return self.count
+        self.count += 1
+
+
+class ThreadCounter(Counter, ThreadingActor):
+    # 子进程直接 os._exit, 不需要等线程.
+    use_daemon_thread = True
+
+
+class PooledCounter(Counter, PooledActor):
+    pass
+
+
+MODELS = {
+    "thread-per-actor": ThreadCounter,
+    "pooled": PooledCounter,
+}
+
+
+def rss_kb():
+    with open(f"/proc/{os.getpid()}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _run_case(actor_class, count, messages, conn):
+    try:
+        before = rss_kb()
+        t0 = time.perf_counter()
+        refs = [actor_class.start() for _ in range(count)]
+        started = time.perf_counter() - t0
+        rss = rss_kb() - before
+
+        t0 = time.perf_counter()
+        for _ in range(messages):
+            for ref in refs:
+                ref.tell("inc")
+        futures = [ref.ask("get", block=False) for ref in refs]
+        for future in futures:
+            future.get()
+        elapsed = time.perf_counter() - t0
+        conn.send((rss, started, count * messages / elapsed, None))
+    except Exception as exc:  # 例如 can't start new thread
+        conn.send((None, None, None, repr(exc)))
+    finally:
+        conn.close()
+        os._exit(0)
+
+
+def run_case(model, count, messages):
+    parent, child = multiprocessing.Pipe(duplex=False)
+    proc = multiprocessing.Process(
+        target=_run_case, args=(MODELS[model], count, messages, child)
+    )
+    proc.start()
+    result = parent.recv()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--messages", type=int, default=10, help="每个 actor 的消息数")
+    parser.add_argument("--workers", type=int, default=None, help="Dispatcher 线程数")
+    args = parser.parse_args()
+
+    PooledCounter.dispatcher = Dispatcher(workers=args.workers)
+    print(f"{'model':<18}{'actors':>8}{'rss MB':>10}{'start s':>10}{'msg/s':>12}")
+    for count in args.counts:
+        for model in MODELS:
+            rss, started, throughput, error = run_case(model, count, args.messages)
+            if error:
+                print(f"{model:<18}{count:>8}  failed: {error}")
+                continue
+            print(
+                f"{model:<18}{count:>8}{rss / 1024:>10.1f}"
+                f"{started:>10.2f}{throughput:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+benchmark: 持久信箱(DurableActor) tell 的吞吐, 不同的 fsync_interval 和发送线程数.
+
+每种配置跑 --seconds 秒, 每个发送线程不停地 tell, 信件是一个小的 tuple.
+    - memory: 普通 ThreadingActor, 对照
+    - none: 写 mmap 不主动 msync(进程崩溃不丢, 掉电可能丢)
+    - 0 / 0.001 / 0.01 ...: group commit, tell 等到 msync 完才返回
+    - tell/s: 所有线程合计
+    - records/sync: 平均每次 msync 带走几条信件, 发送线程多的时候 group commit 的效果
+
+python -m actor_model.chapter06.benchmarks.durable_bench --seconds 2 --producers 1,16
+"""
+import argparse
+import tempfile
+import threading
+import time
+
+from actor_model.chapter06.durable import DurableActor
+from actor_model.chapter06.threading import ThreadingActor
+
+
+class Sink(ThreadingActor):
+    def on_receive(self, message):
+        pass
+
+
+class DurableSink(DurableActor):
+    def on_receive(self, message):
+        pass
+
+
+def run(actor_class, producers, seconds):
+    ref = actor_class.start()
+    counts = [0] * producers
+    deadline = time.perf_counter() + seconds
+
+    def produce(index):
+        message = ('resolve', '8.8.8.8', index)
+        count = 0
+        while time.perf_counter() < deadline:
+            ref.tell(message)
+            count += 1
+        counts[index] = count
+
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ref.ask('flush')
+    elapsed = time.perf_counter() - t0
+    log = getattr(ref.actor_inbox, 'log', None)
+    ref.stop()
+    syncs = log.stats['syncs'] if log is not None else 0
+    return sum(counts) / elapsed, sum(counts) / syncs if syncs else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=2)
+    parser.add_argument('--producers', default='1,16', help='逗号分隔的发送线程数')
+    parser.add_argument('--intervals', default='none,0,0.001,0.01',
+                        help='逗号分隔的 fsync_interval, none 表示不主动 msync')
+    args = parser.parse_args()
+
+    print(f"{'fsync_interval':<15} {'producers':>9} {'tell/s':>10} {'records/sync':>13}")
+    for producers in [int(p) for p in args.producers.split(',')]:
+        rate, _ = run(Sink, producers, args.seconds)
+        print(f"{'memory':<15} {producers:>9} {rate:>10.0f} {'-':>13}")
+        for interval in args.intervals.split(','):
+            with tempfile.TemporaryDirectory() as directory:
+                actor_class = type('DurableSink', (DurableSink,), {
+                    'inbox_path': directory,
+                    'inbox_fsync_interval': None if interval == 'none' else float(interval),
+                })
+                rate, per_sync = run(actor_class, producers, args.seconds)
+            per_sync = f'{per_sync:.1f}' if per_sync else '-'
+            print(f"{interval:<15} {producers:>9} {rate:>10.0f} {per_sync:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+benchmark(模拟): 突发负载下固定大小的池和 ElasticPool 的吞吐量和线程数.
+
+负载按阶段变化(--profile "秒:每秒任务数,..."), 每个任务 --task-ms 毫秒.
+    - 时间线: 每 0.25 秒打印一次池的大小, 线程数和这段时间完成的任务数(ElasticPool)
+    - 汇总: 完成的任务数, p99 延迟, 平均线程数
+
+python -m actor_model.chapter06.benchmarks.elastic_bench --profile 1:50,1:1500,1.5:50,1:1500,1.5:20
+"""
+import argparse
+import threading
+import time
+
+from actor_model.chapter06.future import get_all
+from actor_model.chapter06.pool import ElasticPool
+from actor_model.chapter06.routing import Router
+from actor_model.chapter06.threading import ThreadingActor
+
+
+class Worker(ThreadingActor):
+    def work(self, seconds):
+        time.sleep(seconds)
+        return time.monotonic()
+
+
+def parse_profile(text):
+    return [tuple(float(x) for x in phase.split(':')) for phase in text.split(',')]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(pool, profile, task_seconds, timeline):
+    work = pool.proxy().work
+    sent, futures, samples = [], [], []
+    done = threading.Event()
+
+    def sample():
+        completed = 0
+        while not done.wait(0.25):
+            finished = sum(1 for f in list(futures) if f._is_done())
+            samples.append((len(pool.routees), threading.active_count(), finished - completed))
+            completed = finished
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    t0 = time.monotonic()
+    for seconds, rate in profile:
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            sent.append(time.monotonic())
+            futures.append(work(task_seconds))
+            time.sleep(1 / rate)
+    finished = get_all(futures)
+    elapsed = time.monotonic() - t0
+    done.set()
+    sampler.join()
+    pool.stop()
+
+    if timeline:
+        print(f"{'t':>6}{'size':>6}{'threads':>9}{'done':>7}")
+        for i, (size, threads, completed) in enumerate(samples):
+            print(f"{(i + 1) * 0.25:>6.2f}{size:>6}{threads:>9}{completed:>7}")
+        print()
+    latencies = [(f - s) * 1000 for s, f in zip(sent, finished)]
+    threads = sum(threads for _, threads, _ in samples) / max(len(samples), 1)
+    return len(futures) / elapsed, percentile(latencies, 0.99), threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--profile', default='1:50,1:1500,1.5:50,1:1500,1.5:20')
+    parser.add_argument('--task-ms', type=float, default=5)
+    parser.add_argument('--min-size', type=int, default=2)
+    parser.add_argument('--max-size', type=int, default=16)
+    args = parser.parse_args()
+
+    profile = parse_profile(args.profile)
+    task_seconds = args.task_ms / 1000
+    results = []
+    for name, make_pool in [
+        (f'static {args.min_size}', lambda: Router.start(Worker, args.min_size, strategy='smallest_mailbox')),
+        (f'static {args.max_size}', lambda: Router.start(Worker, args.max_size, strategy='smallest_mailbox')),
+        ('elastic', lambda: ElasticPool.start(Worker, args.min_size, max_size=args.max_size)),
+    ]:
+        results.append((name, run(make_pool(), profile, task_seconds, name == 'elastic')))
+
+    print(f"{'pool':<12}{'tasks/s':>10}{'p99 ms':>10}{'avg threads':>13}")
+    for name, (throughput, p99, threads) in results:
+        print(f"{name:<12}{throughput:>10.0f}{p99:>10.1f}{threads:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+benchmark: ThreadingFuture 的分配开销和 ask() 往返延迟.
+
+对照组 QueueFuture 是原来的实现: 每个 future 一个 queue.Queue(maxsize=1)
+加一个结果字典.
+    - bytes/future: tracemalloc 统计的每个 future 分配的内存
+    - create us: 创建一个 future 的时间
+    - ask us: 对同一个 actor ask() 一来一回的平均时间
+
+python -m actor_model.chapter06.benchmarks.future_bench
+"""
+import argparse
+import queue
+import sys
+import time
+import tracemalloc
+
+from actor_model.chapter06.exceptions import Timeout
+from actor_model.chapter06.future import Future
+from actor_model.chapter06.threading import ThreadingActor, ThreadingFuture
+
+
+class QueueFuture(Future):
+    """原来的 ThreadingFuture."""
+
+    def __init__(self):
+        super().__init__()
+        self._queue = queue.Queue(maxsize=1)
+        self._data = None
+
+    def get(self, timeout=None):
+        try:
+            return super().get(timeout=timeout)
+        except NotImplementedError:
+            pass
+        try:
+            if self._data is None:
+                self._data = self._queue.get(True, timeout)
+            if 'exc_info' in self._data:
+                raise self._data['exc_info'][1]
+            return self._data['value']
+        except queue.Empty:
+            raise Timeout('{} seconds'.format(timeout))
+
+    def set(self, value=None):
+        self._queue.put({'value': value}, block=False)
+
+    def set_exception(self, exc_info=None):
+        self._queue.put({'exc_info': exc_info or sys.exc_info()})
+
+
+class Echo(ThreadingActor):
+    def on_receive(self, message):
+        return message
+
+
+def bytes_per_future(future_class, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    futures = [future_class() for _ in range(count)]
+    for future in futures:
+        future.set(None)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def create_us(future_class, count):
+    t0 = time.perf_counter()
+    for _ in range(count):
+        future_class()
+    return (time.perf_counter() - t0) / count * 1e6
+
+
+def ask_us(future_class, count):
+    actor_class = type('Echo', (Echo,), {'_create_future': staticmethod(future_class)})
+    actor_ref = actor_class.start()
+    t0 = time.perf_counter()
+    for i in range(count):
+        actor_ref.ask(i)
+    elapsed = time.perf_counter() - t0
+    actor_ref.stop()
+    return elapsed / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'future':<18}{'bytes/future':>14}{'create us':>12}{'ask us':>10}")
+    for name, future_class in [('QueueFuture (old)', QueueFuture), ('ThreadingFuture', ThreadingFuture)]:
+        print(
+            f"{name:<18}{bytes_per_future(future_class, args.count):>14.0f}"
+            f"{create_us(future_class, args.count):>12.2f}"
+            f"{ask_us(future_class, args.count):>10.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
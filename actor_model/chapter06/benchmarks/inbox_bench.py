@@ -0,0 +1,79 @@
+"""
+benchmark: 每条消息的开销, queue.Queue 信箱 vs MPSCInbox.
+
+    - tell us: 生产者调用 ActorRef.tell 的平均耗时
+    - msg/s: 从第一条 tell 到 actor 全部处理完的吞吐量
+    - ping-pong us: ask 一来一回(消费者每次都要被唤醒)的平均耗时
+
+python -m actor_model.chapter06.benchmarks.inbox_bench
+python -m actor_model.chapter06.benchmarks.inbox_bench --messages 500000 --producers 4
+"""
+import argparse
+import queue
+import threading
+import time
+
+from actor_model.chapter06.inbox import MPSCInbox
+from actor_model.chapter06.threading import ThreadingActor
+
+Done = object()
+
+
+class Counter(ThreadingActor):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def on_receive(self, message):
+        if message is Done:
+            return self.count
+        self.count += 1
+
+
+def flood(inbox_class, messages, producers):
+    actor_class = type('Counter', (Counter,), {'inbox_class': inbox_class})
+    actor_ref = actor_class.start()
+    per_producer = messages // producers
+    tell_times = []
+
+    def produce():
+        t0 = time.perf_counter()
+        for i in range(per_producer):
+            actor_ref.tell(i)
+        tell_times.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=produce) for _ in range(producers)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    count = actor_ref.ask(Done)
+    elapsed = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    rounds = 2000
+    for i in range(rounds):
+        actor_ref.ask(i)
+    ping = (time.perf_counter() - t0) / rounds
+    actor_ref.stop()
+
+    assert count == per_producer * producers
+    tell_us = sum(tell_times) / (per_producer * producers) * 1e6
+    return tell_us, count / elapsed, ping * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--producers', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'inbox':<14}{'tell us':>10}{'msg/s':>12}{'ping-pong us':>14}")
+    for name, inbox_class in [('queue.Queue', queue.Queue), ('MPSCInbox', MPSCInbox)]:
+        tell_us, throughput, ping = flood(inbox_class, args.messages, args.producers)
+        print(f"{name:<14}{tell_us:>10.2f}{throughput:>12.0f}{ping:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+benchmark: ``collect_metrics`` 打开和关闭时信件处理的吞吐, 看指标的额外开销.
+
+每种场景关闭/打开交替跑 --repeat 轮, 吞吐取最好的一次
+(单核机器上线程调度的噪声很大):
+    - tell: 空的 on_receive, 连续 tell, 最后 ask 等处理完(开销占比最大的情况)
+    - ask: 一个一个 ask, 等回复
+    - proxy: ``proxy.method()`` 一个一个等回复
+    - work: on_receive 里做 --work 微秒左右的计算, 更接近真实的 actor
+    - inline: 不启动 actor 线程, 在当前线程里 tell 一封处理一封(空的 on_receive),
+      只有发送和处理的 CPU 开销, 没有线程调度的噪声
+    - best: 关闭的最好吞吐 / 打开的最好吞吐 - 1
+    - median: 每轮 关闭的吞吐 / 打开的吞吐 - 1 的中位数
+
+打开以后每封信件发送方多看一次 ``sample_next``, actor 这边多一次计数(一百纳秒左右);
+入队时间, 信箱深度和计时每 16 封才做一次. 空的 on_receive 时占比最大.
+
+python -m actor_model.chapter06.benchmarks.metrics_bench --messages 50000
+"""
+import argparse
+import statistics
+import time
+
+from actor_model.chapter06.threading import ThreadingActor
+
+
+class Plain(ThreadingActor):
+    work = 0
+
+    def on_receive(self, message):
+        if self.work:
+            deadline = time.perf_counter() + self.work
+            while time.perf_counter() < deadline:
+                pass
+        return message
+
+    def method(self, value):
+        return value
+
+
+class Metered(Plain):
+    collect_metrics = True
+
+
+def bench_tell(ref, messages):
+    for i in range(messages):
+        ref.tell(i)
+    ref.ask('flush')
+
+
+def bench_ask(ref, messages):
+    for i in range(messages):
+        ref.ask(i)
+
+
+def bench_proxy(ref, messages):
+    method = ref.proxy().method
+    for i in range(messages):
+        method(i).get()
+
+
+def bench_inline(actor, messages):
+    tell = actor.actor_ref.tell
+    get = actor.actor_inbox.get_nowait
+    handle = actor._handle_envelope
+    for i in range(messages):
+        tell(i)
+        handle(get())
+
+
+def measure(actor_class, scenario, messages, work):
+    actor_class = type(actor_class.__name__, (actor_class,), {'work': work})
+    if scenario is bench_inline:
+        # 没有 start(), 信箱只有当前线程在用.
+        actor = actor_class()
+        t0 = time.perf_counter()
+        scenario(actor, messages)
+        return messages / (time.perf_counter() - t0)
+    ref = actor_class.start()
+    t0 = time.perf_counter()
+    scenario(ref, messages)
+    rate = messages / (time.perf_counter() - t0)
+    ref.stop()
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=9)
+    parser.add_argument('--work', type=float, default=20, help='work 场景每封信件的微秒数')
+    args = parser.parse_args()
+
+    scenarios = [
+        ('tell', bench_tell, args.messages, 0),
+        ('ask', bench_ask, args.messages // 5, 0),
+        ('proxy', bench_proxy, args.messages // 5, 0),
+        ('work', bench_tell, args.messages // 5, args.work / 1e6),
+        ('inline', bench_inline, args.messages, 0),
+    ]
+    print(f"{'scenario':<9} {'off msg/s':>10} {'on msg/s':>10} {'best':>7} {'median':>7}")
+    for name, scenario, messages, work in scenarios:
+        offs, ons = [], []
+        for _ in range(args.repeat):
+            offs.append(measure(Plain, scenario, messages, work))
+            ons.append(measure(Metered, scenario, messages, work))
+        best = max(offs) / max(ons) - 1
+        median = statistics.median(off / on - 1 for off, on in zip(offs, ons))
+        print(
+            f"{name:<9} {max(offs):>10.0f} {max(ons):>10.0f} "
+            f"{best * 100:>6.1f}% {median * 100:>6.1f}%"
+        )
+
+
+if __name__ == '__main__':
+    main()
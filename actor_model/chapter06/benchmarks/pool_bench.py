@@ -0,0 +1,73 @@
+"""
+benchmark: 重尾(Pareto)分布的任务耗时, 任务一次性全部发出.
+
+    - round_robin / smallest_mailbox: routing.Router, 发出时就定好了由谁处理
+    - work_stealing: pool.WorkStealingPool, 空闲的成员从积压的成员那里偷任务
+    - total s: 全部完成的时间
+    - p50/p99 ms: 单个任务从发出到完成的时间
+
+python -m actor_model.chapter06.benchmarks.pool_bench --members 8 --tasks 1000
+"""
+import argparse
+import random
+import time
+
+from actor_model.chapter06.future import get_all
+from actor_model.chapter06.pool import WorkStealingPool, stateless
+from actor_model.chapter06.routing import Router
+from actor_model.chapter06.threading import ThreadingActor
+
+
+class Resolver(ThreadingActor):
+    @stateless
+    def resolve(self, seconds):
+        time.sleep(seconds)
+        return time.perf_counter()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(make_ref, durations):
+    ref = make_ref()
+    resolve = ref.proxy().resolve
+    t0 = time.perf_counter()
+    futures = [resolve(seconds) for seconds in durations]
+    finished = get_all(futures)
+    total = time.perf_counter() - t0
+    ref.stop()
+    latencies = [(f - t0) * 1000 for f in finished]
+    return total, percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--members', type=int, default=8)
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--scale-ms', type=float, default=0.5, help='最短的任务耗时')
+    parser.add_argument('--alpha', type=float, default=1.1, help='Pareto 分布的形状, 越小尾巴越长')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    durations = [
+        min(args.scale_ms * rng.paretovariate(args.alpha), 200) / 1000
+        for _ in range(args.tasks)
+    ]
+    print(f"tasks={args.tasks} sum={sum(durations):.2f}s max={max(durations) * 1000:.1f}ms")
+
+    members = args.members
+    print(f"{'pool':<18}{'total s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, make_ref in [
+        ('round_robin', lambda: Router.start(Resolver, members)),
+        ('smallest_mailbox', lambda: Router.start(Resolver, members, strategy='smallest_mailbox')),
+        ('work_stealing', lambda: WorkStealingPool.start(Resolver, members)),
+    ]:
+        total, p50, p99 = run(make_ref, durations)
+        print(f"{name:<18}{total:>10.2f}{p50:>10.1f}{p99:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
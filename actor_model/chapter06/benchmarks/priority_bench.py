@@ -0,0 +1,79 @@
+"""
+benchmark: 信箱积压时 stop() 和紧急 ask 的延迟, FIFO queue.Queue vs PriorityInbox.
+
+actor 每条消息耗时约 --work-us 微秒, 先积压 --backlog 条消息, 然后:
+    - urgent ask: ask(priority=-1) 到拿到回复的时间
+    - stop: ActorRef.stop() 到返回的时间
+
+python -m actor_model.chapter06.benchmarks.priority_bench
+python -m actor_model.chapter06.benchmarks.priority_bench --backlog 100000 1000000
+"""
+import argparse
+import queue
+import threading
+import time
+
+from actor_model.chapter06.inbox import PriorityInbox
+from actor_model.chapter06.threading import ThreadingActor
+
+Urgent = object()
+
+
+class Worker(ThreadingActor):
+    def __init__(self, gate, work_us):
+        super().__init__()
+        self.gate = gate
+        self.work = work_us / 1e6
+
+    def on_start(self):
+        # 先挡住, 让信件积压.
+        self.gate.wait()
+
+    def on_receive(self, message):
+        if message is Urgent:
+            return True
+        deadline = time.perf_counter() + self.work
+        while time.perf_counter() < deadline:
+            pass
+
+
+def start_backlogged(inbox_class, backlog, work_us):
+    actor_class = type('Worker', (Worker,), {'inbox_class': inbox_class})
+    gate = threading.Event()
+    actor_ref = actor_class.start(gate, work_us)
+    for i in range(backlog):
+        actor_ref.tell(i)
+    gate.set()
+    return actor_ref
+
+
+def measure(inbox_class, backlog, work_us):
+    # urgent ask 和 stop 各用一个新的 actor, 互相不影响.
+    actor_ref = start_backlogged(inbox_class, backlog, work_us)
+    t0 = time.perf_counter()
+    actor_ref.ask(Urgent, priority=-1)
+    urgent = time.perf_counter() - t0
+    actor_ref.stop()
+
+    actor_ref = start_backlogged(inbox_class, backlog, work_us)
+    t0 = time.perf_counter()
+    actor_ref.stop()
+    stop = time.perf_counter() - t0
+    return urgent, stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--backlog', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--work-us', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{'inbox':<14}{'backlog':>10}{'urgent ms':>12}{'stop ms':>12}")
+    for backlog in args.backlog:
+        for name, inbox_class in [('queue.Queue', queue.Queue), ('PriorityInbox', PriorityInbox)]:
+            urgent, stop = measure(inbox_class, backlog, args.work_us)
+            print(f"{name:<14}{backlog:>10}{urgent * 1e3:>12.2f}{stop * 1e3:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+benchmark: CPU 密集的 actor, ThreadingActor 和 ProcessActor 在 1..N 个 actor 上的吞吐.
+
+每个任务是 --rounds 轮纯 Python 计算(受 GIL 限制), 任务用 smallest_mailbox
+router 分给 N 个 actor. 线程 actor 再多也只用到一个核, 进程 actor 应该
+接近线性地随核数增长(直到 N 超过 cpu 个数).
+    - tasks/s: 每秒完成的任务数
+    - speedup: 相对同一种 runtime 1 个 actor 的倍数
+
+python -m actor_model.chapter06.benchmarks.process_bench --tasks 64 --rounds 200000
+"""
+import argparse
+import os
+import time
+
+from actor_model.chapter06.future import get_all
+from actor_model.chapter06.process import ProcessActor
+from actor_model.chapter06.routing import Router
+from actor_model.chapter06.threading import ThreadingActor
+
+
+def spin(rounds):
+    total = 0
+    for i in range(rounds):
+        total = (total + i * i) % 1000003
+    return total
+
+
+class ThreadWorker(ThreadingActor):
+    def spin(self, rounds):
+        return spin(rounds)
+
+
+class ProcessWorker(ProcessActor):
+    def spin(self, rounds):
+        return spin(rounds)
+
+
+def run(actor_class, actors, tasks, rounds):
+    router = Router.start(actor_class, actors, strategy='smallest_mailbox')
+    proxy = router.proxy()
+    t0 = time.perf_counter()
+    get_all([proxy.spin(rounds) for _ in range(tasks)])
+    elapsed = time.perf_counter() - t0
+    router.stop()
+    return tasks / elapsed
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=64)
+    parser.add_argument('--rounds', type=int, default=200000)
+    parser.add_argument('--max-actors', type=int, default=cpus)
+    args = parser.parse_args()
+
+    counts = sorted({1, 2, 4, 8, args.max_actors} & set(range(1, args.max_actors + 1)))
+    print(f"cpus={cpus} tasks={args.tasks} rounds={args.rounds}")
+    print(f"{'runtime':<10} {'actors':>6} {'tasks/s':>10} {'speedup':>8}")
+    for name, actor_class in (('thread', ThreadWorker), ('process', ProcessWorker)):
+        base = None
+        for actors in counts:
+            rate = run(actor_class, actors, args.tasks, args.rounds)
+            base = base or rate
+            print(f"{name:<10} {actors:>6} {rate:>10.1f} {rate / base:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+benchmark: 批量代理调用.
+
+同样 N 次方法调用, 比较:
+    - call: 每次 ``proxy.method(x)`` 一封信件一个 future
+    - map: ``proxy.method.map(xs)`` 按 --chunk 分组, 每组一封信件一个 future
+    - batch: ``with proxy.batch()`` 按 --chunk 分组, 每组一封信件, 每个调用一个 future
+
+python -m actor_model.chapter06.benchmarks.proxy_batch_bench --chunk 100
+"""
+import argparse
+import time
+
+from actor_model.chapter06.future import get_all
+from actor_model.chapter06.threading import ThreadingActor
+
+
+class Square(ThreadingActor):
+    def square(self, x):
+        return x * x
+
+
+def one_by_one(proxy, xs, chunk):
+    return get_all([proxy.square(x) for x in xs])
+
+
+def mapped(proxy, xs, chunk):
+    futures = [proxy.square.map(xs[i:i + chunk]) for i in range(0, len(xs), chunk)]
+    return [y for ys in get_all(futures) for y in ys]
+
+
+def batched(proxy, xs, chunk):
+    futures = []
+    for i in range(0, len(xs), chunk):
+        with proxy.batch() as batch:
+            futures.extend(batch.square(x) for x in xs[i:i + chunk])
+    return get_all(futures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--chunk', type=int, default=100)
+    args = parser.parse_args()
+
+    proxy = Square.start().proxy()
+    xs = list(range(args.count))
+    expected = [x * x for x in xs]
+    try:
+        print(f"{'mode':<8}{'calls/s':>12}")
+        for name, run in [('call', one_by_one), ('map', mapped), ('batch', batched)]:
+            t0 = time.perf_counter()
+            assert run(proxy, xs, args.chunk) == expected
+            print(f"{name:<8}{args.count / (time.perf_counter() - t0):>12.0f}")
+    finally:
+        proxy.actor_ref.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+benchmark: ``ref.proxy()`` 的创建时间, actor 类有几百个成员.
+
+对照组 EagerActorProxy 是原来的实现: 创建 proxy 的时候用 list.pop(0)
+广度优先遍历 dir(actor) 的所有属性, 每个属性都重新合并一次 MRO 的 ``__dict__``.
+    - proxy us: 创建一个 proxy 的时间
+    - first call us: 创建 proxy 并且第一次调用一个方法(只算 proxy 这边, 不等结果)
+    - miss us: ``hasattr(proxy.inner, 'missing')``, 可遍历对象上不存在的属性,
+      有负缓存和没有负缓存(missing_attrs_cache_size = 0)
+
+python -m actor_model.chapter06.benchmarks.proxy_bench --members 500
+"""
+import argparse
+import time
+
+from actor_model.chapter06.actor_proxy import ActorProxy, traversable
+from actor_model.chapter06.threading import ThreadingActor
+
+
+class UncachedMissProxy(ActorProxy):
+    """没有负缓存."""
+
+    missing_attrs_cache_size = 0
+
+
+class EagerActorProxy(ActorProxy):
+    """原来的 ActorProxy: 创建时自省所有属性."""
+
+    def __init__(self, actor_ref, attr_path=None):
+        super().__init__(actor_ref, attr_path)
+        self._known_attrs = self._introspect_all()
+
+    def _introspect_all(self):
+        result = {}
+        attr_paths_to_visit = [[attr_name] for attr_name in dir(self._actor)]
+        while attr_paths_to_visit:
+            attr_path = attr_paths_to_visit.pop(0)
+            if not self._is_exposable_attribute(attr_path[-1]):
+                continue
+            attr = self._actor._introspect_attribute_from_path(attr_path)
+            if self._is_self_proxy(attr):
+                continue
+            result[tuple(attr_path)] = self._get_attr_info_of(attr)
+            if result[tuple(attr_path)]['traversable']:
+                for attr_name in dir(attr):
+                    attr_paths_to_visit.append(attr_path + [attr_name])
+        return result
+
+
+def make_actor_class(members):
+    namespace = {}
+    for i in range(members // 2):
+        namespace[f'method_{i}'] = lambda self, i=i: i
+        namespace[f'value_{i}'] = i
+    # 可遍历的成员, 也有几百个属性.
+    namespace['inner'] = traversable(type('Inner', (), dict(namespace))())
+    return type('BigActor', (ThreadingActor,), namespace)
+
+
+def proxy_us(proxy_class, actor_ref, count, call):
+    t0 = time.perf_counter()
+    for _ in range(count):
+        proxy = proxy_class(actor_ref)
+        if call:
+            proxy.method_0
+    return (time.perf_counter() - t0) / count * 1e6
+
+
+def miss_us(proxy_class, actor_ref, count):
+    inner = proxy_class(actor_ref).inner
+    t0 = time.perf_counter()
+    for _ in range(count):
+        hasattr(inner, 'missing')
+    return (time.perf_counter() - t0) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--members', type=int, default=500)
+    parser.add_argument('--count', type=int, default=200)
+    args = parser.parse_args()
+
+    actor_ref = make_actor_class(args.members).start()
+    try:
+        print(f"{'proxy':<20}{'proxy us':>12}{'first call us':>16}")
+        for name, proxy_class in [('EagerActorProxy', EagerActorProxy), ('ActorProxy', ActorProxy)]:
+            print(
+                f"{name:<20}{proxy_us(proxy_class, actor_ref, args.count, False):>12.1f}"
+                f"{proxy_us(proxy_class, actor_ref, args.count, True):>16.1f}"
+            )
+        print()
+        print(f"{'proxy':<20}{'miss us':>12}")
+        for name, proxy_class in [('UncachedMissProxy', UncachedMissProxy), ('ActorProxy', ActorProxy)]:
+            print(f"{name:<20}{miss_us(proxy_class, actor_ref, args.count * 10):>12.2f}")
+    finally:
+        actor_ref.stop()
+
+
+if __name__ == '__main__':
+    main()
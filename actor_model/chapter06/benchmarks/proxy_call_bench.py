@@ -0,0 +1,98 @@
+"""
+benchmark: 代理方法调用 ``proxy.method()`` 的吞吐量和每次调用分配的内存.
+
+对照组是原来的实现: ``@dataclass`` 的 ProxyCall(有实例 ``__dict__``)
+再装进一个 Envelope, 每次调用两个对象.
+    - bytes/call: tracemalloc 统计的每次调用分配的消息 + 信封(不含 future)
+    - calls/s: ``proxy.method.defer()`` 发送 N 次, 再等 actor 全部处理完.
+      对照组用 ProxyCall + Envelope 两个对象(actor 只认 ProxyCall 类型)
+
+python -m actor_model.chapter06.benchmarks.proxy_call_bench
+"""
+import argparse
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict, Sequence, Tuple
+
+from actor_model.chapter06.actor_proxy import CallableProxy
+from actor_model.chapter06.envelope import Envelope, ProxyCallEnvelope
+from actor_model.chapter06.messages import ProxyCall
+from actor_model.chapter06.threading import ThreadingActor
+
+
+@dataclass
+class DictProxyCall:
+    """原来的 ProxyCall."""
+    attr_path: Sequence[str]
+    args: Tuple[Any]
+    kwargs: Dict[str, Any]
+
+
+class OldCallableProxy(CallableProxy):
+    """原来的 CallableProxy.defer: 消息 + 信封两个对象."""
+
+    def defer(self, *args, **kwargs):
+        message = ProxyCall(attr_path=self._attr_path, args=args, kwargs=kwargs)
+        return self.actor_ref.tell(message)
+
+
+class Counter(ThreadingActor):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def increment(self, step):
+        self.count += step
+
+
+def old_envelope(attr_path, args, kwargs):
+    return Envelope(DictProxyCall(attr_path, args, kwargs))
+
+
+def new_envelope(attr_path, args, kwargs):
+    return ProxyCallEnvelope(attr_path, args, kwargs)
+
+
+def bytes_per_call(make_envelope, count):
+    attr_path = ('increment',)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    envelopes = [make_envelope(attr_path, (1,), {}) for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del envelopes
+    return (after - before) / count
+
+
+def calls_per_second(proxy_class, count):
+    actor_ref = Counter.start()
+    method = proxy_class(actor_ref, ('increment',))
+    t0 = time.perf_counter()
+    for _ in range(count):
+        method.defer(1)
+    # ask 排在所有 defer 后面, 返回时前面的都处理完了.
+    actor_ref.proxy().count.get()
+    elapsed = time.perf_counter() - t0
+    actor_ref.stop()
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'proxy call':<28}{'bytes/call':>12}{'calls/s':>12}")
+    for name, make_envelope, proxy_class in [
+        ('dataclass + Envelope (old)', old_envelope, OldCallableProxy),
+        ('ProxyCallEnvelope', new_envelope, CallableProxy),
+    ]:
+        print(
+            f"{name:<28}{bytes_per_call(make_envelope, args.count):>12.0f}"
+            f"{calls_per_second(proxy_class, args.count):>12.0f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
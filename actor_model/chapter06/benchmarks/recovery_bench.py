@@ -0,0 +1,81 @@
+"""
+benchmark: EventSourcedActor 重启恢复的时间, 不同的事件数和快照间隔.
+
+先写入 --events 个事件(每个事件是一个小 dict, 状态是所有事件的 list)再停止,
+然后计时 ``start()``: 读最新的快照, 重放快照之后的事件.
+    - snapshot_every: none 表示不做快照, 只能从头重放
+    - snapshot: 恢复用的快照包含到的事件编号
+    - replayed: 快照之后重放的事件数
+    - recover ms: start() 的时间
+
+python -m actor_model.chapter06.benchmarks.recovery_bench --events 1000,10000,100000
+"""
+import argparse
+import tempfile
+import time
+
+from actor_model.chapter06.persistence import EventSourcedActor
+
+GetCount = object()
+
+
+class Store(EventSourcedActor):
+    event_fsync_interval = None
+
+    def __init__(self):
+        super().__init__()
+        self.stored_messages = []
+
+    def on_receive(self, message):
+        if message is GetCount:
+            return len(self.stored_messages)
+        self.persist(message)
+
+    def apply_event(self, event):
+        self.stored_messages.append(event)
+
+    def snapshot_state(self):
+        return self.stored_messages
+
+    def restore_state(self, state):
+        self.stored_messages = state
+
+
+def run(directory, events, snapshot_every):
+    store_class = type('Store', (Store,), {
+        'persistence_path': directory, 'snapshot_every': snapshot_every,
+    })
+    ref = store_class.start()
+    for i in range(events):
+        ref.tell({'no': i, 'country': 'Norway'})
+    ref.ask(GetCount)
+    ref.stop()
+
+    t0 = time.perf_counter()
+    ref = store_class.start()
+    elapsed = time.perf_counter() - t0
+    actor = ref._actor
+    row = (actor.recovered_snapshot_seq, actor.recovered_events, elapsed * 1000)
+    assert ref.ask(GetCount) == events
+    ref.stop()
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', default='1000,10000,100000', help='逗号分隔的事件数')
+    parser.add_argument('--snapshot-every', default='none,100,1000,10000',
+                        help='逗号分隔的快照间隔(事件数), none 表示不做快照')
+    args = parser.parse_args()
+
+    print(f"{'events':>8} {'snapshot_every':>15} {'snapshot':>9} {'replayed':>9} {'recover ms':>11}")
+    for events in [int(n) for n in args.events.split(',')]:
+        for every in args.snapshot_every.split(','):
+            snapshot_every = None if every == 'none' else int(every)
+            with tempfile.TemporaryDirectory() as directory:
+                snapshot, replayed, ms = run(directory, events, snapshot_every)
+            print(f"{events:>8} {every:>15} {snapshot:>9} {replayed:>9} {ms:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+benchmark: ActorRegistry 的注册/查找/注销耗时随 actor 数量的变化.
+
+用假的 actor_ref(只有 actor_urn 和 actor_class), 不启动线程.
+对照组 ListRegistry 是原来基于 list 的实现, 用来对比 O(n) 和 O(1).
+
+python -m actor_model.chapter06.benchmarks.registry_bench
+python -m actor_model.chapter06.benchmarks.registry_bench --counts 1000 10000
+"""
+import argparse
+import threading
+import time
+import uuid
+
+from actor_model.chapter06.actor_register import ActorRegistry
+
+
+class FakeRef:
+    __slots__ = ['actor_urn', 'actor_class']
+
+    def __init__(self, actor_class):
+        self.actor_urn = uuid.uuid4().urn
+        self.actor_class = actor_class
+
+
+class Base:
+    pass
+
+
+class Common(Base):
+    pass
+
+
+class Rare(Base):
+    pass
+
+
+class ListRegistry:
+    """原来的实现: list + 线性扫描."""
+    _actor_refs = []
+    _actor_refs_lock = threading.RLock()
+
+    @classmethod
+    def register(cls, actor_ref):
+        with cls._actor_refs_lock:
+            cls._actor_refs.append(actor_ref)
+
+    @classmethod
+    def unregister(cls, actor_ref):
+        with cls._actor_refs_lock:
+            if actor_ref in cls._actor_refs:
+                cls._actor_refs.remove(actor_ref)
+
+    @classmethod
+    def get_by_urn(cls, actor_urn):
+        with cls._actor_refs_lock:
+            refs = [ref for ref in cls._actor_refs if ref.actor_urn == actor_urn]
+            if refs:
+                return refs[0]
+
+    @classmethod
+    def get_by_class(cls, actor_class):
+        with cls._actor_refs_lock:
+            return [
+                ref for ref in cls._actor_refs
+                if issubclass(ref.actor_class, actor_class)
+            ]
+
+
+def per_op_us(func, items):
+    t0 = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - t0) / len(items) * 1e6
+
+
+def run(registry, count, ops):
+    refs = [FakeRef(Common) for _ in range(count)]
+    rare = [FakeRef(Rare) for _ in range(10)]
+    for ref in refs + rare:
+        registry.register(ref)
+
+    probes = refs[-ops:]
+    result = {
+        'get_by_urn': per_op_us(registry.get_by_urn, [r.actor_urn for r in probes]),
+        'get_by_class': per_op_us(registry.get_by_class, [Rare] * ops),
+        # 注销再注册同一批, 保持数量不变.
+        'unregister': per_op_us(registry.unregister, probes),
+        'register': per_op_us(registry.register, probes),
+    }
+    for ref in refs + rare:
+        registry.unregister(ref)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--ops', type=int, default=200)
+    args = parser.parse_args()
+
+    columns = ['register', 'unregister', 'get_by_urn', 'get_by_class']
+    print(f"{'registry':<16}{'actors':>8}" + ''.join(f"{c + ' us':>16}" for c in columns))
+    for count in args.counts:
+        for name, registry in [('dict (new)', ActorRegistry), ('list (old)', ListRegistry)]:
+            result = run(registry, count, args.ops)
+            print(f"{name:<16}{count:>8}" + ''.join(f"{result[c]:>16.2f}" for c in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+benchmark: 本地 ActorRef 和经过 TCP(loopback)的 RemoteActorRef 的 tell 吞吐和 ask 延迟.
+
+远程的 actor 和 ActorServer 跑在一个子进程里, 和真的另一个节点一样不抢本进程的 GIL.
+    - tell/s: 连续 tell --messages 封信件, 最后一个 ask 等它们都处理完
+    - ask p50/p99 us: 一个一个 ask(等到回复再发下一个)的延迟
+    - pipelined ask/s: 先发出 --messages 个 ask 再一起等
+
+python -m actor_model.chapter06.benchmarks.remote_bench --messages 20000
+"""
+import argparse
+import multiprocessing
+import time
+
+from actor_model.chapter06.future import get_all
+from actor_model.chapter06.remote import ActorServer, RemoteNode
+from actor_model.chapter06.threading import ThreadingActor
+
+
+class Echo(ThreadingActor):
+    def on_receive(self, message):
+        return message
+
+
+def serve(conn):
+    server = ActorServer().start()
+    ref = Echo.start()
+    conn.send((server.address, ref.actor_urn))
+    conn.recv()  # 等父进程说结束
+    ref.stop()
+    server.stop()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def measure(ref, messages, asks):
+    t0 = time.perf_counter()
+    for i in range(messages):
+        ref.tell(i)
+    ref.ask('flush')
+    tell_rate = messages / (time.perf_counter() - t0)
+
+    latencies = []
+    for i in range(asks):
+        t0 = time.perf_counter()
+        ref.ask(i)
+        latencies.append((time.perf_counter() - t0) * 1e6)
+
+    t0 = time.perf_counter()
+    get_all([ref.ask(i, block=False) for i in range(messages)])
+    pipelined = messages / (time.perf_counter() - t0)
+    return tell_rate, percentile(latencies, 0.5), percentile(latencies, 0.99), pipelined
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--asks', type=int, default=2000)
+    args = parser.parse_args()
+
+    local = Echo.start()
+    rows = [('local', measure(local, args.messages, args.asks))]
+    local.stop()
+
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve, args=(child_conn,), daemon=True)
+    process.start()
+    address, actor_urn = parent_conn.recv()
+    remote = RemoteNode(address).get_by_urn(actor_urn)
+    rows.append(('remote', measure(remote, args.messages, args.asks)))
+    parent_conn.send('done')
+    process.join()
+
+    print(f"{'ref':<8} {'tell/s':>10} {'ask p50 us':>11} {'ask p99 us':>11} {'pipelined ask/s':>16}")
+    for name, (tell_rate, p50, p99, pipelined) in rows:
+        print(f"{name:<8} {tell_rate:>10.0f} {p50:>11.1f} {p99:>11.1f} {pipelined:>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+benchmark: 任务耗时不均匀的时候, 各种路由策略的总时间和尾延迟.
+
+--slow-ratio 的任务要 --slow-ms 毫秒, 其他任务 --fast-ms 毫秒.
+任务每隔 --interval-ms 发出一个(0 表示一次性全部发出),
+记录每个任务从发出到完成的时间. consistent_hash 按第一个参数(任务耗时)路由,
+只用到两个 actor, 作为对照.
+    - total s: 全部完成的时间
+    - p50/p99 ms: 单个任务的延迟
+
+python -m actor_model.chapter06.benchmarks.routing_bench --routees 8 --tasks 2000
+"""
+import argparse
+import random
+import time
+
+from actor_model.chapter06.future import get_all
+from actor_model.chapter06.routing import Router
+from actor_model.chapter06.threading import ThreadingActor
+
+
+class Resolver(ThreadingActor):
+    def resolve(self, seconds):
+        time.sleep(seconds)
+        return time.perf_counter()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(strategy, durations, routees, interval):
+    router = Router.start(Resolver, routees, strategy=strategy)
+    resolve = router.proxy().resolve
+    t0 = time.perf_counter()
+    sent, futures = [], []
+    for seconds in durations:
+        sent.append(time.perf_counter())
+        futures.append(resolve(seconds))
+        if interval:
+            time.sleep(interval)
+    finished = get_all(futures)
+    total = time.perf_counter() - t0
+    router.stop()
+    latencies = [(f - s) * 1000 for s, f in zip(sent, finished)]
+    return total, percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--routees', type=int, default=8)
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('--fast-ms', type=float, default=0.2)
+    parser.add_argument('--slow-ms', type=float, default=20)
+    parser.add_argument('--slow-ratio', type=float, default=0.05)
+    parser.add_argument('--interval-ms', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    durations = [
+        (args.slow_ms if rng.random() < args.slow_ratio else args.fast_ms) / 1000
+        for _ in range(args.tasks)
+    ]
+
+    print(f"{'strategy':<18}{'total s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for strategy in ['round_robin', 'random', 'consistent_hash', 'smallest_mailbox']:
+        total, p50, p99 = run(strategy, durations, args.routees, args.interval_ms / 1000)
+        print(f"{strategy:<18}{total:>10.2f}{p50:>10.1f}{p99:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+benchmark: 给进程 actor 发大 payload, 管道(pickle 整个写进 Pipe)和共享内存的延迟.
+
+每次调用 ``proxy.size(payload).get()``, actor 只返回长度, 测的是单向传大数据
+的开销. payload 从 1KB 每次乘 16, 直到 --max-size.
+    - pipe: ``shared_memory_threshold = None``
+    - shm bytes: 共享内存, 接收方从共享内存复制出 bytes
+    - shm view: 共享内存, 发 ``pickle.PickleBuffer``, 接收方拿到 memoryview, 不复制
+    - ms/call: 每次调用的平均毫秒数
+
+共享内存每条消息要创建/映射/unlink 一个段, 小 payload 反而更慢,
+所以 ``shared_memory_threshold`` 建议从 64KB 左右开始.
+
+python -m actor_model.chapter06.benchmarks.shm_bench --max-size 1G
+"""
+import argparse
+import pickle
+import time
+
+from actor_model.chapter06.process import ProcessActor
+
+
+class PipeSink(ProcessActor):
+    def size(self, data):
+        return len(data)
+
+
+class SharedSink(PipeSink):
+    shared_memory_threshold = 1
+
+
+def parse_size(text):
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.upper().rstrip('B')
+    if text[-1:] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def run(actor_class, payload, calls):
+    ref = actor_class.start()
+    size = ref.proxy().size
+    size(payload).get()  # 预热
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        size(payload).get()
+    elapsed = time.perf_counter() - t0
+    ref.stop()
+    return elapsed / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--max-size', default='1G', help='例如 64M, 1G')
+    parser.add_argument('--budget', type=float, default=256,
+                        help='每种 payload 每个模式大约发送的 MB 数, 决定调用次数')
+    args = parser.parse_args()
+
+    max_size = parse_size(args.max_size)
+    print(f"{'payload':>10} {'calls':>6} {'pipe':>10} {'shm bytes':>10} {'shm view':>10}  (ms/call)")
+    size = 1 << 10
+    while size <= max_size:
+        calls = max(1, min(1000, int(args.budget * (1 << 20) // size)))
+        data = b'x' * size
+        pipe = run(PipeSink, data, calls)
+        shm_bytes = run(SharedSink, data, calls)
+        shm_view = run(SharedSink, pickle.PickleBuffer(data), calls)
+        label = f"{size >> 20}MB" if size >= 1 << 20 else f"{size >> 10}KB"
+        print(f"{label:>10} {calls:>6} {pipe:>10.3f} {shm_bytes:>10.3f} {shm_view:>10.3f}")
+        del data
+        size *= 16
+
+
+if __name__ == '__main__':
+    main()
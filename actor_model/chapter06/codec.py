@@ -0,0 +1,212 @@
+"""
+消息编码(codec), 进程 runtime(:mod:`process`, :mod:`transport`)和网络 runtime
+(:mod:`remote`)共用.
+
+默认就是 pickle protocol 5(大 buffer 可以 out-of-band, 见 ``buffer_callback``),
+另外可以按消息类型注册编码. 注册过的类型在 pickle 里用 persistent id 表示::
+
+    ProxyCall(('resolve',), ('8.8.8.8',), {})
+        pickle:  类的模块名 + 类名 + 每个 slot 的名字和值     130 字节
+        codec:   (1, struct 打包的 attr_path, args, kwargs)   50 字节
+
+代价是编码/解码慢一些(每个对象都要调一次 Python 的 ``persistent_id``),
+适合瓶颈在管道/网络带宽的场景, 见 ``benchmarks/codec_bench.py``.
+
+persistent id 里的 args/kwargs 还是由同一个 pickler 处理, 所以参数里的
+``PickleBuffer`` 照样 out-of-band(共享内存通道靠这个).
+
+内置的代理消息(tag 0-15 保留)已经注册在 :data:`default_codec` 上.
+用户的消息类型::
+
+    default_codec.register(
+        Point, tag=16,
+        encode=lambda p: (p.x, p.y),
+        decode=Point,
+    )
+
+两端(父子进程, 两个节点)必须注册同样的 tag.
+"""
+import io
+import pickle
+import struct
+
+from .messages import (
+    ProxyBatchCall, ProxyCall, ProxyGetAttr, ProxySetAttr, _ActorStop, _intern_attr_path,
+)
+
+__all__ = ['Codec', 'FIRST_USER_TAG', 'default_codec']
+
+#: 用户 tag 从这里开始, 更小的留给内置的消息.
+FIRST_USER_TAG = 16
+
+_COUNT = struct.Struct('!B')
+_LENGTH = struct.Struct('!H')
+_MAX_PATH_PARTS = 255
+_MAX_NAME_BYTES = 65535
+
+# attr_path <-> 打包后的 bytes. 解码的缓存有上限, 远端发来的路径不会让它无限增长.
+_packed_paths = {}
+_unpacked_paths = {}
+_PATH_CACHE_SIZE = 4096
+
+
+def _pack_path(attr_path):
+    """
+    ``(名字, ...)`` -> 个数(1 字节) + 每个名字的长度(2 字节) 和 utf-8.
+    attr_path 可以是任意序列(例如 list); 超过 255 层或者名字太长抛 PicklingError.
+    """
+    if type(attr_path) is not tuple:
+        attr_path = tuple(attr_path)
+    try:
+        return _packed_paths[attr_path]
+    except KeyError:
+        pass
+    if len(attr_path) > _MAX_PATH_PARTS:
+        raise pickle.PicklingError(
+            f'attr_path has {len(attr_path)} parts, at most {_MAX_PATH_PARTS} can be encoded'
+        )
+    parts = [_COUNT.pack(len(attr_path))]
+    for name in attr_path:
+        encoded = name.encode('utf-8')
+        if len(encoded) > _MAX_NAME_BYTES:
+            raise pickle.PicklingError(
+                f'attribute name is {len(encoded)} bytes, at most {_MAX_NAME_BYTES} can be encoded'
+            )
+        parts.append(_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    packed = b''.join(parts)
+    if len(_packed_paths) < _PATH_CACHE_SIZE:
+        _packed_paths[attr_path] = packed
+    return packed
+
+
+def _unpack_path(packed):
+    try:
+        return _unpacked_paths[packed]
+    except KeyError:
+        pass
+    count = packed[0]
+    offset = _COUNT.size
+    names = []
+    for _ in range(count):
+        (length,) = _LENGTH.unpack_from(packed, offset)
+        offset += _LENGTH.size
+        names.append(packed[offset:offset + length].decode('utf-8'))
+        offset += length
+    attr_path = tuple(names)
+    if len(_unpacked_paths) < _PATH_CACHE_SIZE:
+        attr_path = _intern_attr_path(attr_path)
+        _unpacked_paths[packed] = attr_path
+    return attr_path
+
+
+class _CodecPickler(pickle.Pickler):
+    def __init__(self, file, codec, buffer_callback):
+        super().__init__(file, protocol=codec.protocol, buffer_callback=buffer_callback)
+        self._encoders = codec._encoders
+
+    def persistent_id(self, obj):
+        entry = self._encoders.get(type(obj))
+        if entry is None:
+            return None
+        tag, encode = entry
+        return (tag,) + tuple(encode(obj))
+
+
+class _CodecUnpickler(pickle.Unpickler):
+    def __init__(self, file, codec, buffers):
+        super().__init__(file, buffers=buffers)
+        self._decoders = codec._decoders
+
+    def persistent_load(self, pid):
+        try:
+            decode = self._decoders[pid[0]]
+        except KeyError:
+            raise pickle.UnpicklingError(f'unknown codec tag {pid[0]!r}') from None
+        return decode(*pid[1:])
+
+
+class Codec:
+    """
+    pickle + 按类型注册的编码.
+
+    :param protocol: pickle 协议, out-of-band buffer 需要 5
+    """
+
+    def __init__(self, protocol=5):
+        self.protocol = protocol
+        # 消息类型 -> (tag, encode)
+        self._encoders = {}
+        # tag -> decode
+        self._decoders = {}
+
+    def __repr__(self):
+        return f"<Codec protocol={self.protocol} types={len(self._encoders)}>"
+
+    def register(self, message_type, tag, encode, decode):
+        """
+        :param message_type: 消息类型, 只匹配这个类型本身(不包括子类)
+        :param tag: 小整数, 用户用 :data:`FIRST_USER_TAG` 以上的
+        :param encode: ``encode(message)`` 返回 tuple, 里面的对象照常 pickle
+        :param decode: ``decode(*tuple)`` 返回消息
+        """
+        if message_type in self._encoders:
+            raise ValueError(f'{message_type.__name__} is already registered')
+        if tag in self._decoders:
+            raise ValueError(f'codec tag {tag!r} is already used')
+        self._encoders[message_type] = (tag, encode)
+        self._decoders[tag] = decode
+
+    def unregister(self, message_type):
+        tag, _ = self._encoders.pop(message_type)
+        del self._decoders[tag]
+
+    def copy(self):
+        """同样注册的新 codec, 加注册不影响原来的."""
+        codec = self.__class__(self.protocol)
+        codec._encoders = dict(self._encoders)
+        codec._decoders = dict(self._decoders)
+        return codec
+
+    def dumps(self, obj, buffer_callback=None):
+        if not self._encoders:
+            return pickle.dumps(obj, protocol=self.protocol, buffer_callback=buffer_callback)
+        file = io.BytesIO()
+        _CodecPickler(file, self, buffer_callback).dump(obj)
+        return file.getvalue()
+
+    def loads(self, data, buffers=None):
+        if not self._decoders:
+            return pickle.loads(data, buffers=buffers)
+        return _CodecUnpickler(io.BytesIO(data), self, buffers).load()
+
+
+def _register_builtins(codec):
+    codec.register(
+        ProxyCall, 1,
+        lambda m: (_pack_path(m.attr_path), m.args, m.kwargs),
+        lambda path, args, kwargs: ProxyCall(_unpack_path(path), args, kwargs),
+    )
+    codec.register(
+        ProxyGetAttr, 2,
+        lambda m: (_pack_path(m.attr_path),),
+        lambda path: ProxyGetAttr(_unpack_path(path)),
+    )
+    codec.register(
+        ProxySetAttr, 3,
+        lambda m: (_pack_path(m.attr_path), m.value),
+        lambda path, value: ProxySetAttr(_unpack_path(path), value),
+    )
+    codec.register(_ActorStop, 4, lambda m: (), _ActorStop)
+    codec.register(
+        ProxyBatchCall, 5,
+        lambda m: tuple((_pack_path(path), args, kwargs) for path, args, kwargs in m.calls),
+        lambda *calls: ProxyBatchCall(
+            [(_unpack_path(path), args, kwargs) for path, args, kwargs in calls]
+        ),
+    )
+
+
+#: 进程和网络 runtime 默认用的 codec, 已经注册了内置的代理消息.
+default_codec = Codec()
+_register_builtins(default_codec)
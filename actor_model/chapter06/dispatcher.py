@@ -0,0 +1,186 @@
+"""
+调度器(dispatcher): 很多 actor 共享固定数量的工作线程.
+
+ThreadingActor 一个 actor 一个线程, 几万个大部分空闲的 actor 就是几万个线程栈.
+PooledActor 把 actor 复用到 Dispatcher 的 N 个 worker 上:
+
+    tell/ask --> inbox.put --> Dispatcher.schedule(actor) --> ready queue
+                                                                |
+                                  worker 线程 <-----------------
+                                  actor._process_inbox(throughput)
+
+同一个 actor 同一时间最多只被一个 worker 处理(``_scheduled`` 锁),
+所以和 ``Actor._actor_loop`` 一样保证 one-message-at-a-time.
+
+Notes:
+    worker 是共享的, handler 里不要长时间阻塞(例如 ``ask(block=True)``
+    另一个 PooledActor), 所有 worker 都阻塞的时候会互相等死.
+"""
+import os
+import queue
+import threading
+
+from .actor import _get_batch
+from .threading import ThreadingActor
+
+__all__ = ['Dispatcher', 'PooledActor']
+
+
+class Dispatcher:
+    """
+    把很多 actor 复用到固定大小的线程池上.
+
+    :param workers: 工作线程数量, 默认 cpu 个数
+    :param throughput: 一个 actor 每次被调度最多处理的信件数量,
+        处理完让出 worker(公平性), 还有信件就重新排队
+    :param name: 工作线程名字前缀
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, workers=None, throughput=64, name='Dispatcher'):
+        self.workers = workers or os.cpu_count() or 4
+        self.throughput = throughput
+        self.name = name
+        self._ready = queue.SimpleQueue()
+        self._threads = []
+        self._threads_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<Dispatcher {self.name} workers={self.workers}>"
+
+    @classmethod
+    def default(cls):
+        """进程内共享的默认调度器, 第一次使用时创建."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def schedule(self, actor):
+        """
+        actor 信箱里有信件了, 放进 ready queue 等待 worker 处理.
+        已经排过队(或者正在被处理)的 actor 不会重复排队.
+        """
+        if actor._scheduled.acquire(blocking=False):
+            if not self._threads:
+                self._start_workers()
+            self._ready.put(actor)
+
+    def shutdown(self, wait=True):
+        """停止所有 worker, 已经排队的 actor 先处理完."""
+        with self._threads_lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._ready.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _start_workers(self):
+        with self._threads_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker, name=f"{self.name}-{i}"
+                )
+                # worker 是共享的, 不应该挡住解释器退出.
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            actor = self._ready.get()
+            if actor is None:  # shutdown 哨兵
+                return
+            try:
+                actor._process_inbox(self.throughput)
+            finally:
+                actor._scheduled.release()
+            # 释放之后再检查一次, 避免 put 和 release 之间的信件没人处理.
+            if not actor.actor_inbox.empty():
+                self.schedule(actor)
+
+
+class _PooledInbox:
+    """
+    包一层信箱: put 之后通知调度器.
+    其他方法(get, empty, qsize ...)直接转给真正的信箱.
+    """
+
+    __slots__ = ['_actor', '_inbox']
+
+    def __init__(self, actor, inbox):
+        self._actor = actor
+        self._inbox = inbox
+
+    def put(self, item, block=True, timeout=None):
+        self._inbox.put(item, block, timeout)
+        self._actor._schedule()
+
+    def __getattr__(self, name):
+        return getattr(self._inbox, name)
+
+
+class PooledActor(ThreadingActor):
+    """
+    跑在 :class:`Dispatcher` 线程池上的 actor, 不再占用单独的线程.
+
+    Example::
+
+        class Worker(PooledActor):
+            dispatcher = Dispatcher(workers=8)
+
+    不设置 ``dispatcher`` 就用 :meth:`Dispatcher.default`.
+    """
+
+    #: 使用的调度器, ``None`` 表示共享的默认调度器.
+    dispatcher = None
+
+    def __init__(self, *args, **kwargs):
+        # 调度令牌: 拿到锁的 worker 才能处理这个 actor 的信箱.
+        self._scheduled = threading.Lock()
+        self._started = False
+        super().__init__(*args, **kwargs)
+
+    def _create_actor_inbox(self):
+        return _PooledInbox(self, super()._create_actor_inbox())
+
+    def _get_dispatcher(self):
+        return self.dispatcher or Dispatcher.default()
+
+    def _schedule(self):
+        self._get_dispatcher().schedule(self)
+
+    def _start_actor_loop(self):
+        # 第一次被调度时先执行 on_start.
+        self._schedule()
+
+    def _process_inbox(self, throughput):
+        """
+        worker 线程调用: 最多处理 throughput 封信件.
+        相当于 ``_actor_loop`` 的一小段.
+        """
+        if not self._started:
+            self._started = True
+            self._handle_start()
+
+        # 和 _actor_loop 一样按 inbox_batch_size 分批取信件.
+        inbox = self.actor_inbox._inbox
+        processed = 0
+        while processed < throughput and not self.actor_stopped.is_set():
+            limit = min(self.inbox_batch_size, throughput - processed)
+            envelopes = _get_batch(inbox, [], max(limit, 1))
+            if not envelopes:
+                break
+            processed += len(envelopes)
+            if self.inbox_batch_size > 1:
+                self._handle_envelopes(envelopes)
+            else:
+                self._handle_envelope(envelopes[0])
+
+        if self.actor_stopped.is_set():
+            self._handle_leftovers()
@@ -0,0 +1,493 @@
+"""
+持久信箱: 信件先追加到磁盘上的日志, actor 所在的进程挂了, 重启以后接着处理没处理完的信件.
+
+ThreadingActor 的信箱是内存里的 ``queue.Queue``, 进程一退出积压的信件就没了.
+:class:`DurableActor` 的信箱(:class:`DurableInbox`)在 put 的时候把信件追加到
+:class:`SegmentLog`, 取下一封信件的时候确认(ack)上一封已经处理完::
+
+    class Resolver(DurableActor):
+        inbox_path = 'data/resolver-inbox'
+        inbox_fsync_interval = 0.01
+
+    ref = Resolver.start()      # 目录里有还没确认的信件, 先重新投递它们
+    ref.tell('8.8.8.8')         # 返回的时候信件已经 msync 到磁盘
+
+SegmentLog:
+    - 目录里一串固定大小的段文件(mmap), 文件名是段里第一条记录的编号.
+    - 记录: 头(长度, crc32, 编号) + 数据. 先写数据再写头, 写了一半的记录 crc
+      对不上, 重新打开的时候从那里截断.
+    - group commit: 后台线程把写过的范围 msync 到磁盘, 两次之间至少隔
+      ``fsync_interval`` 秒, 这段时间里所有的 append 共用下一次 msync.
+
+持久化的范围:
+    - 写进日志的是 ``message`` 和 ``priority``. 回复的 future 只在内存里,
+      重放的信件没有人等回复.
+    - 停止消息不写日志. 停止以后还没处理的信件不确认, 下次启动重新投递.
+    - 至少一次(at-least-once): 处理完但是还没确认就挂了, 那封信件会再处理一次.
+    - 信件用 :data:`codec.default_codec` 编码, 不能 pickle 的信件 tell/ask 直接抛错.
+    - mmap 写进去的数据在内核的页缓存里, 进程崩溃不会丢. ``fsync_interval``
+      防的是掉电和内核崩溃, None 表示不主动 msync(tell 也不用等).
+"""
+import collections
+import fcntl
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from pykka import ActorDeadError
+
+from .codec import default_codec
+from .envelope import Envelope, ProxyCallEnvelope
+from .inbox import _is_system_envelope
+from .messages import ProxyCall, _ActorStop
+from .threading import ThreadingActor
+
+__all__ = ['DurableActor', 'DurableInbox', 'SegmentLog']
+
+# 记录头: 数据长度, crc32(编号 + 数据), 编号. 编号从 1 开始, 全 0 的头表示后面没有记录了.
+_RECORD = struct.Struct('!IIQ')
+_SEQ = struct.Struct('!Q')
+_SUFFIX = '.seg'
+
+
+def _crc(seq, payload):
+    return zlib.crc32(payload, zlib.crc32(_SEQ.pack(seq)))
+
+
+def _scan(buf, first_seq):
+    """
+    从段的开头按顺序读记录, 遇到空的头, 编号不连续或者 crc 对不上(写了一半)就停.
+    yield (编号, 数据开始的位置, 数据结束的位置).
+    """
+    size = len(buf)
+    offset = 0
+    expected = first_seq
+    while offset + _RECORD.size <= size:
+        length, crc, seq = _RECORD.unpack_from(buf, offset)
+        start = offset + _RECORD.size
+        end = start + length
+        if seq != expected or end > size or _crc(seq, buf[start:end]) != crc:
+            return
+        yield seq, start, end
+        expected += 1
+        offset = end
+
+
+class _Segment:
+    """一个段文件. 只有正在写(或者还没 msync 完)的段打开着 ``map``."""
+
+    __slots__ = ['path', 'first_seq', 'size', 'end', 'synced_end', 'file', 'map']
+
+    def __init__(self, path, first_seq):
+        self.path = path
+        self.first_seq = first_seq
+        self.size = None
+        #: 已经写入的字节数, None 表示不知道(打开之前就写完的段)
+        self.end = None
+        self.synced_end = 0
+        self.file = None
+        self.map = None
+
+    def create(self, size):
+        self.file = open(self.path, 'xb+')
+        self.file.truncate(size)
+        self.size = size
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.end = self.synced_end = 0
+
+    def open(self, default_size):
+        """打开最后一个段接着写, 返回里面最后一条记录的编号."""
+        self.file = open(self.path, 'rb+')
+        size = os.fstat(self.file.fileno()).st_size
+        if size < _RECORD.size:
+            # 创建了文件还没来得及设大小.
+            size = default_size
+            self.file.truncate(size)
+        self.size = size
+        self.map = mmap.mmap(self.file.fileno(), size)
+        end = 0
+        last_seq = self.first_seq - 1
+        for last_seq, _, end in _scan(self.map, self.first_seq):
+            pass
+        if any(self.map[end:end + _RECORD.size]):
+            # 写了一半的记录, 清掉, 免得后面的记录接在垃圾后面.
+            self.map[end:] = bytes(size - end)
+        self.end = self.synced_end = end
+        return last_seq
+
+    def flush(self, start, end):
+        if end > start:
+            offset = start - start % mmap.ALLOCATIONGRANULARITY
+            self.map.flush(offset, end - offset)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+            self.map = self.file = None
+
+
+class SegmentLog:
+    """
+    追加写的日志, 记录的编号从 1 开始连续递增.
+
+    :param directory: 段文件的目录, 不存在就创建. 同时只能被一个 SegmentLog 打开
+    :param segment_size: 段文件的大小(字节), 比它大的记录单独放一个够大的段
+    :param fsync_interval: 两次 msync 之间至少隔的秒数(group commit), None 不主动 msync
+    :param retention: :meth:`truncate` 的时候多保留几个已经用不到的段
+
+    :attr:`stats`: ``records`` 追加的记录数, ``syncs`` msync 的次数.
+    """
+
+    def __init__(self, directory, segment_size=16 * 1024 * 1024, fsync_interval=0.01,
+                 retention=0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        self.retention = retention
+        self.stats = {'records': 0, 'syncs': 0}
+        self._lock_file = open(os.path.join(directory, 'lock'), 'ab')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(f'{directory} is already opened by another log') from None
+
+        self._lock = threading.Lock()
+        # 后台线程等新记录, append 的调用方等 msync.
+        self._written = threading.Condition(self._lock)
+        self._synced = threading.Condition(self._lock)
+        self._flusher_waiting = False
+        self._closed = False
+        # 从旧到新, 最后一个是正在写的段.
+        self._segments = [
+            _Segment(os.path.join(directory, name), int(name[:-len(_SUFFIX)]))
+            for name in sorted(os.listdir(directory)) if name.endswith(_SUFFIX)
+        ]
+        # 换了段但是还没 msync 完的旧段.
+        self._retired = []
+        if self._segments:
+            self._next_seq = self._segments[-1].open(segment_size) + 1
+        else:
+            self._next_seq = 1
+            self._new_segment(segment_size)
+        self._synced_seq = self._next_seq - 1
+
+        self._flusher = None
+        if fsync_interval is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.name = 'SegmentLogFlusher'
+            self._flusher.start()
+
+    def __repr__(self):
+        return f"<SegmentLog {self.directory!r} next_seq={self._next_seq}>"
+
+    @property
+    def next_seq(self):
+        """下一条记录的编号."""
+        return self._next_seq
+
+    def _new_segment(self, size):
+        # 拿着 self._lock 调用(或者还在 __init__ 里).
+        path = os.path.join(self.directory, f'{self._next_seq:020d}{_SUFFIX}')
+        segment = _Segment(path, self._next_seq)
+        segment.create(size)
+        if self.fsync_interval is not None:
+            os.fsync(segment.file.fileno())
+            fd = os.open(self.directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self._segments.append(segment)
+
+    def append(self, payload):
+        """追加一条记录, 返回它的编号. 要等它写到磁盘用 :meth:`wait_synced`."""
+        length = len(payload)
+        with self._lock:
+            if self._closed:
+                raise ValueError('log is closed')
+            segment = self._segments[-1]
+            if segment.end + _RECORD.size + length > segment.size:
+                if self._flusher is None:
+                    segment.close()
+                else:
+                    self._retired.append(segment)
+                self._new_segment(max(self.segment_size, _RECORD.size + length))
+                segment = self._segments[-1]
+            seq = self._next_seq
+            start = segment.end + _RECORD.size
+            segment.map[start:start + length] = payload
+            _RECORD.pack_into(segment.map, segment.end, length, _crc(seq, payload), seq)
+            segment.end = start + length
+            self._next_seq = seq + 1
+            self.stats['records'] += 1
+            if self._flusher_waiting:
+                self._written.notify()
+        return seq
+
+    def wait_synced(self, seq, timeout=None):
+        """等编号 seq 及以前的记录 msync 完, 超时返回 False."""
+        if self._flusher is None:
+            return True
+        with self._lock:
+            return self._synced.wait_for(lambda: self._synced_seq >= seq, timeout)
+
+    def _flush_loop(self):
+        interval = self.fsync_interval
+        while True:
+            with self._lock:
+                while self._synced_seq == self._next_seq - 1 and not self._closed:
+                    self._flusher_waiting = True
+                    self._written.wait()
+                self._flusher_waiting = False
+                closed = self._closed
+                target = self._next_seq - 1
+                retired, self._retired = self._retired, []
+                ranges = [(s, s.synced_end, s.end) for s in retired + self._segments[-1:]]
+
+            started = time.monotonic()
+            for segment, start, end in ranges:
+                segment.flush(start, end)
+            for segment in retired:
+                segment.close()
+
+            with self._lock:
+                for segment, _, end in ranges:
+                    segment.synced_end = end
+                self._synced_seq = target
+                self.stats['syncs'] += 1
+                self._synced.notify_all()
+            if closed:
+                return
+            remaining = interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def replay(self, start_seq=1):
+        """按顺序 yield (编号, 数据), 从 start_seq 开始, 到调用时已经写入的最后一条."""
+        with self._lock:
+            segments = [(s.path, s.first_seq, s.end) for s in self._segments]
+        for i, (path, first_seq, end) in enumerate(segments):
+            if i + 1 < len(segments) and segments[i + 1][1] <= start_seq:
+                continue
+            with open(path, 'rb') as file:
+                data = file.read() if end is None else file.read(end)
+            for seq, start, stop in _scan(data, first_seq):
+                if seq >= start_seq:
+                    yield seq, data[start:stop]
+
+    def truncate(self, seq):
+        """
+        删掉记录编号都小于 seq 的段(正在写的段除外), 最新的 ``retention`` 个不删.
+        """
+        keep = self.retention
+        # 段列表在 append 换段的时候会变, 看它之前就要拿锁.
+        with self._lock:
+            segments = self._segments
+            if len(segments) < keep + 2 or segments[keep + 1].first_seq > seq:
+                return
+            count = 0
+            while count + 1 < len(segments) and segments[count + 1].first_seq <= seq:
+                count += 1
+            removed = segments[:count - keep]
+            del segments[:count - keep]
+        for segment in removed:
+            # 还没 msync 完的段由后台线程关掉, 这里只删文件.
+            os.unlink(segment.path)
+
+    def close(self):
+        """msync 剩下的记录, 关掉所有段. 重复调用没有影响."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._written.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+        for segment in self._retired + self._segments:
+            segment.close()
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+
+
+class DurableInbox:
+    """
+    信件先写进 :class:`SegmentLog` 再放进内存里的队列, 取信件的时候确认上一次取出的信件.
+
+    :param directory: 日志目录
+    :param segment_size: 见 :class:`SegmentLog`
+    :param fsync_interval: 见 :class:`SegmentLog`
+    :param retention: 见 :class:`SegmentLog`
+    :param wait_for_sync: put 要不要等信件 msync 完(``fsync_interval`` 不是 None 的时候)
+    :param codec: 信件的编码, 默认 :data:`codec.default_codec`
+
+    确认到的编号记在目录里的 ``ack`` 文件(mmap 的 8 个字节). 打开的时候编号比它大的
+    信件按顺序放回队列(没有 reply_to), :attr:`recovered` 是放回的数量.
+    """
+
+    def __init__(self, directory, segment_size=16 * 1024 * 1024, fsync_interval=0.01,
+                 retention=0, wait_for_sync=True, codec=None):
+        self.codec = codec or default_codec
+        self.wait_for_sync = wait_for_sync and fsync_interval is not None
+        self.log = SegmentLog(directory, segment_size, fsync_interval, retention)
+        self._ack_file = open(os.path.join(directory, 'ack'), 'ab+')
+        if os.fstat(self._ack_file.fileno()).st_size < _SEQ.size:
+            self._ack_file.truncate(_SEQ.size)
+        self._ack_map = mmap.mmap(self._ack_file.fileno(), _SEQ.size)
+        (self._acked,) = _SEQ.unpack_from(self._ack_map)
+
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        # 上次取出的信件里最大的编号, 下一次 get 的时候确认.
+        self._unacked = None
+        # 取出了停止消息, 后面的信件 actor 不会处理, 不再确认.
+        self._stopping = False
+        self._closed = False
+        for seq, payload in self.log.replay(self._acked + 1):
+            message, priority = self.codec.loads(payload)
+            self._items.append((seq, Envelope(message, priority=priority)))
+        self.recovered = len(self._items)
+
+    def put(self, item, block=True, timeout=None):
+        if _is_system_envelope(item):
+            seq = payload = None
+        else:
+            message = item.message
+            if isinstance(message, ProxyCallEnvelope):
+                # 信封和消息是同一个对象, 里面的 future 不能写进日志.
+                message = ProxyCall(message.attr_path, message.args, message.kwargs)
+            payload = self.codec.dumps((message, item.priority))
+        with self._lock:
+            if self._closed:
+                raise ActorDeadError('durable inbox is closed')
+            if payload is not None:
+                seq = self.log.append(payload)
+            self._items.append((seq, item))
+            self._not_empty.notify()
+        if seq is not None and self.wait_for_sync:
+            self.log.wait_synced(seq)
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def _ack(self):
+        # 拿着 self._lock 调用: 上次取出的信件已经处理完了.
+        if self._unacked is not None:
+            _SEQ.pack_into(self._ack_map, 0, self._unacked)
+            self._acked = self._unacked
+            self._unacked = None
+            self.log.truncate(self._acked + 1)
+
+    def _taken(self, seq, item):
+        if self._stopping:
+            return
+        if seq is not None:
+            self._unacked = seq
+        elif isinstance(item.message, _ActorStop):
+            self._stopping = True
+
+    def get(self, block=True, timeout=None):
+        with self._lock:
+            if not self._closed:
+                self._ack()
+            if not block:
+                if not self._items:
+                    raise queue.Empty
+            elif timeout is None:
+                while not self._items:
+                    self._not_empty.wait()
+            else:
+                deadline = time.monotonic() + timeout
+                while not self._items:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Empty
+                    self._not_empty.wait(remaining)
+            seq, item = self._items.popleft()
+            self._taken(seq, item)
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_batch(self, count):
+        with self._lock:
+            batch = []
+            while self._items and len(batch) < count:
+                seq, item = self._items.popleft()
+                self._taken(seq, item)
+                batch.append(item)
+            return batch
+
+    def close(self):
+        """
+        actor 停止了: 确认停止消息之前取出的信件, 关掉日志. 之后的 put 抛 ActorDeadError,
+        队列里剩下的信件留在日志里, 下次打开重新投递.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._ack()
+            self._closed = True
+        self.log.close()
+        if self.log.fsync_interval is not None:
+            self._ack_map.flush()
+        self._ack_map.close()
+        self._ack_file.close()
+
+    def empty(self):
+        return not self._items
+
+    def full(self):
+        return False
+
+    def qsize(self):
+        return len(self._items)
+
+
+class DurableActor(ThreadingActor):
+    """
+    信箱是 :class:`DurableInbox` 的 ThreadingActor.
+
+    ``inbox_path`` 必须设置. 同一个目录同时只能有一个 actor 在用,
+    再启动一个抛 RuntimeError. ``inbox_class`` / ``inbox_capacity`` 不起作用.
+    """
+
+    #: 信箱的日志目录.
+    inbox_path = None
+
+    #: 见 :class:`SegmentLog`.
+    inbox_segment_size = 16 * 1024 * 1024
+
+    #: 见 :class:`SegmentLog`, None 表示不主动 msync.
+    inbox_fsync_interval = 0.01
+
+    #: 见 :class:`SegmentLog`.
+    inbox_retention = 0
+
+    #: tell/ask 是否等信件 msync 到磁盘才返回.
+    inbox_wait_for_sync = True
+
+    @classmethod
+    def _create_actor_inbox(cls):
+        if cls.inbox_path is None:
+            raise ValueError(f'{cls.__name__}.inbox_path is not set')
+        return DurableInbox(
+            cls.inbox_path,
+            segment_size=cls.inbox_segment_size,
+            fsync_interval=cls.inbox_fsync_interval,
+            retention=cls.inbox_retention,
+            wait_for_sync=cls.inbox_wait_for_sync,
+        )
+
+    def _stop(self):
+        super()._stop()
+        # ActorRef.stop() 返回之前关掉, 同一个目录马上可以再启动.
+        self.actor_inbox.close()
@@ -2,6 +2,7 @@
 定义了信封特殊的数据结构体
 信封: 信封里面装有消息体.
 """
+from .messages import ProxyCall
 
 
 class Envelope:
@@ -11,14 +12,43 @@ class Envelope:
     :type message: any
     :param reply_to: the future to reply to if there is a response
     :type reply_to: :class:`pykka.Future`
+    :param priority: 优先级, 数字越小越先处理. 只有 :class:`inbox.PriorityInbox` 会用到.
+    :type priority: int
     """
 
-    __slots__ = ['message', 'reply_to']
+    __slots__ = ['message', 'reply_to', 'priority']
 
-    def __init__(self, message, reply_to=None):
+    def __init__(self, message, reply_to=None, priority=0):
         self.message = message
         # 把获得消息传递future（统一处理接收的信息）
         self.reply_to = reply_to
+        self.priority = priority
 
     def __repr__(self):
         return f"Envelope(message={self.message!r}, reply_to={self.reply_to!r})"
+
+
+class ProxyCallEnvelope(ProxyCall):
+    """
+    信封和 :class:`messages.ProxyCall` 合成一个对象, ``proxy.method()`` 每次调用
+    只分配一个对象. ``message`` 就是它自己, actor 那边和普通信封一样处理.
+    """
+
+    __slots__ = ['reply_to', 'priority']
+
+    def __init__(self, attr_path, args, kwargs, reply_to=None, priority=0):
+        self.attr_path = attr_path
+        self.args = args
+        self.kwargs = kwargs
+        self.reply_to = reply_to
+        self.priority = priority
+
+    @property
+    def message(self):
+        return self
+
+    def __repr__(self):
+        return (
+            f"ProxyCallEnvelope(attr_path={self.attr_path!r}, args={self.args!r}, "
+            f"kwargs={self.kwargs!r}, reply_to={self.reply_to!r})"
+        )
@@ -0,0 +1,46 @@
+"""
+plain_actor.py 的 PlainActor 改成事件溯源: 再次运行, 上次存的消息还在.
+
+"""
+import os
+import tempfile
+
+from actor_model.chapter06.persistence import EventSourcedActor
+
+GetMessages = object()  # 哨兵flag
+
+
+class PlainActor(EventSourcedActor):
+    persistence_path = os.path.join(tempfile.gettempdir(), 'plain_actor')
+    snapshot_every = 100
+
+    def __init__(self):
+        super().__init__()
+        self.stored_messages = []
+
+    def on_receive(self, message):
+        """
+        发送的消息先写成事件, 再存起来
+        """
+        if message is GetMessages:
+            return self.stored_messages
+        else:
+            self.persist(message)
+
+    def apply_event(self, event):
+        self.stored_messages.append(event)
+
+    def snapshot_state(self):
+        return self.stored_messages
+
+    def restore_state(self, state):
+        self.stored_messages = state
+
+
+if __name__ == "__main__":
+
+    actor_ref = PlainActor.start()
+    actor_ref.tell({'no': 'Norway', 'se': 'Sweden'})
+    actor_ref.tell({'a': 3, 'b': 4, 'c': 5})
+    print(actor_ref.ask(GetMessages))
+    actor_ref.stop()
@@ -6,8 +6,8 @@ Resolve a bunch of IP addresses using a pool of resolver actors.
 import pprint
 import socket
 
-from actor_model.chapter06.actor_register import ActorRegistry
-from actor_model.chapter06.future import get_all
+from actor_model.chapter06.future import as_completed
+from actor_model.chapter06.routing import Router
 from actor_model.chapter06.threading import ThreadingActor
 
 
@@ -23,20 +23,25 @@ class Resolver(ThreadingActor):
 
 
 def run(pool_size, *ips):
-    # Start resolvers 创建50个actor（其实就是50个线程）
-    resolvers = [Resolver.start().proxy() for _ in range(pool_size)]
+    # Start resolvers 创建 pool_size 个actor（其实就是 pool_size 个线程）
+    # 交给信箱积压最少的 resolver, 慢的 resolver 不会拖住后面的 ip.
+    resolvers = Router.start(Resolver, pool_size, strategy='smallest_mailbox')
+    resolve = resolvers.proxy().resolve
 
     # Distribute work by mapping IPs to resolvers (not blocking)
-    hosts = []
-    for i, ip in enumerate(ips):
-        hosts.append(resolvers[i % len(resolvers)].resolve(ip))
+    # 分成小组, 一组只发一封信件(map), 回来一个结果列表.
+    chunks = [ips[i:i + 5] for i in range(0, len(ips), 5)]
+    batches = [resolve.map(chunk) for chunk in chunks]
 
-    # Gather results (blocking) # 聚合结果
-    ip_to_host = zip(ips, get_all(hosts))
-    pprint.pprint(list(ip_to_host))
+    # Gather results (blocking) # 聚合结果, 谁先解析完先拿谁, 总共最多等 60 秒
+    chunk_of = dict(zip(batches, chunks))
+    ip_to_host = {}
+    for future in as_completed(batches, timeout=60):
+        ip_to_host.update(zip(chunk_of[future], future.get()))
+    pprint.pprint([(ip, ip_to_host[ip]) for ip in ips])
 
     # Clean up
-    ActorRegistry.stop_all()
+    resolvers.stop()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-__all__ = ['ActorDeadError', 'Timeout']
+__all__ = ['ActorDeadError', 'BatchAborted', 'MailboxFull', 'Timeout']
 
 
 class ActorDeadError(Exception):
@@ -7,6 +7,18 @@ class ActorDeadError(Exception):
     pass
 
 
+class BatchAborted(Exception):
+    """Exception raised by the futures of a proxy batch that was never sent."""
+
+    pass
+
+
+class MailboxFull(Exception):
+    """Exception raised when a bounded actor inbox rejects a message."""
+
+    pass
+
+
 class Timeout(Exception):
     """Exception raised at future timeout."""
 
@@ -1,11 +1,42 @@
+import collections
 import functools
+import queue
+import threading
+import time
+
+from .exceptions import Timeout
 """
 actor.ask()
 future 期望(将来的值)
 Typically returned by calls to actor methods or accesses to actor fields.
 调到actor方法或属性访问
+
+map/filter/reduce/join 组合出来的 future 通过 add_done_callback 传递结果:
+源 future 完成的时候(在完成它的 actor 线程里)马上算出结果并 set,
+不需要调用方的线程一层层 get() 阻塞等待.
+
+等多个 future: :func:`get_all`, :func:`wait`, :func:`wait_any`, :func:`as_completed`.
+它们共用一个 deadline, 所有 future 的回调都投递到同一个队列上唤醒调用方,
+不轮询.
 """
 
+__all__ = [
+    'ALL_COMPLETED', 'FIRST_COMPLETED', 'FIRST_EXCEPTION', 'Future',
+    'as_completed', 'get_all', 'wait', 'wait_any',
+]
+
+#: :func:`wait` 的 return_when
+FIRST_COMPLETED = 'FIRST_COMPLETED'
+FIRST_EXCEPTION = 'FIRST_EXCEPTION'
+ALL_COMPLETED = 'ALL_COMPLETED'
+
+# 只在第一次 add_done_callback 时用来创建回调队列.
+_callbacks_lock = threading.Lock()
+
+# 回调里完成的 future 不递归调用自己的回调, 排到当前线程的队列里,
+# 上千层的 map 链也不会超过递归深度.
+_callbacks_local = threading.local()
+
 
 def await_dunder_future(self):
     yield
@@ -19,11 +50,15 @@ class Future:
     available in the future.
     """
 
+    # 每次 ask() 都会创建 future, 用 __slots__ 省掉实例的 __dict__.
+    __slots__ = ['_get_hook', '_get_hook_result', '_callbacks']
+
     def __init__(self):
         # todo ? why super
         super(Future, self).__init__()
         self._get_hook = None
         self._get_hook_result = None
+        self._callbacks = None
 
     def get(self, timeout=None):
         if self._get_hook is not None:
@@ -51,36 +86,236 @@ class Future:
         """
         self._get_hook = func
 
-    def filter(self, func):
+    def _is_done(self):
+        """子类实现: set/set_exception 之后返回 True."""
+        raise NotImplementedError
+
+    def add_done_callback(self, func):
+        """
+        future 完成(set 或 set_exception)时调用 ``func(future)``.
+        已经完成的话马上在当前线程调用, 否则在完成它的线程(通常是 actor 线程)里调用.
+        回调里抛的异常会被忽略.
+
+        绑定了 get_hook 的 future 没有"完成"的时刻, 回调永远不会被调用.
+        """
+        if self._callbacks is None:
+            with _callbacks_lock:
+                if self._callbacks is None:
+                    self._callbacks = collections.deque()
+        self._callbacks.append(func)
+        if self._is_done():
+            # set() 可能已经跑完了回调, 自己再跑一次剩下的.
+            self._run_callbacks()
+
+    def remove_done_callback(self, func):
+        """去掉还没被调用的回调 ``func``(按 ``==`` 比较), 没有就什么也不做."""
+        callbacks = self._callbacks
+        if callbacks is not None:
+            try:
+                callbacks.remove(func)
+            except ValueError:
+                pass
+
+    def _run_callbacks(self):
+        """
+        子类在 set/set_exception 之后调用.
+        """
+        if not self._callbacks:
+            return
+        pending = getattr(_callbacks_local, 'pending', None)
+        if pending is not None:
+            # 已经在跑回调了(嵌套), 交给外层的循环.
+            pending.append(self)
+            return
+        _callbacks_local.pending = pending = collections.deque([self])
+        try:
+            while pending:
+                pending.popleft()._drain_callbacks()
+        finally:
+            _callbacks_local.pending = None
+
+    def _drain_callbacks(self):
+        """
+        popleft 是原子的, set 的线程和 add_done_callback 的线程同时跑,
+        每个回调也只会被调用一次.
+        """
+        callbacks = self._callbacks
+        while True:
+            try:
+                func = callbacks.popleft()
+            except IndexError:
+                return
+            try:
+                func(self)
+            except Exception:
+                pass
+
+    def _compose(self, func):
+        """
+        返回一个新的 future, 本 future 完成时用 ``func(value)`` 完成它.
+        本 future 的异常(或者 func 抛的异常)会传给新的 future.
+        """
         future = self.__class__()
-        future.set_get_hook(
-            lambda timeout: list(filter(func, self.get(timeout)))
-        )
+        if self._get_hook is not None:
+            # get_hook 的结果只能在 get() 的时候算.
+            future.set_get_hook(lambda timeout: func(self.get(timeout)))
+            return future
+
+        def on_done(source):
+            try:
+                value = func(source.get(timeout=0))
+            except Exception:
+                future.set_exception()
+            else:
+                future.set(value)
+
+        self.add_done_callback(on_done)
         return future
 
+    def filter(self, func):
+        return self._compose(lambda value: list(filter(func, value)))
+
     def join(self, *futures):
+        futures = [self] + list(futures)
         future = self.__class__()
-        future.set_get_hook(
-            lambda timeout: [f.get(timeout) for f in [self] + list(futures)]
-        )
+        if any(f._get_hook is not None for f in futures):
+            future.set_get_hook(
+                lambda timeout: [f.get(timeout) for f in futures]
+            )
+            return future
+
+        results = [None] * len(futures)
+        state = {'remaining': len(futures), 'failed': False}
+        lock = threading.Lock()
+
+        def on_done(index, source):
+            try:
+                value = source.get(timeout=0)
+            except Exception:
+                with lock:
+                    if state['failed']:
+                        return
+                    state['failed'] = True
+                future.set_exception()
+                return
+            with lock:
+                results[index] = value
+                state['remaining'] -= 1
+                finished = state['remaining'] == 0 and not state['failed']
+            if finished:
+                future.set(results)
+
+        for index, f in enumerate(futures):
+            f.add_done_callback(functools.partial(on_done, index))
         return future
 
     def map(self, func):
         #  实例化类
-        future = self.__class__()
-        future.set_get_hook(lambda timeout: func(self.get(timeout)))
-        return future
+        return self._compose(func)
 
     def reduce(self, func, *args):
-        future = self.__class__()
-        future.set_get_hook(
-            lambda timeout: functools.reduce(func, self.get(timeout), *args)
-        )
-        return future
+        return self._compose(lambda value: functools.reduce(func, value, *args))
 
     __await__ = await_dunder_future
     __iter__ = __await__
 
 
+def _deadline(timeout):
+    return None if timeout is None else time.monotonic() + timeout
+
+
+def _remaining(deadline):
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0)
+
+
+def _failed(future):
+    """已经完成的 future 是不是以异常结束."""
+    if future._get_hook is not None:
+        return False
+    try:
+        future.get(timeout=0)
+    except Exception:
+        return True
+    return False
+
+
 def get_all(futures, timeout=None):
-    return [future.get(timeout=timeout) for future in futures]
+    """
+    按顺序取出所有 future 的结果.
+    timeout 是所有 future 共用的总时间, 不是每个 future 各等 timeout 秒.
+    """
+    deadline = _deadline(timeout)
+    return [future.get(timeout=_remaining(deadline)) for future in futures]
+
+
+def as_completed(futures, timeout=None):
+    """
+    按完成的先后顺序 yield future, 先完成的先拿到.
+    超过 timeout 秒还有没完成的 future, 抛 :class:`Timeout`.
+
+    绑定了 get_hook 的 future 没有完成的时刻, 放在最后 yield.
+    在 asyncio 的 loop 线程里不能用(会阻塞 loop), 用 ``asyncio.as_completed``.
+    """
+    deadline = _deadline(timeout)
+    futures = list(dict.fromkeys(futures))
+    hooked = [f for f in futures if f._get_hook is not None]
+    waiting = [f for f in futures if f._get_hook is None]
+    # 所有 future 的回调都投到这一个队列, 调用方只在它上面等.
+    done = queue.SimpleQueue()
+    callback = done.put
+    for future in waiting:
+        future.add_done_callback(callback)
+    try:
+        for _ in range(len(waiting)):
+            try:
+                yield done.get(timeout=_remaining(deadline))
+            except queue.Empty:
+                raise Timeout('{} seconds'.format(timeout))
+    finally:
+        # 超时或者提前不迭代了(wait_any), 回调不能留在还没完成的 future 上,
+        # 否则反复等同一个长期的 future 会越积越多.
+        for future in waiting:
+            future.remove_done_callback(callback)
+    yield from hooked
+
+
+def wait(futures, timeout=None, return_when=ALL_COMPLETED):
+    """
+    等到 return_when 满足或者超时, 不抛 Timeout.
+    :param return_when: :data:`FIRST_COMPLETED`, :data:`FIRST_EXCEPTION` 或 :data:`ALL_COMPLETED`
+    :return: (done, not_done) 两个 set, done 里是返回时所有已经完成的 future
+    """
+    if return_when not in (FIRST_COMPLETED, FIRST_EXCEPTION, ALL_COMPLETED):
+        raise ValueError('unknown return_when {!r}'.format(return_when))
+    futures = set(futures)
+    done = set()
+    completed = as_completed(futures, timeout=timeout)
+    try:
+        for future in completed:
+            done.add(future)
+            if return_when == FIRST_COMPLETED:
+                break
+            if return_when == FIRST_EXCEPTION and _failed(future):
+                break
+    except Timeout:
+        pass
+    finally:
+        completed.close()
+    done.update(f for f in futures if f._get_hook is None and f._is_done())
+    return done, futures - done
+
+
+def wait_any(futures, timeout=None):
+    """
+    返回最先完成的 future, 超时抛 :class:`Timeout`.
+    """
+    futures = list(futures)
+    if not futures:
+        raise ValueError('wait_any() needs at least one future')
+    completed = as_completed(futures, timeout=timeout)
+    try:
+        return next(completed)
+    finally:
+        completed.close()
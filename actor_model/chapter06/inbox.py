@@ -0,0 +1,323 @@
+"""
+信箱(inbox)的实现.
+
+默认的信箱是 ``queue.Queue``: 有 maxsize 记账, 三个 Condition, 还有
+``task_done`` 计数, actor 都用不到. actor 的信箱是多生产者/单消费者(MPSC)的,
+可以用更轻的实现. 按 actor 类选择::
+
+    class Worker(ThreadingActor):
+        inbox_class = MPSCInbox
+
+信箱只需要实现 ``queue.Queue`` 里 actor 用到的那几个方法:
+put, get, get_nowait, empty, qsize, 可选的 get_batch(count).
+
+有容量限制的信箱(:class:`BoundedInbox`)用 ``inbox_capacity`` 打开,
+满了以后按 ``inbox_overflow`` 策略处理(背压)::
+
+    class Resolver(ThreadingActor):
+        inbox_capacity = 1000
+        inbox_overflow = 'block'
+        inbox_put_timeout = 5
+
+优先级信箱(:class:`PriorityInbox`)让停止消息和紧急请求插队::
+
+    class Resolver(ThreadingActor):
+        inbox_class = PriorityInbox
+
+    ref.tell(message, priority=-10)   # 数字越小越先处理
+"""
+import collections
+import heapq
+import itertools
+import queue
+import sys
+import threading
+import time
+
+from .exceptions import MailboxFull
+from .messages import _ActorStop
+
+__all__ = [
+    'BoundedInbox', 'MPSCInbox', 'OVERFLOW_POLICIES', 'PriorityInbox', 'SYSTEM_PRIORITY'
+]
+
+#: 信箱满了的处理策略:
+#: block -- 发送方等待, 等到 put_timeout 还是满的就抛 MailboxFull
+#: drop_newest -- 丢掉新来的信件
+#: drop_oldest -- 丢掉最早的信件, 给新信件腾位置
+#: raise -- 直接抛 MailboxFull 给发送方
+OVERFLOW_POLICIES = ('block', 'drop_newest', 'drop_oldest', 'raise')
+
+#: 系统消息(停止)的优先级, 比任何用户指定的优先级都高.
+SYSTEM_PRIORITY = -sys.maxsize
+
+
+class MPSCInbox:
+    """
+    ``collections.deque`` + 一把锁做唤醒的 multi-producer/single-consumer 信箱.
+
+    - put: deque.append 本身是原子的; 只有消费者在等的时候才去释放锁唤醒它.
+    - get: 只能有一个消费者线程(actor 自己).
+
+    唤醒用的锁平时是锁住的, 消费者 ``acquire`` 就是在等;
+    生产者 ``release`` 就是唤醒. 多余的唤醒只会让消费者多检查一次 deque.
+    """
+
+    __slots__ = ['_items', '_waiting', '_wakeup']
+
+    def __init__(self):
+        self._items = collections.deque()
+        self._waiting = False
+        self._wakeup = threading.Lock()
+        self._wakeup.acquire()
+
+    def put(self, item, block=True, timeout=None):
+        self._items.append(item)
+        if self._waiting:
+            self._wake()
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    def _wake(self):
+        self._waiting = False
+        try:
+            self._wakeup.release()
+        except RuntimeError:
+            # 别的生产者已经唤醒过了.
+            pass
+
+    def get(self, block=True, timeout=None):
+        items = self._items
+        if items:
+            return items.popleft()
+        if not block:
+            raise queue.Empty
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # 先声明在等, 再检查一次, 避免错过检查之后才到的 put.
+            self._waiting = True
+            if items:
+                self._waiting = False
+                return items.popleft()
+            if deadline is None:
+                self._wakeup.acquire()
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._wakeup.acquire(timeout=remaining):
+                self._waiting = False
+                if items:
+                    return items.popleft()
+                raise queue.Empty
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_batch(self, count):
+        """不阻塞地取出最多 count 封信件."""
+        items = self._items
+        batch = []
+        while items and len(batch) < count:
+            batch.append(items.popleft())
+        return batch
+
+    def empty(self):
+        return not self._items
+
+    def full(self):
+        return False
+
+    def qsize(self):
+        return len(self._items)
+
+
+def _is_system_envelope(envelope):
+    """停止消息不受容量限制, 也不会被丢掉, 否则满了的 actor 就停不下来了."""
+    return isinstance(getattr(envelope, 'message', None), _ActorStop)
+
+
+def _reject(envelope, reason):
+    """被丢掉的信件如果有人在等回复(ask), 让它的 future 抛 MailboxFull."""
+    reply_to = getattr(envelope, 'reply_to', None)
+    if reply_to is not None:
+        exc = MailboxFull(reason)
+        reply_to.set_exception((MailboxFull, exc, None))
+
+
+class BoundedInbox:
+    """
+    有容量上限的信箱.
+
+    :param capacity: 最多容纳的信件数量(停止消息不算)
+    :param overflow: 满了的处理策略, 见 :data:`OVERFLOW_POLICIES`
+    :param put_timeout: ``block`` 策略下发送方最多等待的秒数, None 一直等
+
+    :attr:`stats` 记录每种策略触发的次数, ``block_timeout`` 是等待超时的次数,
+    通过 :meth:`ActorRef.inbox_stats` 读取.
+
+    Notes:
+        ``block`` 策略下 actor 给自己发消息, 自己的信箱又满了, 会一直等到超时.
+        ``drop_oldest`` 策略下信箱里只剩停止消息时没有可以丢的旧信件, 丢掉新来的这封.
+    """
+
+    def __init__(self, capacity, overflow='block', put_timeout=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                'overflow must be one of {}, not {!r}'.format(OVERFLOW_POLICIES, overflow)
+            )
+        self.capacity = capacity
+        self.overflow = overflow
+        self.put_timeout = put_timeout
+        self.stats = dict.fromkeys(OVERFLOW_POLICIES + ('block_timeout',), 0)
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def put(self, item, block=True, timeout=None):
+        rejected = None
+        with self._lock:
+            if len(self._items) >= self.capacity and not _is_system_envelope(item):
+                self.stats[self.overflow] += 1
+                if self.overflow == 'raise':
+                    raise MailboxFull('inbox is full ({})'.format(self.capacity))
+                elif self.overflow == 'drop_newest':
+                    rejected = item
+                elif self.overflow == 'drop_oldest':
+                    rejected = self._pop_oldest()
+                    if rejected is None:
+                        # 只有停止消息, 不能超过容量.
+                        rejected = item
+                elif not block:
+                    self._wait_not_full(0)
+                else:
+                    self._wait_not_full(timeout if timeout is not None else self.put_timeout)
+            if rejected is not item:
+                self._items.append(item)
+                self._not_empty.notify()
+        if rejected is not None:
+            _reject(rejected, 'dropped by {} policy'.format(self.overflow))
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def _wait_not_full(self, timeout):
+        # 拿着 self._lock 调用.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self._items) >= self.capacity:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                self.stats['block_timeout'] += 1
+                raise MailboxFull('inbox is full ({}) after {} seconds'.format(
+                    self.capacity, timeout))
+            self._not_full.wait(remaining)
+
+    def _pop_oldest(self):
+        # 拿着 self._lock 调用, 跳过停止消息.
+        for i, envelope in enumerate(self._items):
+            if not _is_system_envelope(envelope):
+                del self._items[i]
+                return envelope
+
+    def get(self, block=True, timeout=None):
+        with self._lock:
+            if not block:
+                if not self._items:
+                    raise queue.Empty
+            elif timeout is None:
+                while not self._items:
+                    self._not_empty.wait()
+            else:
+                deadline = time.monotonic() + timeout
+                while not self._items:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Empty
+                    self._not_empty.wait(remaining)
+            item = self._items.popleft()
+            self._not_full.notify()
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_batch(self, count):
+        with self._lock:
+            batch = []
+            while self._items and len(batch) < count:
+                batch.append(self._items.popleft())
+            if batch:
+                self._not_full.notify(len(batch))
+            return batch
+
+    def empty(self):
+        return not self._items
+
+    def full(self):
+        return len(self._items) >= self.capacity
+
+    def qsize(self):
+        return len(self._items)
+
+
+class PriorityInbox:
+    """
+    按优先级出信的信箱, 数字越小越先处理, 同优先级先进先出.
+
+    停止消息固定用 :data:`SYSTEM_PRIORITY`, 不管信箱里积压了多少信件,
+    ``ActorRef.stop()`` 都是下一封被处理的. 其他信件用 ``Envelope.priority``
+    (``tell(message, priority=...)``).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+
+    def put(self, item, block=True, timeout=None):
+        if _is_system_envelope(item):
+            priority = SYSTEM_PRIORITY
+        else:
+            priority = getattr(item, 'priority', 0)
+        with self._lock:
+            heapq.heappush(self._heap, (priority, next(self._seq), item))
+            self._not_empty.notify()
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    def get(self, block=True, timeout=None):
+        with self._lock:
+            if not block:
+                if not self._heap:
+                    raise queue.Empty
+            elif timeout is None:
+                while not self._heap:
+                    self._not_empty.wait()
+            else:
+                deadline = time.monotonic() + timeout
+                while not self._heap:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Empty
+                    self._not_empty.wait(remaining)
+            return heapq.heappop(self._heap)[2]
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_batch(self, count):
+        with self._lock:
+            heap = self._heap
+            return [heapq.heappop(heap)[2] for _ in range(min(count, len(heap)))]
+
+    def empty(self):
+        return not self._heap
+
+    def full(self):
+        return False
+
+    def qsize(self):
+        return len(self._heap)
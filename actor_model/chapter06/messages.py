@@ -1,16 +1,37 @@
 """
 信封封装的消息体messages.
 actor 其中有一条规则, actor可以修改自身属性和方法调用.
+
+代理消息每次方法调用都会创建, 都用 ``__slots__``, 没有实例 ``__dict__``.
 """
 
 from dataclasses import dataclass
 
-from typing import Any, Sequence, Tuple, Dict
+from typing import Any, List, Sequence, Tuple, Dict
+
+
+# attr_path -> 同一个 tuple 对象, 见 _intern_attr_path. 有上限, 满了以后的新路径不再共用.
+_attr_paths = {}
+_ATTR_PATH_CACHE_SIZE = 4096
+
+
+def _intern_attr_path(attr_path):
+    """
+    同样的 attr_path 共用一个 tuple 对象, 消息里不会存一堆一样的 tuple,
+    actor 这边按 attr_path 查缓存时也能先比较 id.
+    只用于自省过的(存在的)路径; 动态生成的属性名很多时, 超过上限的原样返回.
+    """
+    interned = _attr_paths.get(attr_path)
+    if interned is not None:
+        return interned
+    if len(_attr_paths) < _ATTR_PATH_CACHE_SIZE:
+        return _attr_paths.setdefault(attr_path, attr_path)
+    return attr_path
 
 
 @dataclass
 class _ActorStop:
-    pass
+    __slots__ = ()
 
 
 @dataclass
@@ -21,6 +42,8 @@ class ProxyCall:
     """
     # the path from the actor to the method
     # nested method
+    __slots__ = ('attr_path', 'args', 'kwargs')
+
     attr_path: Sequence[str]  # 元组类型.
     args: Tuple[Any]
     kwargs: Dict[str, Any]
@@ -31,6 +54,8 @@ class ProxyGetAttr:
     """
      让actor返回属性值
     """
+    __slots__ = ('attr_path',)
+
     attr_path: Sequence[str]
 
 
@@ -40,10 +65,37 @@ class ProxySetAttr:
     让actor修改属性
     actor自身修改自身的属性值
     """
+    __slots__ = ('attr_path', 'value')
+
     attr_path: Sequence[str]
     value: Any
 
 
+@dataclass
+class ProxyBatchCall:
+    """
+    一封信件里装多个方法调用, actor 按顺序调用, 回复结果列表.
+    某个调用抛了异常, 它的位置上是 :class:`_BatchCallFailed`, 不影响其他调用.
+    """
+    __slots__ = ('calls',)
+
+    # [(attr_path, args, kwargs), ...]
+    calls: List[Tuple[Sequence[str], Tuple[Any], Dict[str, Any]]]
+
+
+@dataclass
+class _BatchCallFailed:
+    """ProxyBatchCall 里失败的调用的结果."""
+    __slots__ = ('exc_info',)
+
+    exc_info: Tuple[Any, Any, Any]
+
+    def __reduce__(self):
+        # traceback 不能 pickle(进程 actor 要把结果发回父进程), 去掉它.
+        exc_type, exc, _ = self.exc_info
+        return self.__class__, ((exc_type, exc, None),)
+
+
 def _upgrade_internal_message(message):
     """Filter that upgrades dict-based internal messages to the new format.
 
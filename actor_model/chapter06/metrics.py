@@ -0,0 +1,312 @@
+"""
+actor 的运行指标: 处理了多少信件, 每种消息的处理耗时, 信箱积压的最高值,
+信件在信箱里等了多久(入队到出队), 被吞掉的异常.
+
+按 actor 类打开::
+
+    class Resolver(ThreadingActor):
+        collect_metrics = True
+
+    ref.metrics()                    # 一个 actor
+    ActorRegistry.metrics(Resolver)  # 所有 Resolver 加在一起
+
+没打开的 actor 处理信件的路径和原来一样, 只有 ActorRef 发信件时多一次 None 判断.
+打开以后:
+    - 实例上的 ``_handle_envelope`` / ``_handle_envelope_run`` 换成计时的版本(:func:`instrument`).
+    - 信件数, 异常数每封都算(信件数是倒数计数, 每封只减一次). actor 每处理 ``metrics_sample_every`` 封信件,
+      ActorRef 就给下一封发出的信件记一次入队时间, 顺便看一眼信箱深度;
+      只有记了时间的信件才计时. 其他信件发送方只多看一次 ``sample_next``,
+      空的 on_receive 这样开销也不大.
+    - 直方图的 ``count`` 是采样数, ``max_depth`` 是采样到的深度的最高值
+      (``metrics_sample_every = 1`` 时每封都算).
+    - 耗时记在对数分桶的 :class:`Histogram` 里, 分位数是桶的上界(误差在 2 倍以内).
+
+代理调用按方法分开统计(``resolve()``), 其他消息按类型; 批量处理
+(``on_receive_batch``)整批算一次. 进程 actor 和远程 actor 的 ref 没有指标
+(actor 不在本进程).
+"""
+import queue
+import time
+
+from .messages import ProxyCall
+
+_clock = time.perf_counter
+
+__all__ = ['ActorMetrics', 'Histogram', 'aggregate', 'instrument']
+
+# 记了入队时间还没处理的信件最多这么多, 超过就清空(被丢掉的信件不会再出现).
+_MAX_STAMPS = 1024
+
+# 桶 i 放 [2**(i-1), 2**i) 微秒, 最后一个桶放所有更大的值(2**31 微秒约 36 分钟).
+_BUCKETS = 32
+
+
+class Histogram:
+    """耗时(秒)的对数分桶直方图, 按 2 的幂微秒分桶."""
+
+    __slots__ = ['counts', 'total', 'max']
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        index = int(seconds * 1000000).bit_length()
+        if index >= _BUCKETS:
+            index = _BUCKETS - 1
+        self.counts[index] += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for i, count in enumerate(list(other.counts)):
+            self.counts[i] += count
+        self.total += other.total
+        if other.max > self.max:
+            self.max = other.max
+
+    def percentile(self, p):
+        """第 p(0-1)分位所在桶的上界, 不超过 :attr:`max`."""
+        return _percentile(list(self.counts), self.max, p)
+
+    def summary(self):
+        # add() 在 actor 的线程里不拿锁地改, 先复制一份, 各项按同一份算.
+        counts, total, maximum = list(self.counts), self.total, self.max
+        count = sum(counts)
+        return {
+            'count': count,
+            'mean': total / count if count else 0.0,
+            'p50': _percentile(counts, maximum, 0.5),
+            'p90': _percentile(counts, maximum, 0.9),
+            'p99': _percentile(counts, maximum, 0.99),
+            'max': maximum,
+        }
+
+
+def _percentile(counts, maximum, p):
+    rank = sum(counts) * p
+    seen = 0
+    for i, count in enumerate(counts):
+        seen += count
+        if count and seen >= rank:
+            return min((1 << i) / 1000000, maximum)
+    return maximum
+
+
+def _depth_function(inbox):
+    if isinstance(inbox, queue.Queue):
+        # qsize() 要拿锁, 直接看底下的 deque.
+        return inbox.queue.__len__
+    return inbox.qsize
+
+
+def _key_name(key):
+    if isinstance(key, tuple):
+        return '.'.join(key) + '()'
+    return key.__name__
+
+
+class ActorMetrics:
+    """
+    一个 actor 的指标. 除了 :attr:`max_depth` (发送方更新) 都只在 actor 的线程里改.
+
+    :param inbox: actor 的信箱, 用来看深度
+    :param sample_every: 每处理多少封信件采样一次
+    """
+
+    __slots__ = [
+        'exceptions', 'exception_types', 'max_depth', 'queue_wait', 'handler_time',
+        'sample_every', 'sample_next', '_counted', '_countdown', '_stamps', '_depth',
+    ]
+
+    def __init__(self, inbox=None, sample_every=1):
+        #: 处理信件时被吞掉的异常数
+        self.exceptions = 0
+        #: 异常类型 -> 次数
+        self.exception_types = {}
+        #: 采样的信件发送时看到的信箱深度的最高值(包括刚放进去的这封)
+        self.max_depth = 0
+        #: 入队到开始处理的时间
+        self.queue_wait = Histogram()
+        #: 消息类型(代理调用是 attr_path) -> 处理耗时
+        self.handler_time = {}
+        self.sample_every = max(int(sample_every), 1)
+        # 信件数按 sample_every 一段一段地记: 记完的段的信件数, 这一段还差几封.
+        # 每封只减一次 _countdown, 不用每封都算 processed % sample_every.
+        self._counted = 0
+        self._countdown = self.sample_every
+        #: True 时发送方给下一封信件记入队时间(:meth:`enqueued`)
+        self.sample_next = True
+        # id(信封) -> (信封, 入队时间). ProxyCallEnvelope 不能 hash, 按 id 存,
+        # 留着信封本身, id 被新对象复用时不会认错.
+        self._stamps = {}
+        self._depth = _depth_function(inbox) if inbox is not None else None
+
+    @property
+    def processed(self):
+        """处理完的信件数(包括停止消息)"""
+        return self._counted + self.sample_every - self._countdown
+
+    def enqueued(self, envelope):
+        """
+        :attr:`sample_next` 为 True 时 ActorRef 放信件之前调用::
+
+            if metrics is not None and metrics.sample_next:
+                metrics.enqueued(envelope)
+        """
+        if self.sample_every > 1:
+            self.sample_next = False
+        stamps = self._stamps
+        if len(stamps) >= _MAX_STAMPS:
+            stamps.clear()
+        stamps[id(envelope)] = (envelope, _clock())
+        depth = self._depth() + 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def dequeued(self, envelope):
+        """
+        处理一封信件之前调用: 计数, 该采样时让发送方记下一封.
+        返回这封信件的入队时间, 没有采样是 None.
+        """
+        countdown = self._countdown - 1
+        if countdown:
+            self._countdown = countdown
+        else:
+            self._counted += self.sample_every
+            self._countdown = self.sample_every
+            self.sample_next = True
+        stamps = self._stamps
+        if stamps:
+            stamp = stamps.pop(id(envelope), None)
+            if stamp is not None and stamp[0] is envelope:
+                return stamp[1]
+        return None
+
+    def handled(self, envelope, enqueued_at, start, end):
+        """采样到的一封信件处理完了."""
+        self.queue_wait.add(start - enqueued_at)
+        message = envelope.message
+        key = message.attr_path if isinstance(message, ProxyCall) else type(message)
+        histogram = self.handler_time.get(key)
+        if histogram is None:
+            histogram = self.handler_time[key] = Histogram()
+        histogram.add(end - start)
+
+    def handled_run(self, envelopes, start, end):
+        """on_receive_batch 一次处理的一批信件, 整批计一次时, 不再采样."""
+        for envelope in envelopes:
+            enqueued_at = self.dequeued(envelope)
+            if enqueued_at is not None:
+                self.queue_wait.add(start - enqueued_at)
+        histogram = self.handler_time.get('on_receive_batch')
+        if histogram is None:
+            histogram = self.handler_time['on_receive_batch'] = Histogram()
+        histogram.add(end - start)
+
+    def swallowed(self, exc_type):
+        self.exceptions += 1
+        name = exc_type.__name__
+        self.exception_types[name] = self.exception_types.get(name, 0) + 1
+
+    def snapshot(self):
+        """现在的指标, 普通的 dict. 耗时的单位是秒."""
+        handler_time = {}
+        for key, histogram in list(self.handler_time.items()):
+            name = key if isinstance(key, str) else _key_name(key)
+            if name in handler_time:
+                # 不同模块里同名的消息类型.
+                merged = Histogram()
+                merged.merge(handler_time[name])
+                merged.merge(histogram)
+                histogram = merged
+            handler_time[name] = histogram
+        return {
+            'processed': self.processed,
+            'exceptions': self.exceptions,
+            'exception_types': dict(self.exception_types),
+            'depth': self._depth() if self._depth is not None else 0,
+            'max_depth': self.max_depth,
+            'queue_wait': self.queue_wait.summary(),
+            'handler_time': {
+                name: histogram.summary() for name, histogram in handler_time.items()
+            },
+        }
+
+
+def aggregate(metrics):
+    """
+    把多个 :class:`ActorMetrics` 加在一起, 返回和 :meth:`ActorMetrics.snapshot` 一样的 dict,
+    多一个 ``actors`` (actor 数). ``max_depth`` 取最大值, ``depth`` 求和.
+    """
+    total = ActorMetrics()
+    processed = depth = 0
+    handler_time = {}
+    for item in metrics:
+        processed += item.processed
+        total.exceptions += item.exceptions
+        for name, count in list(item.exception_types.items()):
+            total.exception_types[name] = total.exception_types.get(name, 0) + count
+        total.max_depth = max(total.max_depth, item.max_depth)
+        total.queue_wait.merge(item.queue_wait)
+        if item._depth is not None:
+            depth += item._depth()
+        for key, histogram in list(item.handler_time.items()):
+            name = key if isinstance(key, str) else _key_name(key)
+            if name not in handler_time:
+                handler_time[name] = Histogram()
+            handler_time[name].merge(histogram)
+    total.handler_time = handler_time
+    result = total.snapshot()
+    result['processed'] = processed
+    result['depth'] = depth
+    result['actors'] = len(metrics)
+    return result
+
+
+def instrument(actor):
+    """
+    给 actor 实例装上 :class:`ActorMetrics`: 实例上的 ``_handle_envelope`` /
+    ``_handle_envelope_run`` 换成计时的版本, 子类覆盖的方法照样被调用.
+    """
+    metrics = actor.actor_metrics = ActorMetrics(
+        actor.actor_inbox, actor.metrics_sample_every
+    )
+    handle_envelope = actor._handle_envelope
+    handle_envelope_run = actor._handle_envelope_run
+    sample_every = metrics.sample_every
+    stamps = metrics._stamps
+    clock = _clock
+
+    def _handle_envelope(envelope):
+        # 和 dequeued() 一样, 写在这里省一次方法调用.
+        countdown = metrics._countdown - 1
+        if countdown:
+            metrics._countdown = countdown
+        else:
+            metrics._counted += sample_every
+            metrics._countdown = sample_every
+            metrics.sample_next = True
+        if stamps:
+            stamp = stamps.pop(id(envelope), None)
+            if stamp is not None and stamp[0] is envelope:
+                start = clock()
+                try:
+                    handle_envelope(envelope)
+                finally:
+                    metrics.handled(envelope, stamp[1], start, clock())
+                return
+        handle_envelope(envelope)
+
+    def _handle_envelope_run(envelopes):
+        start = clock()
+        try:
+            handle_envelope_run(envelopes)
+        finally:
+            metrics.handled_run(envelopes, start, clock())
+
+    actor._handle_envelope = _handle_envelope
+    actor._handle_envelope_run = _handle_envelope_run
+    return metrics
@@ -0,0 +1,293 @@
+"""
+事件溯源(event sourcing)的 actor: 状态的每次变化先写成事件, 崩溃以后用事件重建状态.
+
+像 ``examples/plain_actor.py`` 的 ``PlainActor.stored_messages`` 这样的状态只在内存里,
+进程一挂就没了. :class:`EventSourcedActor` 处理信件的时候调用 :meth:`~EventSourcedActor.persist`,
+事件追加到 :class:`durable.SegmentLog`, 再交给 ``apply_event`` 改状态::
+
+    class Store(EventSourcedActor):
+        persistence_path = 'data/store'
+        snapshot_every = 1000
+
+        def __init__(self):
+            super().__init__()
+            self.stored_messages = []
+
+        def on_receive(self, message):
+            if message is GetMessages:
+                return self.stored_messages
+            self.persist(message)
+
+        def apply_event(self, event):
+            self.stored_messages.append(event)
+
+        def snapshot_state(self):
+            return self.stored_messages
+
+        def restore_state(self, state):
+            self.stored_messages = state
+
+快照:
+    - 每 ``snapshot_every`` 个事件或者每 ``snapshot_interval`` 秒(有新事件的时候)做一次.
+    - ``snapshot_state()`` 在 actor 的线程里调用并马上编码, 状态是一致的;
+      写文件, fsync 和删旧日志在后台线程里做. 上一次还没写完就等下一个事件再试.
+    - 后台写快照失败: 之前的快照和日志原样留着, 异常记在 ``snapshot_error``
+      (打开了指标的话也算进 ``exceptions``), 下一个事件再做一次快照.
+    - 快照写好以后, 日志里它之前的段会被删掉(见 ``event_retention``).
+
+恢复在 ``start()`` 里做(调用方的线程, 出错直接抛出来): 读最新的完好的快照,
+再按顺序 ``apply_event`` 快照之后的事件. 然后才开始处理信件.
+"""
+import os
+import struct
+import threading
+import time
+import zlib
+
+from .actor_register import ActorRegistry
+from .codec import default_codec
+from .durable import SegmentLog
+from .threading import ThreadingActor
+
+__all__ = ['EventSourcedActor']
+
+# 快照文件头: 最后一个事件的编号, 数据长度, crc32.
+_SNAPSHOT = struct.Struct('!QII')
+_SNAPSHOT_SUFFIX = '.snapshot'
+
+
+def _fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _read_snapshot(path):
+    """返回 (编号, 数据), 文件不完整返回 None."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < _SNAPSHOT.size:
+        return None
+    seq, length, crc = _SNAPSHOT.unpack_from(data)
+    payload = data[_SNAPSHOT.size:_SNAPSHOT.size + length]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        return None
+    return seq, payload
+
+
+class EventSourcedActor(ThreadingActor):
+    """
+    状态由事件重建的 ThreadingActor. 子类实现 :meth:`apply_event`,
+    打开快照的话还要实现 :meth:`snapshot_state` / :meth:`restore_state`.
+
+    目录结构: ``persistence_path/events/`` 是事件日志, ``persistence_path/snapshots/`` 是快照.
+    同一个目录同时只能有一个 actor 在用.
+    """
+
+    #: 事件和快照的目录, 必须设置.
+    persistence_path = None
+
+    #: 每多少个事件做一次快照, None 表示不按个数.
+    snapshot_every = None
+
+    #: 距离上次快照多少秒(有新事件的时候)做一次快照, None 表示不按时间.
+    snapshot_interval = None
+
+    #: 保留几个快照, 最新的坏了还能用前一个.
+    snapshot_keep = 2
+
+    #: 快照和事件的编码.
+    persistence_codec = default_codec
+
+    #: 见 :class:`durable.SegmentLog`.
+    event_segment_size = 16 * 1024 * 1024
+
+    #: 见 :class:`durable.SegmentLog`, None 表示不主动 msync(进程崩溃不会丢, 掉电可能丢).
+    event_fsync_interval = 0.01
+
+    #: :meth:`persist` 是否等事件 msync 完再 apply_event.
+    event_wait_for_sync = False
+
+    #: 快照以后日志里多保留几个用不到的段.
+    event_retention = 0
+
+    #: 恢复时用的快照的事件编号, 0 表示没有快照.
+    recovered_snapshot_seq = 0
+
+    #: 恢复时快照之后重放的事件数.
+    recovered_events = 0
+
+    #: 上一次后台写快照抛出的异常, 之后写成功了就是 None.
+    snapshot_error = None
+
+    _event_log = None
+    _snapshot_thread = None
+    # 后台线程写快照失败的异常, 由 actor 的线程取走(记指标, 马上重试).
+    _snapshot_failure = None
+
+    def apply_event(self, event):
+        """用事件改状态. persist 和恢复的时候调用, 不能有别的副作用."""
+        raise NotImplementedError
+
+    def snapshot_state(self):
+        """返回可以编码的状态, 做快照时调用."""
+        raise NotImplementedError
+
+    def restore_state(self, state):
+        """用快照里的状态替换当前状态, 恢复时调用."""
+        raise NotImplementedError
+
+    def _start_actor_loop(self):
+        try:
+            self._recover()
+        except BaseException:
+            ActorRegistry.unregister(self.actor_ref)
+            self.actor_stopped.set()
+            if self._event_log is not None:
+                self._event_log.close()
+            raise
+        super()._start_actor_loop()
+
+    def _recover(self):
+        if self.persistence_path is None:
+            raise ValueError(f'{self.__class__.__name__}.persistence_path is not set')
+        self._snapshot_dir = os.path.join(self.persistence_path, 'snapshots')
+        os.makedirs(self._snapshot_dir, exist_ok=True)
+        self._event_log = SegmentLog(
+            os.path.join(self.persistence_path, 'events'),
+            segment_size=self.event_segment_size,
+            fsync_interval=self.event_fsync_interval,
+            retention=self.event_retention,
+        )
+        codec = self.persistence_codec
+        seq = 0
+        for path in reversed(self._snapshot_paths()):
+            snapshot = _read_snapshot(path)
+            if snapshot is not None:
+                seq, payload = snapshot
+                self.restore_state(codec.loads(payload))
+                break
+        self.recovered_snapshot_seq = seq
+        count = 0
+        for _, payload in self._event_log.replay(seq + 1):
+            self.apply_event(codec.loads(payload))
+            count += 1
+        self.recovered_events = count
+        self._events_since_snapshot = count
+        self._last_snapshot_time = time.monotonic()
+
+    def _snapshot_paths(self):
+        directory = self._snapshot_dir
+        names = os.listdir(directory)
+        for name in names:
+            if name.endswith('.tmp'):
+                # 上次写了一半的快照.
+                os.unlink(os.path.join(directory, name))
+        return [
+            os.path.join(directory, name)
+            for name in sorted(names) if name.endswith(_SNAPSHOT_SUFFIX)
+        ]
+
+    def persist(self, event):
+        """
+        把事件写进日志, 再 :meth:`apply_event`. 在处理信件的时候(actor 的线程里)调用.
+        返回事件的编号.
+        """
+        log = self._event_log
+        seq = log.append(self.persistence_codec.dumps(event))
+        if self.event_wait_for_sync:
+            log.wait_synced(seq)
+        self.apply_event(event)
+        self._events_since_snapshot += 1
+        if self._snapshot_due():
+            self.snapshot(seq)
+        return seq
+
+    def _snapshot_due(self):
+        if self._snapshot_failure is not None:
+            # 上次没写成, 不用再等 snapshot_every 个事件.
+            return True
+        every = self.snapshot_every
+        if every is not None and self._events_since_snapshot >= every:
+            return True
+        interval = self.snapshot_interval
+        return (
+            interval is not None
+            and time.monotonic() - self._last_snapshot_time >= interval
+        )
+
+    def snapshot(self, seq=None):
+        """
+        马上做一次快照(后台写文件), 返回写快照的线程; 上一次还没写完返回 None.
+        seq 是状态包含到的最后一个事件编号, 默认是最新的事件.
+        """
+        thread = self._snapshot_thread
+        if thread is not None and thread.is_alive():
+            return None
+        self._take_snapshot_failure()
+        if seq is None:
+            seq = self._event_log.next_seq - 1
+        data = self.persistence_codec.dumps(self.snapshot_state())
+        self._events_since_snapshot = 0
+        self._last_snapshot_time = time.monotonic()
+        thread = self._snapshot_thread = threading.Thread(
+            target=self._write_snapshot, args=(seq, data), daemon=True
+        )
+        thread.name = f'{self.__class__.__name__}Snapshot'
+        thread.start()
+        return thread
+
+    def _take_snapshot_failure(self):
+        # actor 的线程里调用, 指标只在 actor 的线程里改.
+        failure, self._snapshot_failure = self._snapshot_failure, None
+        if failure is not None and self.actor_metrics is not None:
+            self.actor_metrics.swallowed(type(failure))
+
+    def _write_snapshot(self, seq, data):
+        try:
+            self._write_snapshot_file(seq, data)
+        except Exception as exc:
+            # 线程里的异常没人接, 记下来交给 actor 的线程. 旧快照在新的写好以后才删,
+            # 这时还都在.
+            self.snapshot_error = self._snapshot_failure = exc
+        else:
+            self.snapshot_error = None
+
+    def _write_snapshot_file(self, seq, data):
+        # 快照不能比它包含的事件先落盘, 否则掉电以后日志的编号会重复.
+        self._event_log.wait_synced(seq)
+        directory = self._snapshot_dir
+        path = os.path.join(directory, f'{seq:020d}{_SNAPSHOT_SUFFIX}')
+        tmp = path + '.tmp'
+        try:
+            with open(tmp, 'wb') as file:
+                file.write(_SNAPSHOT.pack(seq, len(data), zlib.crc32(data)))
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        _fsync_directory(directory)
+
+        paths = self._snapshot_paths()
+        keep = max(self.snapshot_keep, 1)
+        for old in paths[:-keep]:
+            os.unlink(old)
+        # 最老的那个快照之后的事件都要留着, 最新的快照坏了还能从它恢复.
+        oldest = os.path.basename(paths[-keep:][0])
+        self._event_log.truncate(int(oldest[:-len(_SNAPSHOT_SUFFIX)]) + 1)
+
+    def _stop(self):
+        super()._stop()
+        thread = self._snapshot_thread
+        if thread is not None:
+            thread.join()
+        self._take_snapshot_failure()
+        self._event_log.close()
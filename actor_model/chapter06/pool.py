@@ -0,0 +1,414 @@
+"""
+actor 池(pool).
+
+WorkStealingPool: 任务耗时不均匀时, 空闲的成员从别的成员信箱里"偷"任务.
+
+    pool = WorkStealingPool.start(Resolver, 10)
+    pool.proxy().resolve(ip)
+
+只有标记为 stateless 的信件可以被偷, 它们不要求按顺序处理, 也不依赖 actor 的状态:
+    - 方法用 :func:`stateless` 装饰, 通过 proxy 的调用都可以被偷
+    - ``pool.tell(message, stateless=True)`` / ``pool.ask(..., stateless=True)``
+其他信件(包括停止消息)留在分给的成员那里, 按顺序处理.
+
+Notes:
+    成员信箱不支持优先级和容量限制; 只支持 ThreadingActor.
+
+ElasticPool: 按信箱积压和 ask 的延迟, 在 min_size 和 max_size 之间增减成员.
+
+    pool = ElasticPool.start(Resolver, 2, max_size=32)
+
+扩容和缩容的条件中间留一段不动的区间, 还要连续满足若干次检查(滞后, hysteresis),
+突发的一两个尖峰不会让池来回抖动. 新成员 ``start()`` 时注册到 ActorRegistry,
+被缩掉的成员处理完积压的信件以后停止, 停止时注销.
+"""
+import collections
+import itertools
+import queue
+import threading
+import time
+
+from .envelope import Envelope, ProxyCallEnvelope
+from .routing import Router
+
+__all__ = ['ElasticPool', 'StealingInbox', 'WorkStealingPool', 'stateless']
+
+
+def stateless(func):
+    """
+    标记方法是无状态的: 调用之间没有顺序要求, 池里任何成员都可以处理.
+    """
+    func._pykka_stateless = True
+    return func
+
+
+class _Stateless:
+    """信件可以被其他成员偷走."""
+    __slots__ = ()
+
+
+class _StatelessEnvelope(_Stateless, Envelope):
+    __slots__ = ()
+
+
+class _StatelessProxyCallEnvelope(_Stateless, ProxyCallEnvelope):
+    __slots__ = ()
+
+
+class _StealingGroup:
+    """一个池所有成员信箱共用的锁和列表."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inboxes = []
+        # 全局递增的序号, 合并自己的两个队列时保持到达顺序.
+        self.seq = itertools.count()
+
+    def new_inbox(self):
+        inbox = StealingInbox(self)
+        with self.lock:
+            self.inboxes.append(inbox)
+        return inbox
+
+    def wake_idle(self, exclude=None):
+        # 拿着 self.lock 调用.
+        for inbox in self.inboxes:
+            if inbox._waiting and inbox is not exclude:
+                inbox._not_empty.notify()
+                return
+
+
+class StealingInbox:
+    """
+    池成员的信箱. 普通信件和 stateless 信件分两个队列;
+    自己的信件都处理完了, 从 stateless 积压最多的成员那里偷最早的一封.
+
+    :attr:`stolen` 是这个信箱偷到的信件数量.
+    """
+
+    def __init__(self, group):
+        self._group = group
+        self._ordered = collections.deque()  # (seq, envelope)
+        self._stateless = collections.deque()  # (seq, envelope)
+        self._not_empty = threading.Condition(group.lock)
+        self._waiting = False
+        self.stolen = 0
+
+    def put(self, item, block=True, timeout=None):
+        group = self._group
+        with group.lock:
+            entry = (next(group.seq), item)
+            if isinstance(item, _Stateless):
+                self._stateless.append(entry)
+            else:
+                self._ordered.append(entry)
+            if self._waiting:
+                self._not_empty.notify()
+            if isinstance(item, _Stateless) and (
+                not self._waiting or len(self._ordered) + len(self._stateless) > 1
+            ):
+                # 自己在忙(或者还有别的信件要处理), 叫醒一个空闲的成员来偷.
+                group.wake_idle(exclude=self)
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    def _take(self):
+        # 拿着 group.lock 调用. 自己的信件按到达顺序, 没有了再去偷.
+        ordered, own_stateless = self._ordered, self._stateless
+        if ordered and (not own_stateless or ordered[0][0] < own_stateless[0][0]):
+            return ordered.popleft()[1]
+        if own_stateless:
+            return own_stateless.popleft()[1]
+        victim = max(self._group.inboxes, key=lambda inbox: len(inbox._stateless), default=None)
+        if victim is not None and victim._stateless:
+            self.stolen += 1
+            return victim._stateless.popleft()[1]
+        raise queue.Empty
+
+    def get(self, block=True, timeout=None):
+        with self._group.lock:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                try:
+                    return self._take()
+                except queue.Empty:
+                    if not block:
+                        raise
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._waiting = True
+                try:
+                    self._not_empty.wait(remaining)
+                finally:
+                    self._waiting = False
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def close(self):
+        """
+        成员停止了: 离开池, 还没处理的 stateless 信件交给其他成员.
+        """
+        group = self._group
+        with group.lock:
+            if self in group.inboxes:
+                group.inboxes.remove(self)
+            if not group.inboxes:
+                return
+            while self._stateless:
+                target = min(group.inboxes, key=lambda inbox: len(inbox._stateless))
+                target._stateless.append(self._stateless.popleft())
+            for inbox in group.inboxes:
+                if inbox._waiting:
+                    inbox._not_empty.notify()
+
+    def empty(self):
+        return not self._ordered and not self._stateless
+
+    def full(self):
+        return False
+
+    def qsize(self):
+        return len(self._ordered) + len(self._stateless)
+
+
+class _PoolMember:
+    """混入池成员的 actor 类: 使用共享的 StealingInbox."""
+
+    _stealing_group = None
+
+    @classmethod
+    def _create_actor_inbox(cls):
+        return cls._stealing_group.new_inbox()
+
+    def _handle_leftovers(self):
+        self.actor_inbox.close()
+        super()._handle_leftovers()
+
+
+class WorkStealingPool(Router):
+    """
+    成员之间可以偷 stateless 任务的 actor 池, 用法和 :class:`routing.Router` 一样.
+    新信件先按 ``strategy`` 分给一个成员.
+    """
+
+    _group = None
+
+    @classmethod
+    def start(cls, actor_class, size, *args, strategy='round_robin', **kwargs):
+        """启动 size 个 ``actor_class(*args, **kwargs)`` 组成一个池."""
+        group = _StealingGroup()
+        # 每个池一个子类, 名字和原来的类一样(注册表按类名还能找到).
+        member_class = type(actor_class.__name__, (_PoolMember, actor_class), {
+            '_stealing_group': group,
+            '__module__': actor_class.__module__,
+            '__qualname__': actor_class.__qualname__,
+        })
+        routees = [member_class.start(*args, **kwargs) for _ in range(size)]
+        pool = cls(routees, strategy=strategy)
+        pool._group = group
+        pool._stateless_paths = {}
+        return pool
+
+    @property
+    def stolen(self):
+        """所有成员偷到的信件数量."""
+        return sum(routee.actor_inbox.stolen for routee in self._routees)
+
+    def _is_stateless_path(self, attr_path):
+        try:
+            return self._stateless_paths[attr_path]
+        except KeyError:
+            pass
+        try:
+            attr = self._actor._get_attribute_from_path(attr_path)
+        except AttributeError:
+            return False
+        result = self._stateless_paths[attr_path] = (
+            getattr(attr, '_pykka_stateless', False) is True
+        )
+        return result
+
+    def tell(self, message, priority=0, stateless=False):
+        if not stateless or self.strategy.broadcast:
+            return super().tell(message, priority=priority)
+        self._select(message).actor_inbox.put(_StatelessEnvelope(message))
+
+    def ask(self, message, block=True, timeout=None, priority=0, stateless=False):
+        if not stateless or self.strategy.broadcast:
+            return super().ask(message, block=block, timeout=timeout, priority=priority)
+        routee = self._select(message)
+        future = routee.actor_class._create_future()
+        routee.actor_inbox.put(_StatelessEnvelope(message, reply_to=future))
+        return future.get(timeout=timeout) if block else future
+
+    def _call(self, attr_path, args, kwargs, reply=True):
+        if self.strategy.broadcast or not self._is_stateless_path(attr_path):
+            return super()._call(attr_path, args, kwargs, reply=reply)
+        routee = self._select(None)
+        future = routee.actor_class._create_future() if reply else None
+        routee.actor_inbox.put(
+            _StatelessProxyCallEnvelope(attr_path, args, kwargs, reply_to=future)
+        )
+        return future
+
+
+class ElasticPool(Router):
+    """
+    成员数量随负载变化的 actor 池, 用法和 :class:`routing.Router` 一样.
+
+    下面的类属性是默认值, 可以在子类里改, 也可以在池实例上改.
+    """
+
+    #: 成员数量的下限和上限. 至少留一个成员, min_size 为 0 和 1 一样.
+    min_size = 1
+    max_size = 8
+
+    #: 平均每个成员积压的信件超过它就扩容.
+    scale_up_depth = 4
+    #: 平均每个成员积压的信件少于它才缩容. 比 scale_up_depth 小, 中间是不动的区间.
+    scale_down_depth = 0.5
+
+    #: ask 的平均延迟(秒)超过它也扩容, None 表示不看延迟.
+    scale_up_latency = None
+
+    #: 连续多少次检查都满足条件才扩容/缩容.
+    scale_up_after = 2
+    scale_down_after = 10
+
+    #: 每次扩容增加的成员数量, 缩容每次减少一个.
+    scale_up_step = 1
+
+    #: 延迟的指数移动平均的权重. 一次检查期间没有 ask 完成时, 平均值也按这个权重向 0 衰减.
+    latency_alpha = 0.2
+
+    def __init__(self, routees, strategy='smallest_mailbox'):
+        """
+        直接用已经启动的 routees 创建的池不知道怎么启动新成员, 只会缩容;
+        用 :meth:`start` 创建的池才能扩容.
+        """
+        super().__init__(routees, strategy=strategy)
+        # (actor_class, args, kwargs), start() 设置.
+        self._start_args = None
+        # 延迟的回调在各个成员的线程里跑, _check_load 在检查线程里读, 都拿这把锁.
+        self._latency_lock = threading.Lock()
+        self._latency = 0.0
+        self._latency_samples = 0
+        self._up_ticks = self._down_ticks = 0
+        self.stats = {'scale_up': 0, 'scale_down': 0}
+        self._closed = threading.Event()
+        # _tick 和 stop 互斥: stop 以后不会再启动新成员.
+        self._tick_lock = threading.Lock()
+
+    @classmethod
+    def start(cls, actor_class, size, *args, strategy='smallest_mailbox',
+              min_size=None, max_size=None, interval=0.1, **kwargs):
+        """
+        启动 size 个 ``actor_class(*args, **kwargs)``, 参数和 :meth:`Router.start` 一样.
+        :param min_size: 成员数量的下限, 默认是 size
+        :param interval: 检查负载的间隔(秒), None 不启动后台线程(手动调用 :meth:`_tick`)
+        """
+        min_size = size if min_size is None else min_size
+        routees = [actor_class.start(*args, **kwargs) for _ in range(max(size, min_size, 1))]
+        pool = cls(routees, strategy=strategy)
+        pool.min_size = min_size
+        if max_size is not None:
+            pool.max_size = max_size
+        pool._start_args = (actor_class, args, kwargs)
+        if interval is not None:
+            thread = threading.Thread(
+                target=pool._autoscale, args=(interval,), name='ElasticPool'
+            )
+            thread.daemon = True
+            thread.start()
+        return pool
+
+    @property
+    def size(self):
+        return len(self._routees)
+
+    def _record_latency(self, sent):
+        def on_done(future):
+            sample = time.monotonic() - sent
+            with self._latency_lock:
+                self._latency += (sample - self._latency) * self.latency_alpha
+                self._latency_samples += 1
+        return on_done
+
+    def ask(self, message, block=True, timeout=None, priority=0):
+        future = super().ask(message, block=False, priority=priority)
+        future.add_done_callback(self._record_latency(time.monotonic()))
+        return future.get(timeout=timeout) if block else future
+
+    def _call(self, attr_path, args, kwargs, reply=True):
+        future = super()._call(attr_path, args, kwargs, reply=reply)
+        if future is not None:
+            future.add_done_callback(self._record_latency(time.monotonic()))
+        return future
+
+    def _autoscale(self, interval):
+        while not self._closed.wait(interval):
+            self._tick()
+
+    def _tick(self):
+        """检查一次负载, 需要的话扩容或者缩容一次."""
+        with self._tick_lock:
+            if not self._closed.is_set():
+                self._check_load()
+
+    def _check_load(self):
+        routees = self._routees
+        if not routees:
+            return
+        depth = sum(routee.actor_inbox.qsize() for routee in routees) / len(routees)
+        with self._latency_lock:
+            if not self._latency_samples:
+                # 流量停了以后延迟的平均值不会再更新, 不衰减的话会一直"延迟高".
+                self._latency -= self._latency * self.latency_alpha
+            self._latency_samples = 0
+            latency = self._latency
+        latency_high = self.scale_up_latency is not None and latency > self.scale_up_latency
+
+        if depth > self.scale_up_depth or latency_high:
+            self._up_ticks += 1
+            self._down_ticks = 0
+        elif depth < self.scale_down_depth and not latency_high:
+            self._down_ticks += 1
+            self._up_ticks = 0
+        else:
+            self._up_ticks = self._down_ticks = 0
+
+        can_scale_up = self._start_args is not None and len(routees) < self.max_size
+        if self._up_ticks >= self.scale_up_after and can_scale_up:
+            self._up_ticks = 0
+            self._scale_up(min(self.scale_up_step, self.max_size - len(routees)))
+        elif (self._down_ticks >= self.scale_down_after
+              and len(routees) > max(self.min_size, 1)):
+            self._down_ticks = 0
+            self._scale_down()
+
+    def _scale_up(self, count):
+        actor_class, args, kwargs = self._start_args
+        new_routees = [actor_class.start(*args, **kwargs) for _ in range(count)]
+        self._update_routees(lambda routees: routees + new_routees)
+        self.stats['scale_up'] += count
+
+    def _scale_down(self):
+        removed = []
+
+        def remove_idlest(routees):
+            idlest = min(routees, key=lambda routee: routee.actor_inbox.qsize())
+            removed.append(idlest)
+            return [routee for routee in routees if routee is not idlest]
+
+        # 先不再分信件给它, 再让它处理完积压的信件后停止.
+        self._update_routees(remove_idlest)
+        removed[0].stop(block=False)
+        self.stats['scale_down'] += 1
+
+    def stop(self, block=True, timeout=None):
+        with self._tick_lock:
+            self._closed.set()
+        return super().stop(block=block, timeout=timeout)
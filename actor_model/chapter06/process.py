@@ -0,0 +1,465 @@
+"""
+进程 runtime: 每个 actor 跑在自己的子进程里, CPU 密集的 handler 不再受 GIL 限制.
+
+    父进程                                   子进程
+    ActorRef.tell/ask/proxy                  ThreadingActor 实例
+      |                                        ^
+    _ProcessInbox.put --> pickle --> Pipe --> 读线程 --> actor_inbox --> _actor_loop
+      ^                                                                   |
+    reply_to future <-- 读线程 <-- Pipe <-- pickle <-- _ReplyFuture.set <--
+
+- 父进程这边的 actor 是一个没有执行 ``__init__`` 的替身(stub), 只给 ActorRef
+  和 ActorProxy 自省用. 子进程执行完 ``__init__`` 以后把实例属性的"形状"
+  (方法/可遍历对象/普通值)发回来, 替身上放同名的占位对象.
+- 回复 future 留在父进程, 信件里只带一个编号, 回复按编号找到 future.
+- 消息, 参数和返回值都要能 pickle; 返回 future 这种不能 pickle 的结果,
+  ask 会抛 :class:`ProcessActorError`.
+- 大的 payload 可以经共享内存传递(``shared_memory_threshold``), 见 :mod:`transport`.
+
+一组进程 actor 就是一个 :class:`routing.Router`::
+
+    router = Router.start(Hasher, os.cpu_count(), strategy='smallest_mailbox')
+
+Notes:
+    - 子进程是 daemon 进程, 父进程退出时被结束, 子进程里不能再启动进程 actor.
+    - actor 在 ``__init__`` 之后新加的实例属性, 父进程的 proxy 看不到.
+    - 子进程异常退出(或者 actor 停止)时还没回复的 ask 抛 ActorDeadError.
+"""
+import itertools
+import multiprocessing
+import pickle
+import queue
+import sys
+import threading
+import uuid
+from collections.abc import Callable
+from multiprocessing import resource_tracker
+
+from pykka import ActorDeadError
+
+from .actor_ref import ActorRef
+from .actor_register import ActorRegistry
+from .envelope import Envelope, ProxyCallEnvelope
+from .exceptions import Timeout
+from .future import Future
+from .messages import ProxyCall, _ActorStop
+from .threading import ThreadingActor
+from .transport import Channel, SharedMemoryChannel
+
+__all__ = ['ProcessActor', 'ProcessActorError']
+
+# 可遍历对象嵌套自省的最大深度, 防止互相引用.
+_MAX_SHAPE_DEPTH = 8
+
+
+class ProcessActorError(Exception):
+    """子进程里的 actor 启动失败, 或者回复不能 pickle."""
+
+
+class _ProcessInbox:
+    """
+    父进程这边的"信箱": put 把信件发给子进程, ask 的 future 按编号记下来.
+    ``qsize`` 是还没回复的 ask 数量(子进程真正的积压看不到),
+    :class:`routing.SmallestMailbox` 用它选 actor.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self._ids = itertools.count(1)
+        # 编号 -> 等回复的 future
+        self._pending = {}
+        # 停止消息的编号, 回复到了先把替身标记为停止, 再 set future.
+        self._stop_ids = set()
+        self._closed = False
+
+    def put(self, item, block=True, timeout=None):
+        message = item.message
+        if isinstance(message, ProxyCallEnvelope):
+            # 信封和消息是同一个对象, 里面的 future 不能发过去.
+            message = ProxyCall(message.attr_path, message.args, message.kwargs)
+        reply_id = None
+        if item.reply_to is not None:
+            reply_id = next(self._ids)
+            self._pending[reply_id] = item.reply_to
+            if isinstance(message, _ActorStop):
+                self._stop_ids.add(reply_id)
+        try:
+            if self._closed:
+                raise ActorDeadError('actor process has exited')
+            self.channel.send((message, reply_id, item.priority))
+        except BaseException as exc:
+            if reply_id is not None:
+                self._pending.pop(reply_id, None)
+                self._stop_ids.discard(reply_id)
+            if isinstance(exc, (OSError, EOFError)):
+                raise ActorDeadError('actor process has exited') from exc
+            raise
+
+    put_nowait = put
+
+    def _deliver(self, actor, reply_id, kind, payload):
+        """回复到了: kind 是 ok 或 error. 停止消息的回复先把替身 actor 标记为停止."""
+        future = self._pending.pop(reply_id, None)
+        if future is None:
+            return
+        if reply_id in self._stop_ids:
+            self._stop_ids.discard(reply_id)
+            actor._mark_stopped()
+        if kind == 'ok':
+            future.set(payload)
+        else:
+            future.set_exception((type(payload), payload, None))
+
+    def _fail_pending(self, exc):
+        """对方没了, 还没回复的 ask 不会再有回复."""
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception((type(exc), exc, None))
+
+    def get(self, block=True, timeout=None):
+        # 信件都在子进程里, 父进程这边没有可取的.
+        raise queue.Empty
+
+    get_nowait = get
+
+    def empty(self):
+        return not self._pending
+
+    def full(self):
+        return False
+
+    def qsize(self):
+        return len(self._pending)
+
+
+class _ReplyFuture(Future):
+    """子进程里的 reply_to: set 的时候把结果发回父进程."""
+
+    def __init__(self, channel, reply_id):
+        super().__init__()
+        self._channel = channel
+        self._reply_id = reply_id
+
+    def get(self, timeout=None):
+        raise RuntimeError('reply of a process actor is read in the parent process')
+
+    def set(self, value=None):
+        try:
+            self._channel.send(('ok', self._reply_id, value))
+        except (pickle.PicklingError, TypeError, AttributeError) as exc:
+            self._channel.send((
+                'error', self._reply_id,
+                ProcessActorError(f'cannot pickle the reply ({type(value).__name__}): {exc}'),
+            ))
+
+    def set_exception(self, exc_info=None):
+        exc_info = exc_info or sys.exc_info()
+        exc = exc_info[1]
+        try:
+            self._channel.dumps(exc)
+        except Exception:
+            exc = ProcessActorError(repr(exc))
+        self._channel.send(('error', self._reply_id, exc))
+
+
+class _TraversableStub:
+    """替身上可遍历属性的占位对象, 下一层的属性放在实例 __dict__ 里."""
+    _pykka_traversable = True
+
+
+def _remote_callable(*args, **kwargs):
+    raise RuntimeError('this method runs in the actor process, call it through a proxy')
+
+
+def _describe(actor, obj, depth=0, class_attrs=False):
+    """
+    ``{属性名: (kind, 下一层)}``, kind 是 callable / traversable / value.
+    actor 本身默认只看实例属性(类属性父进程自己能自省), 可遍历对象看全部属性.
+    """
+    if obj is actor and not class_attrs:
+        attrs = obj.__dict__
+    else:
+        attrs = actor._introspect_attributes(obj)
+    shape = {}
+    for name, attr in attrs.items():
+        if name.startswith('_'):
+            continue
+        if (
+            getattr(attr, '_pykka_traversable', False) is True
+            or getattr(attr, 'pykka_traversable', False) is True
+        ):
+            nested = _describe(actor, attr, depth + 1) if depth < _MAX_SHAPE_DEPTH else {}
+            shape[name] = ('traversable', nested)
+        elif isinstance(attr, Callable):
+            shape[name] = ('callable', None)
+        else:
+            shape[name] = ('value', None)
+    return shape
+
+
+def _placeholders(shape):
+    result = {}
+    for name, (kind, nested) in shape.items():
+        if kind == 'callable':
+            result[name] = _remote_callable
+        elif kind == 'traversable':
+            stub = _TraversableStub()
+            stub.__dict__.update(_placeholders(nested))
+            result[name] = stub
+        else:
+            result[name] = None
+    return result
+
+
+class _LeasedEnvelope(Envelope):
+    """
+    消息里有共享内存段的信件. actor 处理完调用 :func:`_release`,
+    通知父进程回收(ack).
+    """
+
+    __slots__ = ['channel', 'lease']
+
+    def __init__(self, message, reply_to, priority, channel, lease):
+        super().__init__(message, reply_to=reply_to, priority=priority)
+        self.channel = channel
+        self.lease = lease
+
+
+def _release(envelope):
+    lease = getattr(envelope, 'lease', None)
+    if lease is not None:
+        envelope.lease = None
+        envelope.channel.release(lease)
+
+
+def _reset_registry():
+    """
+    fork 出来的子进程带着父进程注册表的副本, 那些 actor 不在这个进程里,
+    清空, 锁也换新的(fork 的时候可能正被别的线程拿着).
+    """
+    ActorRegistry._actor_refs_lock = threading.RLock()
+    ActorRegistry._actor_refs.clear()
+    ActorRegistry._by_urn.clear()
+    ActorRegistry._by_class.clear()
+    ActorRegistry._by_class_name.clear()
+
+
+def _child_main(actor_class, args, kwargs, actor_urn, conn):
+    """子进程入口: 创建 actor, 读线程把信件放进信箱, 主线程跑 actor loop."""
+    _reset_registry()
+    channel = actor_class._create_channel(conn)
+    try:
+        actor = actor_class(*args, **kwargs)
+        actor.actor_urn = actor.actor_ref.actor_urn = actor_urn
+        shape = _describe(actor, actor)
+    except Exception as exc:
+        try:
+            channel.dumps(exc)
+        except Exception:
+            exc = ProcessActorError(repr(exc))
+        channel.send(('error', None, exc))
+        return
+    ActorRegistry.register(actor.actor_ref)
+    channel.send(('started', None, shape))
+
+    reader = threading.Thread(
+        target=_child_reader, args=(actor, channel), name='ProcessActorReader'
+    )
+    reader.daemon = True
+    reader.start()
+    try:
+        actor._actor_loop()
+    finally:
+        try:
+            channel.send(('stopped', None, None))
+        except OSError:
+            pass
+        # 等父进程 ack 发出去的回复里的共享内存段.
+        channel.close(timeout=actor_class.shared_memory_close_timeout)
+
+
+def _child_reader(actor, channel):
+    try:
+        while True:
+            (message, reply_id, priority), lease = channel.recv()
+            reply_to = None if reply_id is None else _ReplyFuture(channel, reply_id)
+            if lease is None:
+                envelope = Envelope(message, reply_to=reply_to, priority=priority)
+            else:
+                envelope = _LeasedEnvelope(message, reply_to, priority, channel, lease)
+            actor.actor_inbox.put(envelope)
+    except (EOFError, OSError):
+        # 父进程没了.
+        pass
+    except Exception:
+        # 信件解码不了, 不知道该回复给谁: 和父进程没了一样停止 actor,
+        # 父进程那边等回复的 ask 在子进程退出以后都会失败.
+        pass
+    finally:
+        actor.actor_inbox.put(Envelope(_ActorStop()))
+
+
+def _parent_reader(stub, channel, process):
+    """父进程的读线程: 按编号 set 回复 future, 子进程退出后清理."""
+    inbox = stub.actor_inbox
+    error = ActorDeadError(f'{stub.actor_ref} process exited')
+    try:
+        while True:
+            try:
+                (kind, reply_id, payload), lease = channel.recv()
+            except (EOFError, OSError):
+                break
+            except Exception as exc:
+                # 回复解码不了, 不知道是哪个 future 的: 替身标记为停止,
+                # 等回复的 ask 马上失败, 让子进程也停下来(fork 的子进程也拿着
+                # 父进程这一端, 只关闭通道它读不到 EOF).
+                error = ActorDeadError(
+                    f'{stub.actor_ref} sent a reply that cannot be unpickled: {exc!r}'
+                )
+                stub._mark_stopped()
+                inbox._fail_pending(error)
+                try:
+                    channel.send((_ActorStop(), None, 0))
+                except OSError:
+                    pass
+                break
+            # 回复交给 future 以后就不归这里管了, 马上 ack; 还被引用着的映射以后再 close.
+            channel.release(lease)
+            if kind == 'stopped':
+                break
+            inbox._deliver(stub, reply_id, kind, payload)
+    finally:
+        stub._mark_stopped()
+        channel.close()
+        process.join()
+        inbox._fail_pending(error)
+
+
+class ProcessActor(ThreadingActor):
+    """
+    跑在单独子进程里的 actor, 用法和 ThreadingActor 一样::
+
+        class Hasher(ProcessActor):
+            def digest(self, data, rounds):
+                ...
+
+        proxy = Hasher.start().proxy()
+        proxy.digest(b'...', 100000).get()
+
+    actor 类, ``start()`` 的参数, 消息和返回值都要能 pickle.
+    子进程里 actor 还是 ThreadingActor, inbox_class / inbox_batch_size 这些照样用.
+    """
+
+    #: multiprocessing 的启动方式 ('fork', 'spawn', 'forkserver'), None 用平台默认的.
+    start_method = None
+
+    #: 等子进程创建 actor(执行 ``__init__``)最多的秒数.
+    start_timeout = 30
+
+    #: 大于等于这个字节数的 buffer(``bytes``, ``bytearray``, ``pickle.PickleBuffer``,
+    #: NumPy 数组)经共享内存传递, 见 :class:`transport.SharedMemoryChannel`.
+    #: None 表示不用共享内存, 消息整个写进管道.
+    shared_memory_threshold = None
+
+    #: actor 停止以后, 子进程等父进程 ack 共享内存段最多的秒数.
+    shared_memory_close_timeout = 1
+
+    #: 消息编码, 见 :mod:`codec`. None 用 :data:`codec.default_codec`.
+    codec = None
+
+    #: 子进程(只在父进程的替身上有).
+    actor_process = None
+
+    @classmethod
+    def start(cls, *args, **kwargs):
+        """
+        启动子进程, 等 actor 创建完成, 返回父进程这边的 ActorRef.
+        :raises ProcessActorError: ``__init__`` 抛了异常(异常在 ``__cause__`` 里)或者超时
+        """
+        context = multiprocessing.get_context(cls.start_method)
+        if cls.shared_memory_threshold is not None:
+            # 先在父进程启动 resource tracker, 子进程共用它,
+            # 共享内存段不管在哪个进程创建和 unlink 都只登记一次.
+            resource_tracker.ensure_running()
+        parent_conn, child_conn = context.Pipe()
+        actor_urn = uuid.uuid4().urn
+        process = context.Process(
+            target=_child_main,
+            args=(cls, args, kwargs, actor_urn, child_conn),
+            name=f'{cls.__name__}-{actor_urn[-12:]}',
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+
+        channel = cls._create_channel(parent_conn)
+        try:
+            if not channel.poll(cls.start_timeout):
+                raise Timeout(f'{cls.start_timeout} seconds')
+            (kind, _, payload), lease = channel.recv()
+            channel.release(lease)
+        except (Timeout, EOFError, OSError) as exc:
+            process.kill()
+            process.join()
+            channel.close()
+            raise ProcessActorError(f'{cls.__name__} process failed to start') from exc
+        if kind == 'error':
+            process.join()
+            channel.close()
+            raise ProcessActorError(f'{cls.__name__}.__init__ failed') from payload
+
+        stub = cls._create_stub(actor_urn, channel, process, payload)
+        ActorRegistry.register(stub.actor_ref)
+        reader = threading.Thread(
+            target=_parent_reader, args=(stub, channel, process),
+            name=f'{cls.__name__}Reader',
+        )
+        reader.daemon = True
+        reader.start()
+        return stub.actor_ref
+
+    @classmethod
+    def _create_channel(cls, conn):
+        if cls.shared_memory_threshold is None:
+            return Channel(conn, cls.codec)
+        return SharedMemoryChannel(conn, cls.shared_memory_threshold, cls.codec)
+
+    @classmethod
+    def _create_stub(cls, actor_urn, channel, process, shape):
+        """不执行 ``__init__`` 的替身, 给 ActorRef 和 ActorProxy 自省用."""
+        stub = cls.__new__(cls)
+        stub.__dict__.update(_placeholders(shape))
+        stub.actor_urn = actor_urn
+        stub.actor_inbox = _ProcessInbox(channel)
+        stub.actor_stopped = threading.Event()
+        stub.actor_process = process
+        stub.actor_ref = ActorRef(stub)
+        return stub
+
+    def _mark_stopped(self):
+        # 替身上调用: 和 Actor._stop 一样先注销, 再标记停止.
+        if not self.actor_stopped.is_set():
+            ActorRegistry.unregister(self.actor_ref)
+            self.actor_stopped.set()
+            self.actor_inbox._closed = True
+
+    # 下面在子进程里调用: 信件处理完(包括抛异常, 停止后剩下的)释放共享内存租约.
+
+    def _handle_envelope(self, envelope):
+        try:
+            super()._handle_envelope(envelope)
+        finally:
+            _release(envelope)
+
+    def _handle_envelope_run(self, envelopes):
+        try:
+            super()._handle_envelope_run(envelopes)
+        finally:
+            for envelope in envelopes:
+                _release(envelope)
+
+    def _handle_leftover(self, envelope):
+        try:
+            super()._handle_leftover(envelope)
+        finally:
+            _release(envelope)
@@ -0,0 +1,514 @@
+"""
+远程 actor: 通过 TCP 访问别的节点(进程/机器)上的 actor, ActorRef 的用法不变.
+
+    节点 A                                              节点 B
+    RemoteActorRef.tell/ask/proxy                       ActorServer (asyncio)
+      |                                                   |
+    _RemoteInbox.put --> _Connection --TCP(一条长连接)--> ActorRegistry.get_by_urn(urn)
+      ^                                                   |  ref.tell / ref.ask
+    reply_to future <-- 读线程 <-- (urn, 编号, 结果) <------ future.add_done_callback
+
+- 一个节点跑一个 :class:`ActorServer`, 它把本进程 ActorRegistry 里的所有 actor
+  暴露出去(按 urn 找).
+- 另一边用 :class:`RemoteNode` 像 ActorRegistry 一样找 actor, 得到
+  :class:`RemoteActorRef`. 到同一个地址的所有 ref 共用一条 TCP 连接,
+  回复按 (urn, 编号) 找到本地的 ThreadingFuture.
+- proxy 的自省用 actor 的"形状"(类和实例上的方法/可遍历对象/普通值),
+  在 ``get_by_urn`` 的时候取一次, 本地不需要 actor 类.
+
+Example::
+
+    # 节点 B
+    server = ActorServer(host='0.0.0.0', port=7000).start()
+    Resolver.start()
+
+    # 节点 A
+    node = RemoteNode(('node-b', 7000))
+    resolver = node.get_by_class_name('Resolver')[0]
+    resolver.proxy().resolve('8.8.8.8').get()
+
+Notes:
+    - 消息用 pickle(:mod:`codec`)编码, 能执行任意代码, 只在可信的网络里用(默认只监听 127.0.0.1).
+    - 远程 actor 停止以后, tell 会被对方丢掉; 下一次 ask 抛 ActorDeadError,
+      ref 同时变成 not alive. 连接断开时所有 ref 都变成 not alive.
+    - 服务端往本地信箱放信件不等待: 有容量限制的信箱满了, 远程的 tell 被丢掉,
+      ask 抛 MailboxFull(不管 ``inbox_overflow`` 策略).
+"""
+import asyncio
+import itertools
+import pickle
+import socket
+import struct
+import threading
+
+from pykka import ActorDeadError
+
+from .actor import Actor
+from .actor_ref import ActorRef
+from .actor_register import ActorRegistry
+from .codec import default_codec
+from .envelope import Envelope
+from .process import _describe, _placeholders, _ProcessInbox
+from .threading import ThreadingFuture
+
+__all__ = ['ActorServer', 'RemoteActorRef', 'RemoteError', 'RemoteNode']
+
+# 帧: 头部和内容的长度(各 4 字节, 网络字节序) + codec 编码的头部 + codec 编码的内容.
+# 头部只有 urn / 编号这些路由信息, 内容(消息, 回复)单独解码: 一封解码不了,
+# 只有它的 future 失败, 不影响同一条连接上的其他信件.
+_HEADER = struct.Struct('!II')
+
+# 写缓冲超过这么多字节, 读下一个请求之前先等对方收走(背压).
+_WRITE_HIGH_WATER = 1 << 20
+
+
+class RemoteError(Exception):
+    """远程请求失败: 请求或回复不能 pickle / 解码, 或者服务端不认识的请求."""
+
+
+def _dumps(codec, head, body):
+    head = codec.dumps(head)
+    body = codec.dumps(body)
+    return _HEADER.pack(len(head), len(body)) + head + body
+
+
+def _picklable_exception(exc):
+    try:
+        pickle.dumps(exc, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return RemoteError(repr(exc))
+    return exc
+
+
+class ActorServer:
+    """
+    把本进程的 actor 暴露给其他节点.
+
+    :param host: 监听地址
+    :param port: 端口, 0 表示随便选一个空闲端口(见 :attr:`address`)
+    :param codec: 消息编码(:mod:`codec`), 和客户端的要一样. 默认 :data:`codec.default_codec`
+
+    请求(头部, 内容)::
+
+        ('msg', urn, 编号 or None, priority), message   tell(编号是 None) / ask
+        ('describe', urn, 编号, 0), None                  actor 的类名和形状
+        ('lookup', 类名 or None, 编号, 0), None           actor 的 urn 列表
+
+    回复: ``(urn, 编号, 'ok' or 'error')``, 结果 or 异常.
+    请求的内容解码失败时回复 :class:`RemoteError`.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, codec=None):
+        self.host = host
+        self.port = port
+        self.codec = codec or default_codec
+        #: 实际监听的 (host, port), start 以后才有.
+        self.address = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._writers = set()
+        self._tasks = set()
+
+    def __repr__(self):
+        return f"<ActorServer {self.address or (self.host, self.port)}>"
+
+    def start(self):
+        """在后台线程里启动 event loop 和 TCP server, 返回 self."""
+        started = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(self._serve, self.host, self.port)
+                )
+            except OSError as exc:
+                errors.append(exc)
+                started.set()
+                return
+            self.address = self._server.sockets[0].getsockname()[:2]
+            started.set()
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name='ActorServer')
+        self._thread.daemon = True
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        """关闭监听和所有连接. 本地的 actor 不受影响."""
+        if self._loop is None or self._loop.is_closed():
+            return
+
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        self._thread.join()
+
+    async def _shutdown(self):
+        self._server.close()
+        # 关闭连接以后 _serve 读到 EOF 自己结束.
+        for writer in list(self._writers):
+            writer.close()
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=5)
+        self._loop.stop()
+
+    async def _serve(self, reader, writer):
+        writer.get_extra_info('socket').setsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1
+        )
+        self._writers.add(writer)
+        self._tasks.add(asyncio.current_task())
+        try:
+            while True:
+                header = await reader.readexactly(_HEADER.size)
+                head_size, body_size = _HEADER.unpack(header)
+                head = await reader.readexactly(head_size)
+                body = await reader.readexactly(body_size)
+                self._handle_frame(writer, head, body)
+                if writer.transport.get_write_buffer_size() > _WRITE_HIGH_WATER:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._tasks.discard(asyncio.current_task())
+            writer.close()
+
+    def _handle_frame(self, writer, head, body):
+        # 解码失败只影响这一封: 能找到编号就回复错误, 否则丢掉(tell 本来就没有回复).
+        try:
+            kind, urn, reply_id, priority = self.codec.loads(head)
+        except Exception:
+            return
+        try:
+            message = self.codec.loads(body)
+        except Exception as exc:
+            if reply_id is not None:
+                error = RemoteError(f'cannot unpickle the request: {exc!r}')
+                self._reply(writer, urn, reply_id, 'error', error)
+            return
+        self._handle(writer, kind, urn, message, reply_id, priority)
+
+    def _handle(self, writer, kind, urn, message, reply_id, priority):
+        if kind == 'msg':
+            ref = ActorRegistry.get_by_urn(urn)
+            future = None
+            try:
+                if ref is None:
+                    raise ActorDeadError(f'{urn} not found')
+                if reply_id is not None:
+                    future = ref.actor_class._create_future()
+                self._put(ref, message, future, priority)
+            except Exception as exc:
+                # 这封信件的错误(actor 停止了, 信箱满了 ...)不能断开大家共用的连接:
+                # ask 回复错误, tell 丢掉.
+                if reply_id is not None:
+                    self._reply(writer, urn, reply_id, 'error', _picklable_exception(exc))
+                return
+            if future is not None:
+                future.add_done_callback(
+                    lambda f: self._reply_from_future(writer, urn, reply_id, f)
+                )
+        elif kind == 'describe':
+            ref = ActorRegistry.get_by_urn(urn)
+            if ref is None:
+                self._reply(writer, urn, reply_id, 'ok', None)
+            else:
+                actor = ref._actor
+                shape = _describe(actor, actor, class_attrs=True)
+                self._reply(writer, urn, reply_id, 'ok', (ref.actor_class.__name__, shape))
+        elif kind == 'lookup':
+            if urn is None:
+                refs = ActorRegistry.get_all()
+            else:
+                refs = ActorRegistry.get_by_class_name(urn)
+            self._reply(writer, urn, reply_id, 'ok', [ref.actor_urn for ref in refs])
+        else:
+            self._reply(writer, urn, reply_id, 'error', RemoteError(f'unknown request {kind!r}'))
+
+    @staticmethod
+    def _put(ref, message, reply_to, priority):
+        """
+        和 ``ref.tell`` / ``ref.ask`` 一样放进信箱, 但是不阻塞: 这里是所有连接共用的
+        event loop 线程. 有容量限制的信箱满了直接抛 MailboxFull, 不管 overflow 策略.
+        """
+        if not ref.is_alive():
+            raise ActorDeadError(f'{ref} not found')
+        envelope = Envelope(message, reply_to=reply_to, priority=priority)
+        metrics = ref._metrics
+        if metrics is not None and metrics.sample_next:
+            metrics.enqueued(envelope)
+        ref.actor_inbox.put(envelope, block=False)
+
+    def _reply_from_future(self, writer, urn, reply_id, future):
+        # actor 的线程里调用: 在这里编码, 不占用 event loop.
+        try:
+            value = future.get(timeout=0)
+        except Exception as exc:
+            frame = _dumps(self.codec, (urn, reply_id, 'error'), _picklable_exception(exc))
+        else:
+            try:
+                frame = _dumps(self.codec, (urn, reply_id, 'ok'), value)
+            except Exception as exc:
+                error = RemoteError(f'cannot pickle the reply ({type(value).__name__}): {exc}')
+                frame = _dumps(self.codec, (urn, reply_id, 'error'), error)
+        try:
+            self._loop.call_soon_threadsafe(self._write, writer, frame)
+        except RuntimeError:
+            # server 已经停止, loop 关闭了.
+            pass
+
+    def _reply(self, writer, urn, reply_id, kind, payload):
+        # loop 线程里调用.
+        self._write(writer, _dumps(self.codec, (urn, reply_id, kind), payload))
+
+    @staticmethod
+    def _write(writer, frame):
+        if not writer.is_closing():
+            writer.write(frame)
+
+
+class _RemoteActor(Actor):
+    """
+    RemoteActorRef 后面的替身: 没有执行 ``__init__``, 类和实例上的属性
+    都按远程 actor 的形状放在实例上, 给 ActorProxy 自省用.
+    """
+
+    @staticmethod
+    def _create_future():
+        return ThreadingFuture()
+
+    def _mark_stopped(self):
+        self.actor_stopped.set()
+        self.actor_inbox._closed = True
+
+
+class _ActorChannel:
+    """_ProcessInbox 发信件用: 发到连接上, 带上目标 actor 的 urn."""
+
+    __slots__ = ['connection', 'actor_urn']
+
+    def __init__(self, connection, actor_urn):
+        self.connection = connection
+        self.actor_urn = actor_urn
+
+    def send(self, item):
+        message, reply_id, priority = item
+        self.connection.send(('msg', self.actor_urn, reply_id, priority), message)
+
+
+class _RemoteInbox(_ProcessInbox):
+    """
+    远程 actor 的"信箱": 信件发到 TCP 连接上, ask 的 future 按编号记下来.
+    ``qsize`` 是还没回复的 ask 数量.
+    """
+
+
+class RemoteActorRef(ActorRef):
+    """
+    远程 actor 的 ref, tell / ask / proxy / stop 和本地 ActorRef 一样.
+    用 :meth:`RemoteNode.get_by_urn` 等方法得到, 不要直接创建.
+    """
+
+    #: 远程 actor 的类名.
+    actor_class_name = None
+
+    #: 远程节点的 (host, port).
+    address = None
+
+    def __init__(self, connection, actor_urn, class_name, shape):
+        stub = _RemoteActor.__new__(_RemoteActor)
+        stub.__dict__.update(_placeholders(shape))
+        stub.actor_urn = actor_urn
+        stub.actor_inbox = _RemoteInbox(_ActorChannel(connection, actor_urn))
+        stub.actor_stopped = threading.Event()
+        stub.actor_ref = self
+        super().__init__(stub)
+        self.actor_class_name = class_name
+        self.address = connection.address
+
+    def __str__(self):
+        host, port = self.address
+        return f"{self.actor_class_name} ({self.actor_urn}) at {host}:{port}"
+
+
+class _Connection:
+    """
+    到一个节点的 TCP 长连接, 所有到这个节点的 RemoteActorRef 共用.
+    读线程按 (urn, 编号) 把回复交给 future.
+    """
+
+    def __init__(self, address, codec):
+        self.address = tuple(address)
+        self.codec = codec
+        self._sock = socket.create_connection(self.address)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile('rb')
+        self._send_lock = threading.Lock()
+        # describe / lookup 请求: 编号 -> future, 编号是负数, 和信件的编号分开.
+        self._ids = itertools.count(-1, -1)
+        self._requests = {}
+        # urn -> RemoteActorRef, 同一个 actor 共用一个 ref(和信箱).
+        self._refs = {}
+        self._refs_lock = threading.Lock()
+        self.closed = False
+        thread = threading.Thread(
+            target=self._read_replies, name=f'RemoteConnection-{self.address[1]}'
+        )
+        thread.daemon = True
+        thread.start()
+
+    def send(self, head, body):
+        frame = _dumps(self.codec, head, body)
+        with self._send_lock:
+            if self.closed:
+                raise ConnectionError(f'connection to {self.address} is closed')
+            self._sock.sendall(frame)
+
+    def request(self, kind, key, timeout=None):
+        future = ThreadingFuture()
+        reply_id = next(self._ids)
+        self._requests[reply_id] = future
+        try:
+            self.send((kind, key, reply_id, 0), None)
+            return future.get(timeout=timeout)
+        finally:
+            # 超时以后回复不会再有人要.
+            self._requests.pop(reply_id, None)
+
+    def get_ref(self, actor_urn, timeout=None):
+        with self._refs_lock:
+            ref = self._refs.get(actor_urn)
+        if ref is not None and ref.is_alive():
+            return ref
+        description = self.request('describe', actor_urn, timeout)
+        if description is None:
+            return None
+        class_name, shape = description
+        ref = RemoteActorRef(self, actor_urn, class_name, shape)
+        with self._refs_lock:
+            self._refs[actor_urn] = ref
+        return ref
+
+    def _read_replies(self):
+        read = self._file.read
+        try:
+            while True:
+                header = read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                head_size, body_size = _HEADER.unpack(header)
+                head = read(head_size)
+                body = read(body_size)
+                if len(head) < head_size or len(body) < body_size:
+                    break
+                actor_urn, reply_id, kind = self.codec.loads(head)
+                try:
+                    payload = self.codec.loads(body)
+                except Exception as exc:
+                    # 只有这一个回复失败.
+                    kind, payload = 'error', RemoteError(f'cannot unpickle the reply: {exc!r}')
+                self._deliver(actor_urn, reply_id, kind, payload)
+        except OSError:
+            pass
+        finally:
+            # 其他错误(头部解码不了 ...)不知道是哪个 future 的: 关闭连接,
+            # 所有等待中的 future 抛 ActorDeadError, 不会一直等下去.
+            self.close()
+
+    def _deliver(self, actor_urn, reply_id, kind, payload):
+        if reply_id > 0:
+            # 信件的回复, 编号是 ref 的信箱分配的.
+            with self._refs_lock:
+                ref = self._refs.get(actor_urn)
+            if ref is None:
+                return
+            if kind == 'error' and isinstance(payload, ActorDeadError):
+                ref._actor._mark_stopped()
+            ref.actor_inbox._deliver(ref._actor, reply_id, kind, payload)
+            return
+        future = self._requests.pop(reply_id, None)
+        if future is None:
+            return
+        if kind == 'ok':
+            future.set(payload)
+        else:
+            future.set_exception((type(payload), payload, None))
+
+    def close(self):
+        """关闭连接, 所有 ref 变成 not alive, 没回复的请求抛 ActorDeadError."""
+        with self._send_lock:
+            if self.closed:
+                return
+            self.closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        exc = ActorDeadError(f'connection to {self.address} is closed')
+        with self._refs_lock:
+            refs = list(self._refs.values())
+        for ref in refs:
+            ref._actor._mark_stopped()
+            ref.actor_inbox._fail_pending(exc)
+        requests, self._requests = self._requests, {}
+        for future in requests.values():
+            future.set_exception((ActorDeadError, exc, None))
+
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def _get_connection(address, codec=None):
+    """到 address 的共享连接(每种 codec 一条), 断开了就重新连接."""
+    codec = codec or default_codec
+    key = (tuple(address), codec)
+    with _connections_lock:
+        connection = _connections.get(key)
+        if connection is None or connection.closed:
+            connection = _connections[key] = _Connection(address, codec)
+        return connection
+
+
+class RemoteNode:
+    """
+    另一个节点上的 actor, 方法和 :class:`ActorRegistry` 对应.
+
+    :param address: 对方 :class:`ActorServer` 的 (host, port)
+    :param timeout: 查找请求最多等待的秒数
+    :param codec: 消息编码, 和对方 ActorServer 的要一样
+    """
+
+    def __init__(self, address, timeout=10, codec=None):
+        self.address = tuple(address)
+        self.timeout = timeout
+        self.codec = codec
+
+    def __repr__(self):
+        return f"<RemoteNode {self.address}>"
+
+    def get_by_urn(self, actor_urn):
+        """:returns: :class:`RemoteActorRef`, 对方没有这个 actor 返回 None"""
+        return _get_connection(self.address, self.codec).get_ref(actor_urn, self.timeout)
+
+    def get_by_class_name(self, actor_class_name):
+        return self._lookup(actor_class_name)
+
+    def get_all(self):
+        return self._lookup(None)
+
+    def _lookup(self, key):
+        connection = _get_connection(self.address, self.codec)
+        refs = (
+            connection.get_ref(actor_urn, self.timeout)
+            for actor_urn in connection.request('lookup', key, self.timeout)
+        )
+        return [ref for ref in refs if ref is not None]
@@ -0,0 +1,397 @@
+"""
+路由(router): 一个 ref 后面是一组同样的 actor(routee), 按策略把信件分给其中一个.
+
+    router = Router.start(Resolver, 10, strategy='smallest_mailbox')
+    router.proxy().resolve(ip)        # 和普通的 ActorRef / ActorProxy 一样用
+
+策略:
+    - round_robin: 轮流
+    - random: 随机
+    - smallest_mailbox: 信箱里积压最少的(慢的 actor 不会越积越多)
+    - consistent_hash: 同一个 key 总是到同一个 actor, key 默认是方法调用的第一个参数,
+      只能是 str / bytes / 数字 / None 和它们的 tuple(repr 每个进程都一样)
+    - broadcast: 发给所有 actor, ask 的结果是列表
+
+Notes:
+    通过 router 的 proxy 赋值(``proxy.attr = value``)只会改到其中一个 actor.
+    router 可以嵌套(router 的 routee 是 router), 它的信箱深度是所有 routee 加在一起.
+"""
+import bisect
+import hashlib
+import itertools
+import random
+import threading
+import time
+import uuid
+
+from pykka import ActorDeadError
+
+from . import messages
+from .actor_proxy import ActorProxy
+from .actor_ref import ActorRef
+from .metrics import aggregate
+
+__all__ = [
+    'Broadcast', 'ConsistentHash', 'RandomRouting', 'RoundRobin', 'Router',
+    'RoutingStrategy', 'SmallestMailbox', 'STRATEGIES',
+]
+
+
+class RoutingStrategy:
+    """
+    路由策略: 从 routees 里选出要发送的 actor.
+    """
+
+    #: True 表示发给所有 routee(broadcast), ask 的结果是列表.
+    broadcast = False
+
+    def select(self, message, routees):
+        """
+        :param message: 要发送的消息(代理调用是 :class:`messages.ProxyCall`)
+        :param routees: 非空的 :class:`ActorRef` 列表
+        :return: 其中一个 ActorRef
+        """
+        raise NotImplementedError
+
+    def select_call(self, attr_path, args, kwargs, routees):
+        """
+        代理方法调用选 routee. 默认包成 :class:`messages.ProxyCall` 交给 :meth:`select`;
+        不看消息内容的策略覆盖它, 省掉这个对象.
+        """
+        return self.select(messages.ProxyCall(attr_path, args, kwargs), routees)
+
+    def routees_changed(self, routees):
+        """routee 列表变了(加入, 或者去掉了停止的 actor)."""
+        pass
+
+
+class RoundRobin(RoutingStrategy):
+    def __init__(self):
+        # next() 在 CPython 里是原子的, 不需要锁.
+        self._counter = itertools.count()
+
+    def select(self, message, routees):
+        return routees[next(self._counter) % len(routees)]
+
+    def select_call(self, attr_path, args, kwargs, routees):
+        return routees[next(self._counter) % len(routees)]
+
+
+class RandomRouting(RoutingStrategy):
+    def select(self, message, routees):
+        return random.choice(routees)
+
+    def select_call(self, attr_path, args, kwargs, routees):
+        return random.choice(routees)
+
+
+class SmallestMailbox(RoutingStrategy):
+    """
+    信箱里信件最少的 actor. 一样少的时候轮流, 不会总是选第一个.
+    正在处理的那封信件不算在信箱里.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def select(self, message, routees):
+        start = next(self._counter) % len(routees)
+        best, best_size = None, None
+        for i in range(len(routees)):
+            routee = routees[(start + i) % len(routees)]
+            size = routee.actor_inbox.qsize()
+            if size == 0:
+                return routee
+            if best is None or size < best_size:
+                best, best_size = routee, size
+        return best
+
+    def select_call(self, attr_path, args, kwargs, routees):
+        return self.select(None, routees)
+
+
+def _default_hash_key(message):
+    """代理调用用第一个参数, 没有参数用方法名; 其他消息用消息本身."""
+    if isinstance(message, messages.ProxyCall):
+        return message.args[0] if message.args else message.attr_path
+    if isinstance(message, (messages.ProxyGetAttr, messages.ProxySetAttr)):
+        return message.attr_path
+    return message
+
+
+def _check_stable_key(value):
+    """
+    key 的 repr 要在每个进程里都一样: 只接受 str, bytes, 数字, None 和它们组成的 tuple.
+    其他对象默认的 repr 带内存地址, 重启以后会分到别的 actor.
+    """
+    if type(value) is tuple:
+        for item in value:
+            _check_stable_key(item)
+    elif type(value) not in _STABLE_KEY_TYPES:
+        raise TypeError(
+            'consistent_hash key must be str, bytes, a number, None or a tuple of them, '
+            'not {}; pass ConsistentHash(key=...) to map messages to such a key'.format(
+                type(value).__name__)
+        )
+
+
+_STABLE_KEY_TYPES = frozenset([str, bytes, int, float, bool, type(None)])
+
+
+class ConsistentHash(RoutingStrategy):
+    """
+    一致性哈希: 同一个 key 总是到同一个 actor; 去掉一个 actor 只影响原来分给它的 key.
+
+    :param key: ``key(message)`` 返回路由用的 key, 默认见 :func:`_default_hash_key`.
+        key 只能是 str, bytes, 数字, None 或者它们组成的 tuple(见 :func:`_check_stable_key`),
+        其他类型抛 TypeError.
+    :param replicas: 每个 actor 在哈希环上的虚拟节点数量
+    """
+
+    def __init__(self, key=None, replicas=100):
+        self.key = key or _default_hash_key
+        self._default_key = key is None
+        self.replicas = replicas
+        # (哈希环上的点, 对应的 routee), 一起替换, 其他线程不会看到一半.
+        self._ring = ([], [])
+
+    @staticmethod
+    def _hash(value):
+        # 不用 hash(): str 的 hash 每个进程不一样.
+        _check_stable_key(value)
+        digest = hashlib.md5(repr(value).encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big')
+
+    def routees_changed(self, routees):
+        points = sorted(
+            (self._hash((routee.actor_urn, i)), routee)
+            for routee in routees
+            for i in range(self.replicas)
+        )
+        self._ring = (
+            [point for point, _ in points], [routee for _, routee in points]
+        )
+
+    def select(self, message, routees):
+        return self._select_key(self.key(message))
+
+    def select_call(self, attr_path, args, kwargs, routees):
+        if not self._default_key:
+            return super().select_call(attr_path, args, kwargs, routees)
+        # 和 _default_hash_key 一样, 不用先包成 ProxyCall.
+        return self._select_key(args[0] if args else attr_path)
+
+    def _select_key(self, key):
+        points, ring_routees = self._ring
+        index = bisect.bisect(points, self._hash(key))
+        return ring_routees[index % len(ring_routees)]
+
+
+class Broadcast(RoutingStrategy):
+    broadcast = True
+
+    def select(self, message, routees):
+        return routees[0]
+
+    def select_call(self, attr_path, args, kwargs, routees):
+        return routees[0]
+
+
+#: 按名字选择策略.
+STRATEGIES = {
+    'round_robin': RoundRobin,
+    'random': RandomRouting,
+    'smallest_mailbox': SmallestMailbox,
+    'consistent_hash': ConsistentHash,
+    'broadcast': Broadcast,
+}
+
+
+class _RouterInbox:
+    """
+    Router 的 ``actor_inbox``: 深度是所有 routee 的信箱加在一起,
+    router 嵌套在别的 router / 池里时 smallest_mailbox 和扩缩容照样能看深度.
+    """
+
+    __slots__ = ['router']
+
+    def __init__(self, router):
+        self.router = router
+
+    def qsize(self):
+        return sum(routee.actor_inbox.qsize() for routee in self.router._routees)
+
+    def empty(self):
+        return all(routee.actor_inbox.empty() for routee in self.router._routees)
+
+
+class _RouterStopped:
+    """Router 的 ``actor_stopped``: 所有 routee 都停止了才算停止."""
+
+    __slots__ = ['router']
+
+    def __init__(self, router):
+        self.router = router
+
+    def is_set(self):
+        return not self.router.is_alive()
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for routee in self.router._routees:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            routee.actor_stopped.wait(remaining)
+        return self.is_set()
+
+
+class Router(ActorRef):
+    """
+    一组 actor 的 ref, 每封信件按 ``strategy`` 交给其中一个 actor.
+
+    :param routees: :class:`ActorRef` 列表, 应该是同一个 actor 类
+    :param strategy: 策略名字(见 :data:`STRATEGIES`)或者 :class:`RoutingStrategy` 实例
+
+    已经停止的 routee 会被自动去掉, 全部停止以后 tell 抛 ActorDeadError.
+    """
+
+    def __init__(self, routees, strategy='round_robin'):
+        routees = list(routees)
+        if not routees:
+            raise ValueError('Router needs at least one routee')
+        if isinstance(strategy, str):
+            strategy = STRATEGIES[strategy]()
+        self.strategy = strategy
+        self._routees = routees
+        self._routees_lock = threading.Lock()
+        self.strategy.routees_changed(routees)
+
+        # ActorProxy 用第一个 actor 自省, 所有 routee 是同一个类.
+        self._actor = routees[0]._actor
+        self.actor_class = routees[0].actor_class
+        self.actor_urn = uuid.uuid4().urn
+        self.actor_inbox = _RouterInbox(self)
+        self.actor_stopped = _RouterStopped(self)
+
+    @classmethod
+    def start(cls, actor_class, size, *args, strategy='round_robin', **kwargs):
+        """启动 size 个 ``actor_class(*args, **kwargs)``, 返回它们的 router."""
+        routees = [actor_class.start(*args, **kwargs) for _ in range(size)]
+        return cls(routees, strategy=strategy)
+
+    def __str__(self):
+        return f"Router {self.actor_class.__name__} x{len(self._routees)} ({self.actor_urn})"
+
+    @property
+    def routees(self):
+        return list(self._routees)
+
+    def is_alive(self):
+        return any(routee.is_alive() for routee in self._routees)
+
+    def _select(self, message):
+        """选出一个活着的 routee, 顺便去掉已经停止的."""
+        while True:
+            routees = self._routees
+            if not routees:
+                raise ActorDeadError(f"{self} not found")
+            routee = self.strategy.select(message, routees)
+            if routee.is_alive():
+                return routee
+            self._remove_dead()
+
+    def _select_call(self, attr_path, args, kwargs):
+        """代理调用用的 :meth:`_select`, 不创建 ProxyCall."""
+        while True:
+            routees = self._routees
+            if not routees:
+                raise ActorDeadError(f"{self} not found")
+            routee = self.strategy.select_call(attr_path, args, kwargs, routees)
+            if routee.is_alive():
+                return routee
+            self._remove_dead()
+
+    def _remove_dead(self):
+        self._update_routees(
+            lambda routees: [routee for routee in routees if routee.is_alive()]
+        )
+
+    def _update_routees(self, func):
+        """
+        ``func(旧列表)`` 返回新列表.
+        整个列表替换(copy-on-write), 其他线程手上的旧列表不受影响.
+        """
+        with self._routees_lock:
+            routees = func(self._routees)
+            self._routees = routees
+            self.strategy.routees_changed(routees)
+
+    def _alive_routees(self):
+        routees = [routee for routee in self._routees if routee.is_alive()]
+        if len(routees) != len(self._routees):
+            self._remove_dead()
+        if not routees:
+            raise ActorDeadError(f"{self} not found")
+        return routees
+
+    def tell(self, message, priority=0):
+        if self.strategy.broadcast:
+            for routee in self._alive_routees():
+                routee.tell(message, priority=priority)
+        else:
+            self._select(message).tell(message, priority=priority)
+
+    def ask(self, message, block=True, timeout=None, priority=0):
+        if self.strategy.broadcast:
+            futures = [
+                routee.ask(message, block=False, priority=priority)
+                for routee in self._alive_routees()
+            ]
+            future = futures[0].join(*futures[1:])
+            return future.get(timeout=timeout) if block else future
+        return self._select(message).ask(
+            message, block=block, timeout=timeout, priority=priority
+        )
+
+    def _call(self, attr_path, args, kwargs, reply=True):
+        if self.strategy.broadcast:
+            message = messages.ProxyCall(attr_path=attr_path, args=args, kwargs=kwargs)
+            if not reply:
+                return self.tell(message)
+            return self.ask(message, block=False)
+        routee = self._select_call(attr_path, args, kwargs)
+        return routee._call(attr_path, args, kwargs, reply=reply)
+
+    def metrics(self):
+        """所有 routee 的指标加在一起(见 :func:`metrics.aggregate`), 都没有打开指标返回 None."""
+        items = [routee._metrics for routee in self._routees if routee._metrics is not None]
+        return aggregate(items) if items else None
+
+    def inbox_stats(self):
+        """所有 routee 的信箱统计按 key 加在一起, 都没有统计返回 None."""
+        items = [routee.inbox_stats() for routee in self._routees]
+        items = [stats for stats in items if stats is not None]
+        if not items:
+            return None
+        total = {}
+        for stats in items:
+            for key, count in stats.items():
+                total[key] = total.get(key, 0) + count
+        return total
+
+    def stop(self, block=True, timeout=None):
+        """
+        停止所有还活着的 routee, 都停止了返回 True.
+        已经停止的 routee 算作停止了(给它发停止消息不会有回复).
+        """
+        futures = [
+            routee.stop(block=False) for routee in self._routees if routee.is_alive()
+        ]
+        if futures:
+            future = futures[0].join(*futures[1:]).map(all)
+        else:
+            future = self.actor_class._create_future()
+            future.set(True)
+        return future.get(timeout=timeout) if block else future
+
+    def proxy(self):
+        return ActorProxy(self)
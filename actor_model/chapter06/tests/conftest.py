@@ -6,6 +6,7 @@ import threading
 
 # 先用库的类来测试.
 from ..threading import ThreadingFuture, ThreadingActor
+from ..asyncio import AsyncioFuture, AsyncioActor
 
 Runtime = namedtuple(
     "Runtime",
@@ -22,7 +23,17 @@ RUNTIMES = {
             sleep_func=time.sleep,
         ),
         id="threading",
-    )
+    ),
+    "asyncio": pytest.param(
+        Runtime(
+            name="asyncio",
+            actor_class=AsyncioActor,
+            event_class=threading.Event,
+            future_class=AsyncioFuture,
+            sleep_func=time.sleep,
+        ),
+        id="asyncio",
+    ),
 }
 
 
@@ -4,12 +4,11 @@ import pytest
 from pykka import ActorDeadError
 from ..actor import Actor
 from ..actor_register import ActorRegistry
-from ..threading import ThreadingActor
 
 
 @pytest.fixture(scope="module")
-def actor_class():
-    class ActorA(ThreadingActor):
+def actor_class(runtime):
+    class ActorA(runtime.actor_class):
         def __init__(self, events):
             super().__init__()
             self.events = events
@@ -47,8 +46,8 @@ def actor_class():
 
 
 @pytest.fixture(scope='session')
-def custom_actor_class():
-    class ActorB(ThreadingActor):
+def custom_actor_class(runtime):
+    class ActorB(runtime.actor_class):
         pass
 
     return ActorB
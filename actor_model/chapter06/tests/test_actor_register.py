@@ -14,7 +14,10 @@ def actor_register():
     for ref in actor_refs:
         ActorRegistry.register(ref)
 
-    return ActorRegistry
+    yield ActorRegistry
+    # 字符串不是真正的 actor_ref, 不能留给后面的 stop_all.
+    for ref in actor_refs:
+        ActorRegistry.unregister(ref)
 
 
 def test_actor_ref_register(actor_register):
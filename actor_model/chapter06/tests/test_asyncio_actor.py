@@ -0,0 +1,154 @@
+import asyncio
+import queue
+import threading
+
+import pytest
+
+from ..actor_register import ActorRegistry
+from ..asyncio import AsyncioActor, AsyncioFuture
+from ..exceptions import ActorDeadError
+from ..messages import _ActorStop
+
+
+class Sleeper(AsyncioActor):
+    async def nap(self, seconds, value):
+        await asyncio.sleep(seconds)
+        return value
+
+    def on_receive(self, message):
+        return message * 2
+
+
+def run(coroutine):
+    # 不用 asyncio.run(), 它会把当前线程的默认 loop 设成 None.
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def stop_all():
+    yield
+    ActorRegistry.stop_all()
+
+
+def test_async_method_is_awaited_by_the_actor(stop_all):
+    proxy = Sleeper.start().proxy()
+
+    assert proxy.nap(0.01, "done").get(timeout=5) == "done"
+
+
+def test_plain_message_from_another_thread(stop_all):
+    actor_ref = Sleeper.start()
+
+    assert actor_ref.ask(21, timeout=5) == 42
+    assert isinstance(actor_ref.ask(21, block=False), AsyncioFuture)
+
+
+def test_many_actors_run_on_one_event_loop_without_threads():
+    async def main():
+        before = threading.active_count()
+        proxies = [Sleeper.start().proxy() for _ in range(200)]
+        # 200 个 actor 同时 sleep, 总时间接近一次 sleep.
+        results = await asyncio.gather(
+            *[proxy.nap(0.05, i) for i, proxy in enumerate(proxies)]
+        )
+        assert threading.active_count() == before
+        for proxy in proxies:
+            await proxy.actor_ref.ask(_ActorStop(), block=False)
+        return results
+
+    assert run(asyncio.wait_for(main(), 5)) == list(range(200))
+
+
+def test_get_inside_the_event_loop_raises():
+    async def main():
+        future = AsyncioFuture()
+        with pytest.raises(RuntimeError):
+            future.get()
+        future.set("value")
+        return await future
+
+    assert run(main()) == "value"
+
+
+
+def test_remove_done_callback():
+    called = []
+    future = AsyncioFuture()
+    future.add_done_callback(called.append)
+    future.remove_done_callback(called.append)
+    done = AsyncioFuture()
+    done.add_done_callback(called.append)
+
+    future.set(1)
+    done.set(2)
+    assert done.get(timeout=5) == 2
+    future.get(timeout=5)
+    # loop 线程按加入的顺序跑回调, get() 返回时前面的回调都跑完了.
+    assert called == [done]
+
+
+class Closer(AsyncioActor):
+    def __init__(self, closed):
+        super().__init__()
+        self.closed = closed
+
+    async def nap(self, seconds, started):
+        started.set()
+        await asyncio.sleep(seconds)
+
+    async def on_stop(self):
+        await asyncio.sleep(0.01)
+        self.closed.put(self.actor_urn)
+
+
+def test_async_on_stop_is_awaited_before_stop_returns():
+    closed = queue.Queue()
+    actor_ref = Closer.start(closed)
+
+    assert actor_ref.stop(timeout=5) is True
+    assert closed.get_nowait() == actor_ref.actor_urn
+
+
+def test_cancelled_task_stops_only_its_actor(stop_all):
+    closed = queue.Queue()
+    cancelled, other = Closer.start(closed), Sleeper.start()
+    started = threading.Event()
+    future = cancelled.proxy().nap(5, started)
+
+    assert started.wait(5)
+    cancelled._actor._task.cancel()
+    with pytest.raises(ActorDeadError):
+        future.get(timeout=5)
+    assert cancelled.actor_stopped.wait(5)
+    assert not cancelled.is_alive()
+    # 取消以后 on_stop 照样被 await.
+    assert closed.get(timeout=5) == cancelled.actor_urn
+    assert other.is_alive()
+    assert other.ask(21, timeout=5) == 42
+
+
+def test_concurrent_set_succeeds_once():
+    future = AsyncioFuture()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def set_value(value):
+        barrier.wait()
+        try:
+            future.set(value)
+            results.append(value)
+        except queue.Full:
+            pass
+
+    threads = [threading.Thread(target=set_value, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 1
+    assert future.get(timeout=5) == results[0]
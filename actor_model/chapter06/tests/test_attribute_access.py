@@ -2,12 +2,11 @@
 有关属性的代理访问.
 """
 import pytest
-from ..threading import ThreadingActor
 
 
 @pytest.fixture
-def actor_class():
-    class ActorWithProperties(ThreadingActor):
+def actor_class(runtime):
+    class ActorWithProperties(runtime.actor_class):
         an_attr = "an_attr"
         _private_attr = "secret"
 
@@ -34,12 +33,12 @@ def actor_class():
 def proxy(actor_class):
     proxy = actor_class.start().proxy()
     yield proxy
-    proxy.stop()
+    proxy.actor_ref.stop()
 
 
 def test_attr_can_be_read_using_get_postfix(proxy):
     assert proxy.an_attr.get() == "an_attr_value"
-    proxy.stop()
+    proxy.actor_ref.stop()
 
 
 def test_attr_can_be_set_using_assignment(proxy):
@@ -97,9 +96,9 @@ def test_read_only_property_cannot_be_set(proxy):
 
 
 # 创建代理的时候属性并不访问.
-def test_property_is_not_accessed_when_creating_proxy():
+def test_property_is_not_accessed_when_creating_proxy(runtime):
 
-    class ExpensiveSideEffectActor(ThreadingActor):
+    class ExpensiveSideEffectActor(runtime.actor_class):
         @property
         def a_property(self):
             # 如果读取会触发异常.
@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+
+from ..actor_register import ActorRegistry
+from ..envelope import Envelope
+from ..exceptions import MailboxFull
+from ..inbox import BoundedInbox
+from ..messages import _ActorStop
+from ..routing import Router
+from ..threading import ThreadingActor, ThreadingFuture
+
+
+def fill(inbox, *messages):
+    for message in messages:
+        inbox.put(Envelope(message))
+
+
+def drain(inbox):
+    return [inbox.get_nowait().message for _ in range(inbox.qsize())]
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedInbox(1, overflow='explode')
+
+
+def test_raise_policy():
+    inbox = BoundedInbox(2, overflow='raise')
+    fill(inbox, 1, 2)
+
+    with pytest.raises(MailboxFull):
+        inbox.put(Envelope(3))
+    assert drain(inbox) == [1, 2]
+    assert inbox.stats['raise'] == 1
+
+
+def test_drop_newest_policy_fails_the_reply_future():
+    inbox = BoundedInbox(1, overflow='drop_newest')
+    fill(inbox, 1)
+    future = ThreadingFuture()
+    inbox.put(Envelope(2, reply_to=future))
+
+    assert drain(inbox) == [1]
+    with pytest.raises(MailboxFull):
+        future.get(timeout=0)
+    assert inbox.stats['drop_newest'] == 1
+
+
+def test_drop_oldest_policy():
+    inbox = BoundedInbox(2, overflow='drop_oldest')
+    fill(inbox, 1, 2, 3)
+
+    assert drain(inbox) == [2, 3]
+    assert inbox.stats['drop_oldest'] == 1
+
+
+def test_block_policy_waits_for_room():
+    inbox = BoundedInbox(1, overflow='block')
+    fill(inbox, 1)
+    threading.Timer(0.05, inbox.get).start()
+
+    inbox.put(Envelope(2), timeout=5)
+    assert drain(inbox) == [2]
+    assert inbox.stats['block'] == 1
+
+
+def test_block_policy_times_out():
+    inbox = BoundedInbox(1, overflow='block', put_timeout=0.01)
+    fill(inbox, 1)
+
+    with pytest.raises(MailboxFull):
+        inbox.put(Envelope(2))
+    assert inbox.stats['block_timeout'] == 1
+
+
+def test_stop_message_ignores_capacity():
+    inbox = BoundedInbox(1, overflow='drop_oldest')
+    fill(inbox, 1, _ActorStop(), 2)
+
+    messages = drain(inbox)
+    assert isinstance(messages[0], _ActorStop)
+    assert messages[1:] == [2]
+
+
+def test_drop_oldest_with_only_stop_messages_drops_the_newest():
+    inbox = BoundedInbox(1, overflow='drop_oldest')
+    fill(inbox, _ActorStop())
+    future = ThreadingFuture()
+    inbox.put(Envelope(1, reply_to=future))
+
+    assert inbox.qsize() == 1
+    with pytest.raises(MailboxFull):
+        future.get(timeout=0)
+    assert inbox.stats['drop_oldest'] == 1
+
+
+def test_inbox_stats_through_the_ref():
+    gate = threading.Event()
+
+    class Dropping(ThreadingActor):
+        inbox_capacity = 1
+        inbox_overflow = 'drop_newest'
+
+        def on_start(self):
+            gate.wait(5)
+
+    actor_ref = Dropping.start()
+    actor_ref.tell(1)
+    actor_ref.tell(2)
+
+    stats = actor_ref.inbox_stats()
+    assert stats['drop_newest'] == 1
+    stats['drop_newest'] = 0
+    assert Router([actor_ref]).inbox_stats()['drop_newest'] == 1
+    assert ThreadingActor.start().inbox_stats() is None
+    gate.set()
+    ActorRegistry.stop_all()
+
+
+def test_tell_raises_when_actor_inbox_is_full():
+    gate = threading.Event()
+
+    class SlowActor(ThreadingActor):
+        inbox_capacity = 2
+        inbox_overflow = 'raise'
+
+        def on_start(self):
+            gate.wait(5)
+
+    actor_ref = SlowActor.start()
+    actor_ref.tell(1)
+    actor_ref.tell(2)
+    with pytest.raises(MailboxFull):
+        actor_ref.tell(3)
+    gate.set()
+    # 停止消息不受容量限制.
+    assert actor_ref.stop(timeout=5) is True
+    ActorRegistry.stop_all()
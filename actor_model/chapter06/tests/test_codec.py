@@ -0,0 +1,146 @@
+import pickle
+
+import pytest
+
+from ..codec import FIRST_USER_TAG, Codec, default_codec
+from ..messages import ProxyBatchCall, ProxyCall, ProxyGetAttr, ProxySetAttr, _ActorStop
+from ..process import ProcessActor
+from ..remote import ActorServer, RemoteNode
+from ..threading import ThreadingActor
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other):
+        return isinstance(other, Point) and (self.x, self.y) == (other.x, other.y)
+
+
+point_codec = default_codec.copy()
+point_codec.register(Point, FIRST_USER_TAG, lambda p: (p.x, p.y), Point)
+
+
+class PointActor(ProcessActor):
+    codec = point_codec
+
+    def move(self, point, dx):
+        return Point(point.x + dx, point.y)
+
+
+class PointThreadActor(ThreadingActor):
+    def move(self, point, dx):
+        return Point(point.x + dx, point.y)
+
+
+def test_builtin_messages_round_trip():
+    for message in [
+        ProxyCall(('resolve',), ('8.8.8.8',), {'timeout': 1}),
+        ProxyGetAttr(('counter', 'count')),
+        ProxySetAttr(('greeting',), 'hi'),
+        ProxyBatchCall([(('a',), (1,), {}), (('b', 'c'), (), {'x': 2})]),
+    ]:
+        decoded = default_codec.loads(default_codec.dumps(message))
+        assert type(decoded) is type(message)
+        assert {s: getattr(decoded, s) for s in type(message).__slots__} == \
+               {s: getattr(message, s) for s in type(message).__slots__}
+    assert isinstance(default_codec.loads(default_codec.dumps(_ActorStop())), _ActorStop)
+
+
+def test_builtin_messages_are_smaller_than_pickle():
+    message = ProxyCall(('resolve',), ('8.8.8.8',), {})
+
+    assert len(default_codec.dumps(message)) < len(pickle.dumps(message, protocol=5))
+
+
+def test_decoded_attr_path_is_interned():
+    first = default_codec.loads(default_codec.dumps(ProxyGetAttr(('a', 'b'))))
+    second = default_codec.loads(default_codec.dumps(ProxyGetAttr(('a', 'b'))))
+
+    assert first.attr_path is second.attr_path
+
+
+def test_attr_path_given_as_a_list():
+    message = ProxyCall(['nested', 'method'], (1,), {})
+
+    decoded = default_codec.loads(default_codec.dumps(message))
+
+    assert decoded.attr_path == ('nested', 'method')
+
+
+def test_attr_path_too_deep_raises_pickling_error():
+    message = ProxyGetAttr(('a',) * 256)
+
+    with pytest.raises(pickle.PicklingError):
+        default_codec.dumps(message)
+    deepest = ProxyGetAttr(('a',) * 255)
+    assert default_codec.loads(default_codec.dumps(deepest)).attr_path == ('a',) * 255
+
+
+def test_register_duplicate_type_or_tag():
+    codec = Codec()
+    codec.register(Point, FIRST_USER_TAG, lambda p: (p.x, p.y), Point)
+
+    with pytest.raises(ValueError):
+        codec.register(Point, FIRST_USER_TAG + 1, lambda p: (p.x, p.y), Point)
+    with pytest.raises(ValueError):
+        codec.register(dict, FIRST_USER_TAG, lambda d: (), dict)
+
+
+def test_unregister_and_copy():
+    codec = default_codec.copy()
+    codec.register(Point, FIRST_USER_TAG, lambda p: (p.x, p.y), Point)
+    codec.unregister(Point)
+
+    codec.register(Point, FIRST_USER_TAG, lambda p: (p.x, p.y), Point)
+    assert Point not in default_codec._encoders
+
+
+def test_unknown_tag_raises():
+    data = point_codec.dumps(Point(1, 2))
+
+    with pytest.raises(pickle.UnpicklingError):
+        default_codec.loads(data)
+
+
+def test_user_type_round_trip_inside_message():
+    message = ProxyCall(('move',), (Point(1, 2),), {'dx': Point(3, 4)})
+
+    decoded = point_codec.loads(point_codec.dumps(message))
+
+    assert decoded.args == (Point(1, 2),)
+    assert decoded.kwargs == {'dx': Point(3, 4)}
+
+
+def test_pickle_buffer_in_args_stays_out_of_band():
+    data = bytearray(b'x' * 1000)
+    buffers = []
+
+    encoded = default_codec.dumps(
+        ProxyCall(('size',), (pickle.PickleBuffer(data),), {}), buffer_callback=buffers.append,
+    )
+
+    assert len(encoded) < 100
+    assert len(buffers) == 1
+    decoded = default_codec.loads(encoded, buffers=buffers)
+    assert bytes(decoded.args[0]) == bytes(data)
+
+
+def test_process_actor_with_custom_codec():
+    ref = PointActor.start()
+    try:
+        assert ref.proxy().move(Point(1, 2), 3).get(timeout=10) == Point(4, 2)
+    finally:
+        ref.stop()
+
+
+def test_remote_with_custom_codec():
+    server = ActorServer(codec=point_codec).start()
+    ref = PointThreadActor.start()
+    try:
+        remote = RemoteNode(server.address, codec=point_codec).get_by_urn(ref.actor_urn)
+        assert remote.proxy().move(Point(1, 2), 3).get(timeout=5) == Point(4, 2)
+    finally:
+        ref.stop()
+        server.stop()
@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from ..actor_register import ActorRegistry
+from ..dispatcher import Dispatcher, PooledActor
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = Dispatcher(workers=2, throughput=4)
+    yield dispatcher
+    ActorRegistry.stop_all()
+    dispatcher.shutdown()
+
+
+@pytest.fixture
+def actor_class(dispatcher):
+    class CountingActor(PooledActor):
+        def __init__(self):
+            super().__init__()
+            self.started = False
+            self.count = 0
+            self.running = 0
+            self.overlapped = False
+
+        def on_start(self):
+            self.started = True
+
+        def on_receive(self, message):
+            if message == "get":
+                return self.started, self.count, self.overlapped
+            # 同一个 actor 不能同时被两个 worker 处理.
+            self.running += 1
+            if self.running > 1:
+                self.overlapped = True
+            self.count += 1
+            self.running -= 1
+
+    CountingActor.dispatcher = dispatcher
+    return CountingActor
+
+
+def test_pooled_actors_share_the_worker_threads(actor_class, dispatcher):
+    before = threading.active_count()
+    refs = [actor_class.start() for _ in range(50)]
+    for ref in refs:
+        ref.tell("inc")
+
+    assert all(ref.ask("get", timeout=5)[1] == 1 for ref in refs)
+    assert threading.active_count() - before <= dispatcher.workers
+
+
+def test_pooled_actor_handles_one_message_at_a_time(actor_class):
+    refs = [actor_class.start() for _ in range(5)]
+    for _ in range(200):
+        for ref in refs:
+            ref.tell("inc")
+
+    for ref in refs:
+        assert ref.ask("get", timeout=5) == (True, 200, False)
+
+
+def test_pooled_actor_can_be_stopped(actor_class):
+    actor_ref = actor_class.start()
+
+    assert actor_ref.stop(timeout=5) is True
+    assert not actor_ref.is_alive()
+    assert ActorRegistry.get_by_urn(actor_ref.actor_urn) is None
+
+
+def test_pooled_actor_proxy(actor_class):
+    class Greeter(actor_class):
+        def hello(self, name):
+            return f"Hello, {name}!"
+
+    proxy = Greeter.start().proxy()
+
+    assert proxy.hello("pool").get(timeout=5) == "Hello, pool!"
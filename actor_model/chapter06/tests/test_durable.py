@@ -0,0 +1,245 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from ..durable import DurableActor, DurableInbox, SegmentLog
+from ..envelope import Envelope
+from ..messages import _ActorStop
+
+
+def segment_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.seg'))
+
+
+class Recorder(DurableActor):
+    inbox_segment_size = 4096
+    inbox_fsync_interval = 0.001
+
+    def __init__(self, gate=None):
+        super().__init__()
+        self.gate = gate
+        self.received = []
+
+    def on_receive(self, message):
+        if message == 'wait':
+            self.gate.wait(5)
+        self.received.append(message)
+        return message
+
+    def add(self, value):
+        self.received.append(value)
+        return len(self.received)
+
+
+@pytest.fixture
+def recorder_class(tmp_path):
+    return type('Recorder', (Recorder,), {'inbox_path': str(tmp_path / 'inbox')})
+
+
+def test_log_append_and_replay_across_segments(tmp_path):
+    log = SegmentLog(str(tmp_path), segment_size=256, fsync_interval=None)
+    payloads = [bytes([i]) * 50 for i in range(20)]
+    seqs = [log.append(payload) for payload in payloads]
+    log.close()
+
+    assert seqs == list(range(1, 21))
+    assert len(segment_files(tmp_path)) > 1
+    log = SegmentLog(str(tmp_path), segment_size=256, fsync_interval=None)
+    assert list(log.replay(15)) == list(zip(range(15, 21), payloads[14:]))
+    assert log.append(b'next') == 21
+    log.close()
+
+
+def test_log_record_larger_than_segment(tmp_path):
+    log = SegmentLog(str(tmp_path), segment_size=128, fsync_interval=None)
+    log.append(b'small')
+    log.append(b'x' * 1000)
+
+    assert [payload for _, payload in log.replay()] == [b'small', b'x' * 1000]
+    log.close()
+
+
+def test_log_truncates_torn_record(tmp_path):
+    log = SegmentLog(str(tmp_path), fsync_interval=None)
+    for i in range(3):
+        log.append(b'record %d' % i)
+    log.close()
+    path = os.path.join(tmp_path, segment_files(tmp_path)[-1])
+    with open(path, 'r+b') as file:
+        # 第三条记录的数据写了一半.
+        file.seek(2 * (16 + 8) + 16 + 3)
+        file.write(b'??')
+
+    log = SegmentLog(str(tmp_path), fsync_interval=None)
+    assert [seq for seq, _ in log.replay()] == [1, 2]
+    assert log.append(b'again') == 3
+    assert [payload for _, payload in log.replay(3)] == [b'again']
+    log.close()
+
+
+def test_log_truncate_keeps_retention(tmp_path):
+    log = SegmentLog(str(tmp_path), segment_size=128, fsync_interval=None, retention=1)
+    for _ in range(10):
+        log.append(b'x' * 100)
+    assert len(segment_files(tmp_path)) == 10
+
+    log.truncate(8)
+    assert segment_files(tmp_path) == [f'{seq:020d}.seg' for seq in (7, 8, 9, 10)]
+    assert [seq for seq, _ in log.replay()] == [7, 8, 9, 10]
+    log.close()
+
+
+def test_log_truncate_while_appending(tmp_path):
+    log = SegmentLog(str(tmp_path), segment_size=128, fsync_interval=None)
+    errors = []
+
+    def truncate():
+        try:
+            for seq in range(1, 200):
+                log.truncate(seq)
+        except Exception as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=truncate)
+    thread.start()
+    # 每条记录都换一个段.
+    for _ in range(200):
+        log.append(b'x' * 100)
+    thread.join()
+    log.truncate(200)
+
+    assert errors == []
+    assert [seq for seq, _ in log.replay()] == [200]
+    log.close()
+
+
+def test_log_directory_is_locked(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        SegmentLog(str(tmp_path))
+    log.close()
+    SegmentLog(str(tmp_path)).close()
+
+
+def test_log_group_commit(tmp_path):
+    log = SegmentLog(str(tmp_path), fsync_interval=0.005)
+
+    def produce():
+        for _ in range(20):
+            assert log.wait_synced(log.append(b'x' * 64), timeout=5)
+
+    threads = [threading.Thread(target=produce) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    log.close()
+
+    assert log.stats['records'] == 160
+    assert log.stats['syncs'] < 160
+
+
+def _crash_after_two_gets(directory):
+    inbox = DurableInbox(directory)
+    for i in range(5):
+        inbox.put(Envelope(i))
+    inbox.get()
+    inbox.get()  # 确认了 0, 1 还没确认
+    os._exit(0)
+
+
+def test_inbox_replays_unacked_after_crash(tmp_path):
+    directory = str(tmp_path)
+    process = multiprocessing.get_context('fork').Process(
+        target=_crash_after_two_gets, args=(directory,)
+    )
+    process.start()
+    process.join(10)
+    assert process.exitcode == 0
+
+    inbox = DurableInbox(directory)
+    assert inbox.recovered == 4
+    assert [inbox.get_nowait().message for _ in range(4)] == [1, 2, 3, 4]
+    inbox.close()
+
+
+def test_inbox_does_not_ack_after_stop(tmp_path):
+    inbox = DurableInbox(str(tmp_path), fsync_interval=None)
+    for message in ['a', 'b']:
+        inbox.put(Envelope(message))
+    inbox.put(Envelope(_ActorStop()))
+    inbox.put(Envelope('c', priority=3))
+
+    assert [e.message for e in inbox.get_batch(3)][:2] == ['a', 'b']
+    assert inbox.get().message == 'c'  # 停止以后的剩余信件
+    inbox.close()
+
+    inbox = DurableInbox(str(tmp_path), fsync_interval=None)
+    envelope = inbox.get_nowait()
+    assert (envelope.message, envelope.priority, envelope.reply_to) == ('c', 3, None)
+    inbox.close()
+
+
+def test_inbox_put_unpicklable_raises(tmp_path):
+    inbox = DurableInbox(str(tmp_path), fsync_interval=None)
+
+    with pytest.raises(TypeError):
+        inbox.put(Envelope(threading.Lock()))
+    assert inbox.empty()
+    inbox.close()
+
+
+def test_actor_without_path_fails():
+    with pytest.raises(ValueError):
+        Recorder.start()
+
+
+def test_actor_tell_ask_and_proxy(recorder_class):
+    ref = recorder_class.start()
+    ref.tell('one')
+
+    assert ref.ask('two', timeout=5) == 'two'
+    assert ref.proxy().add('three').get(timeout=5) == 3
+    ref.stop()
+
+
+def test_actor_leftovers_are_redelivered_after_restart(recorder_class):
+    gate = threading.Event()
+    ref = recorder_class.start(gate)
+    ref.tell('done')
+    ref.tell('wait')
+    stopped = ref.stop(block=False)
+    # 停止消息排在 'late' 前面, 'late' 没有处理.
+    ref.actor_inbox.put(Envelope('late'))
+    gate.set()
+    assert stopped.get(timeout=5)
+
+    ref = recorder_class.start()
+    proxy = ref.proxy()
+    proxy.add('check').get(timeout=5)
+    assert proxy.received.get(timeout=5) == ['late', 'check']
+    ref.stop()
+
+
+def test_actor_proxy_call_is_redelivered(recorder_class):
+    gate = threading.Event()
+    ref = recorder_class.start(gate)
+    proxy = ref.proxy()
+    ref.tell('wait')
+    stopped = ref.stop(block=False)
+    proxy.add('queued')
+    gate.set()
+    assert stopped.get(timeout=5)
+
+    ref = recorder_class.start()
+    assert ref.proxy().received.get(timeout=5) == ['queued']
+    ref.stop()
+
+
+def test_actor_directory_is_exclusive(recorder_class):
+    ref = recorder_class.start()
+    with pytest.raises(RuntimeError):
+        recorder_class.start()
+    ref.stop()
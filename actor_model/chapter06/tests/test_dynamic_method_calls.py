@@ -1,12 +1,11 @@
 import pytest
 # from pykka import ThreadingActor, ActorRegistry
-from ..threading import ThreadingActor
 from ..actor_register import ActorRegistry
 
 
 @pytest.fixture(scope="module")
-def actor_class():
-    class ActorA(ThreadingActor):
+def actor_class(runtime):
+    class ActorA(runtime.actor_class):
         def add_method(self, name):
             setattr(self, name, lambda: "returned by " + name)
 
@@ -27,7 +26,7 @@ def stop_all():
 def proxy(actor_class):
     proxy = actor_class.start().proxy()
     yield proxy
-    proxy.stop()
+    proxy.actor_ref.stop()
 
 
 def test_can_call_method_that_was_added_at_runtime(proxy):
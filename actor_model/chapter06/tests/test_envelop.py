@@ -1,5 +1,6 @@
-from ..envelope import Envelope
-from ..messages import _ActorStop, ProxyCall, ProxyGetAttr, ProxySetAttr
+from ..envelope import Envelope, ProxyCallEnvelope
+from .. import messages
+from ..messages import _ActorStop, _intern_attr_path, ProxyCall, ProxyGetAttr, ProxySetAttr
 
 
 def test_actor_stop():
@@ -47,3 +48,41 @@ def test_envelope_payload_message():
     message = ProxyGetAttr(attr_path=["nested", "attr"])
     envelope = Envelope(message=message, reply_to="future")
     assert envelope.message.__class__.__name__ == 'ProxyGetAttr'
+
+
+def test_proxy_messages_have_no_instance_dict():
+    for message in [
+        _ActorStop(),
+        ProxyCall(attr_path=("method",), args=(), kwargs={}),
+        ProxyGetAttr(attr_path=("attr",)),
+        ProxySetAttr(attr_path=("attr",), value=1),
+    ]:
+        assert not hasattr(message, "__dict__")
+
+
+def test_proxy_call_envelope_is_its_own_message():
+    envelope = ProxyCallEnvelope(("method",), (1,), {}, reply_to="future")
+
+    assert envelope.message is envelope
+    assert isinstance(envelope.message, ProxyCall)
+    assert envelope.reply_to == "future"
+    assert envelope.priority == 0
+    assert not hasattr(envelope, "__dict__")
+
+
+def test_intern_attr_path():
+    attr_path = _intern_attr_path(("nested", "method"))
+
+    assert _intern_attr_path(tuple(["nested", "method"])) is attr_path
+
+
+def test_intern_attr_path_is_bounded(monkeypatch):
+    monkeypatch.setattr(messages, "_attr_paths", {})
+    monkeypatch.setattr(messages, "_ATTR_PATH_CACHE_SIZE", 2)
+    first = _intern_attr_path(("a",))
+    _intern_attr_path(("b",))
+
+    attr_path = ("c",)
+    assert _intern_attr_path(attr_path) is attr_path
+    assert len(messages._attr_paths) == 2
+    assert _intern_attr_path(tuple(["a"])) is first
@@ -1,9 +1,14 @@
 import asyncio
+import threading
+import time
 
 import pytest
-from pykka import ThreadingFuture
+from ..threading import ThreadingFuture
 
-from ..future import Future, get_all
+from ..exceptions import Timeout
+from ..future import (
+    FIRST_COMPLETED, FIRST_EXCEPTION, Future, as_completed, get_all, wait, wait_any
+)
 
 pytest.fixture(scope='module')
 
@@ -126,3 +131,167 @@ def test_map_works_on_dict(future):
     mapped = future.map(lambda x: x['foo'])
     future.set({"foo": "bar"})
     assert mapped.get(timeout=1) == 'bar'
+
+
+def test_add_done_callback_is_called_on_set(future):
+    called = []
+    future.add_done_callback(lambda f: called.append(f.get(timeout=0)))
+    assert called == []
+
+    future.set(1)
+    assert called == [1]
+
+
+def test_add_done_callback_on_completed_future_is_called_immediately(future):
+    called = []
+    future.set(1)
+    future.add_done_callback(lambda f: called.append(f.get(timeout=0)))
+
+    assert called == [1]
+
+
+def test_map_is_resolved_eagerly_by_the_completing_thread(future):
+    threads = []
+
+    def record_thread(x):
+        threads.append(threading.current_thread())
+        return x + 1
+
+    mapped = future.map(record_thread)
+    setter = threading.Thread(target=future.set, args=(1,))
+    setter.start()
+    setter.join()
+
+    assert threads == [setter]
+    assert mapped.get(timeout=0) == 2
+
+
+def test_long_map_chain_does_not_need_get_per_stage(future):
+    mapped = future
+    for _ in range(1000):
+        mapped = mapped.map(lambda x: x + 1)
+    future.set(0)
+
+    assert mapped.get(timeout=0) == 1000
+
+
+def test_map_propagates_exceptions(future):
+    mapped = future.map(lambda x: 1 / x)
+    future.set(0)
+
+    with pytest.raises(ZeroDivisionError):
+        mapped.get(timeout=0)
+
+
+def test_join_propagates_first_exception(futures):
+    joined = futures[0].join(futures[1], futures[2])
+    futures[0].set(0)
+    futures[1].set_exception((ValueError, ValueError("boom"), None))
+    futures[2].set(2)
+
+    with pytest.raises(ValueError):
+        joined.get(timeout=0)
+
+
+def test_map_on_hooked_future_falls_back_to_lazy_get(future):
+    future.set_get_hook(lambda timeout: 41)
+    mapped = future.map(lambda x: x + 1)
+
+    assert mapped.get(timeout=0) == 42
+
+
+def test_get_all_timeout_is_shared_by_all_futures(futures):
+    futures[0].set(0)
+    started = time.monotonic()
+
+    with pytest.raises(Timeout):
+        get_all(futures, timeout=0.1)
+
+    # 不是 futures[1] 和 futures[2] 各等 0.1 秒.
+    assert time.monotonic() - started < 0.18
+
+
+def test_as_completed_yields_in_completion_order(futures):
+    futures[2].set(2)
+    threading.Timer(0.02, futures[0].set, args=(0,)).start()
+    threading.Timer(0.05, futures[1].set, args=(1,)).start()
+
+    assert [f.get() for f in as_completed(futures, timeout=5)] == [2, 0, 1]
+
+
+def test_as_completed_raises_timeout(futures):
+    futures[1].set(1)
+    completed = as_completed(futures, timeout=0.05)
+
+    assert next(completed) is futures[1]
+    with pytest.raises(Timeout):
+        next(completed)
+
+
+def test_wait_any_returns_first_completed(futures):
+    threading.Timer(0.02, futures[1].set, args=("first",)).start()
+
+    assert wait_any(futures, timeout=5) is futures[1]
+
+
+def test_wait_any_timeout(futures):
+    with pytest.raises(Timeout):
+        wait_any(futures, timeout=0.01)
+
+
+def test_wait_first_completed(futures):
+    futures[0].set(0)
+
+    done, not_done = wait(futures, timeout=5, return_when=FIRST_COMPLETED)
+
+    assert done == {futures[0]}
+    assert not_done == {futures[1], futures[2]}
+
+
+def test_wait_first_exception(futures):
+    futures[0].set(0)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        futures[1].set_exception()
+
+    done, not_done = wait(futures, timeout=5, return_when=FIRST_EXCEPTION)
+
+    assert done == {futures[0], futures[1]}
+    assert not_done == {futures[2]}
+
+
+def test_wait_all_completed_returns_not_done_on_timeout(futures):
+    futures[0].set(0)
+    futures[1].set(1)
+
+    done, not_done = wait(futures, timeout=0.05)
+
+    assert done == {futures[0], futures[1]}
+    assert not_done == {futures[2]}
+
+
+def test_wait_rejects_unknown_return_when(futures):
+    with pytest.raises(ValueError):
+        wait(futures, return_when="SOMETIMES")
+
+
+def test_remove_done_callback(future):
+    called = []
+    future.add_done_callback(called.append)
+    future.remove_done_callback(called.append)
+    future.remove_done_callback(called.append)
+
+    future.set(1)
+    assert called == []
+
+
+def test_waiting_does_not_leave_callbacks_behind(futures):
+    never = futures[0]
+    futures[1].set(1)
+    for _ in range(20):
+        with pytest.raises(Timeout):
+            wait_any([never], timeout=0)
+        wait(futures, timeout=0, return_when=FIRST_COMPLETED)
+
+    assert not never._callbacks
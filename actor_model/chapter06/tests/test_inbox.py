@@ -0,0 +1,76 @@
+import queue
+import threading
+
+import pytest
+
+from ..actor_register import ActorRegistry
+from ..dispatcher import Dispatcher, PooledActor
+from ..inbox import MPSCInbox
+from ..threading import ThreadingActor
+
+
+@pytest.fixture
+def inbox():
+    return MPSCInbox()
+
+
+def test_mpsc_inbox_is_fifo(inbox):
+    for i in range(5):
+        inbox.put(i)
+
+    assert inbox.qsize() == 5
+    assert [inbox.get() for _ in range(5)] == [0, 1, 2, 3, 4]
+    assert inbox.empty()
+
+
+def test_mpsc_inbox_get_nowait_raises_empty(inbox):
+    with pytest.raises(queue.Empty):
+        inbox.get_nowait()
+
+
+def test_mpsc_inbox_get_times_out(inbox):
+    with pytest.raises(queue.Empty):
+        inbox.get(timeout=0.01)
+
+
+def test_mpsc_inbox_wakes_up_blocked_consumer(inbox):
+    timer = threading.Timer(0.05, inbox.put, args=["late"])
+    timer.start()
+
+    assert inbox.get(timeout=5) == "late"
+
+
+def test_mpsc_inbox_with_many_producers(inbox):
+    def produce(n):
+        for i in range(1000):
+            inbox.put((n, i))
+
+    producers = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+    for thread in producers:
+        thread.start()
+    received = [inbox.get(timeout=5) for _ in range(4000)]
+    for thread in producers:
+        thread.join()
+
+    # 每个生产者自己的顺序不变.
+    for n in range(4):
+        assert [i for m, i in received if m == n] == list(range(1000))
+
+
+@pytest.mark.parametrize("base_class", [ThreadingActor, PooledActor])
+def test_actor_with_mpsc_inbox(base_class):
+    class MPSCActor(base_class):
+        inbox_class = MPSCInbox
+        dispatcher = Dispatcher(workers=1)
+
+        def on_receive(self, message):
+            return message + 1
+
+    actor_ref = MPSCActor.start()
+    inbox = actor_ref.actor_inbox
+    # PooledActor 的信箱外面还包了一层.
+    assert isinstance(getattr(inbox, '_inbox', inbox), MPSCInbox)
+    assert actor_ref.ask(1, timeout=5) == 2
+    assert actor_ref.stop(timeout=5) is True
+    MPSCActor.dispatcher.shutdown()
+    ActorRegistry.stop_all()
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from ..actor_register import ActorRegistry
+from ..dispatcher import Dispatcher, PooledActor
+from ..envelope import Envelope
+from ..threading import ThreadingActor
+
+
+class BatchingActor(ThreadingActor):
+    inbox_batch_size = 16
+
+    def __init__(self, gate):
+        super().__init__()
+        self.gate = gate
+        self.batches = []
+
+    def on_start(self):
+        # 先挡住, 让信件在信箱里攒起来.
+        self.gate.wait(5)
+
+    def on_receive(self, message):
+        if message == "batches":
+            return self.batches
+
+    def on_receive_batch(self, messages):
+        self.batches.append(len(messages))
+        return [self.on_receive(message) for message in messages]
+
+
+@pytest.fixture
+def stop_all():
+    yield
+    ActorRegistry.stop_all()
+
+
+def test_messages_are_drained_in_batches(stop_all):
+    gate = threading.Event()
+    actor_ref = BatchingActor.start(gate)
+    for i in range(40):
+        actor_ref.tell(i)
+    gate.set()
+
+    # 40 条 + "batches" 按 16 分批.
+    assert actor_ref.ask("batches", timeout=5) == [16, 16, 9]
+
+
+def test_replies_are_delivered_for_batched_asks(stop_all):
+    class Doubler(ThreadingActor):
+        inbox_batch_size = 8
+
+        def on_receive_batch(self, messages):
+            return [message * 2 for message in messages]
+
+    actor_ref = Doubler.start()
+    futures = [actor_ref.ask(i, block=False) for i in range(20)]
+
+    assert [f.get(timeout=5) for f in futures] == [i * 2 for i in range(20)]
+
+
+def test_short_reply_list_fails_every_ask(stop_all):
+    class Short(BatchingActor):
+        def on_receive_batch(self, messages):
+            return [message for message in messages[1:]]
+
+    gate = threading.Event()
+    actor_ref = Short.start(gate)
+    futures = [actor_ref.ask(i, block=False) for i in range(3)]
+    gate.set()
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.get(timeout=5)
+
+
+def test_messages_after_stop_in_a_batch_are_not_handled():
+    gate = threading.Event()
+    actor_ref = BatchingActor.start(gate)
+    actor_ref.tell(1)
+    stop_future = actor_ref.stop(block=False)
+    # 绕过 tell 的存活检查, 直接放一封排在停止消息后面的信件.
+    actor_ref.actor_inbox.put(Envelope(2))
+    gate.set()
+
+    assert stop_future.get(timeout=5) is True
+    assert actor_ref._actor.batches == [1]
+
+
+def test_pooled_actor_uses_batches():
+    dispatcher = Dispatcher(workers=1)
+
+    class PooledBatchingActor(BatchingActor, PooledActor):
+        pass
+
+    PooledBatchingActor.dispatcher = dispatcher
+    gate = threading.Event()
+    actor_ref = PooledBatchingActor.start(gate)
+    for i in range(20):
+        actor_ref.tell(i)
+    gate.set()
+
+    assert actor_ref.ask("batches", timeout=5) == [16, 5]
+    actor_ref.stop()
+    dispatcher.shutdown()
@@ -0,0 +1,224 @@
+import threading
+
+import pytest
+
+from ..actor_register import ActorRegistry
+from ..dispatcher import Dispatcher, PooledActor
+from ..envelope import Envelope
+from ..metrics import Histogram
+from ..routing import Router
+from ..threading import ThreadingActor
+
+
+@pytest.fixture
+def metered_class(runtime):
+    class Metered(runtime.actor_class):
+        collect_metrics = True
+        metrics_sample_every = 1
+
+        def on_receive(self, message):
+            if message == 'fail':
+                raise ValueError(message)
+            return message
+
+        def resolve(self, name):
+            return name
+
+    return Metered
+
+
+class Gated(ThreadingActor):
+    collect_metrics = True
+    metrics_sample_every = 1
+
+    def __init__(self, gate):
+        super().__init__()
+        self.gate = gate
+
+    def on_receive(self, message):
+        if message == 'wait':
+            self.gate.wait(5)
+        return message
+
+
+class Batched(ThreadingActor):
+    collect_metrics = True
+    inbox_batch_size = 10
+
+    def __init__(self, gate):
+        super().__init__()
+        self.gate = gate
+
+    def on_receive(self, message):
+        self.gate.wait(5)
+
+    def on_receive_batch(self, messages):
+        return messages
+
+
+@pytest.fixture(autouse=True)
+def stop_all():
+    yield
+    ActorRegistry.stop_all()
+
+
+def test_disabled_by_default():
+    ref = ThreadingActor.start()
+
+    assert ref.metrics() is None
+    assert ref._actor.actor_metrics is None
+    assert ActorRegistry.metrics()['actors'] == 0
+
+
+def test_processed_handler_time_and_queue_wait(metered_class):
+    ref = metered_class.start()
+    for i in range(3):
+        ref.tell(str(i))
+    ref.ask('last', timeout=5)
+    ref.proxy().resolve('x').get(timeout=5)
+
+    metrics = ref.metrics()
+    assert metrics['processed'] == 5
+    assert metrics['handler_time']['str']['count'] == 4
+    assert metrics['handler_time']['resolve()']['count'] == 1
+    assert metrics['queue_wait']['count'] == 5
+    assert 0 < metrics['handler_time']['str']['max'] < 1
+    assert metrics['exceptions'] == 0
+
+
+def test_swallowed_exceptions(metered_class):
+    ref = metered_class.start()
+    ref.tell('fail')
+    ref.tell('fail')
+    ref.ask('ok', timeout=5)
+
+    metrics = ref.metrics()
+    assert metrics['exceptions'] == 2
+    assert metrics['exception_types'] == {'ValueError': 2}
+    assert metrics['processed'] == 3
+
+
+def test_mailbox_depth_high_water_mark():
+    gate = threading.Event()
+    ref = Gated.start(gate)
+    ref.tell('wait')
+    for i in range(5):
+        ref.tell(i)
+
+    assert ref.metrics()['depth'] >= 5
+    gate.set()
+    ref.ask('flush', timeout=5)
+    metrics = ref.metrics()
+    assert metrics['max_depth'] >= 6
+    assert metrics['depth'] == 0
+    assert metrics['queue_wait']['max'] > 0
+
+
+def test_batch_is_timed_once():
+    gate = threading.Event()
+    ref = Batched.start(gate)
+    ref.tell('wait')
+    for i in range(4):
+        ref.tell(i)
+    ref.tell('flush')
+    future = ref.ask('reply', block=False)
+    gate.set()
+    future.get(timeout=5)
+
+    metrics = ref.metrics()
+    assert metrics['processed'] == 7
+    assert metrics['handler_time']['on_receive_batch']['count'] >= 1
+
+
+def test_pooled_actor_metrics():
+    class Pooled(PooledActor):
+        collect_metrics = True
+        dispatcher = Dispatcher(workers=2)
+
+        def on_receive(self, message):
+            return message
+
+    ref = Pooled.start()
+    ref.tell(1)
+    assert ref.ask(2, timeout=5) == 2
+    assert ref.metrics()['processed'] == 2
+    ref.stop()
+    Pooled.dispatcher.shutdown()
+
+
+def test_registry_and_router_aggregate(metered_class):
+    refs = [metered_class.start() for _ in range(3)]
+    ThreadingActor.start()
+    router = Router(refs)
+    for i in range(6):
+        router.ask(i, timeout=5)
+
+    assert router.metrics()['processed'] == 6
+    total = ActorRegistry.metrics()
+    assert total['actors'] == 3
+    assert total['processed'] == 6
+    assert total['handler_time']['int']['count'] == 6
+    assert ActorRegistry.metrics(metered_class)['actors'] == 3
+    assert ActorRegistry.metrics('ThreadingActor')['actors'] == 0
+
+
+def test_timings_are_sampled():
+    class Sampled(ThreadingActor):
+        collect_metrics = True
+        metrics_sample_every = 4
+
+    ref = Sampled.start()
+    for i in range(16):
+        ref.ask(i, timeout=5)
+
+    metrics = ref.metrics()
+    assert metrics['processed'] == 16
+    # 第 1, 5, 9, 13 封: 每处理 4 封, 下一封发出的信件记一次入队时间.
+    assert metrics['handler_time']['int']['count'] == 4
+    assert metrics['queue_wait']['count'] == 4
+    assert ref._metrics._stamps == {}
+
+
+def test_processed_between_samples():
+    class Sampled(ThreadingActor):
+        collect_metrics = True
+        metrics_sample_every = 4
+
+    refs = [Sampled.start(), Sampled.start()]
+    for i in range(6):
+        refs[0].ask(i, timeout=5)
+    refs[1].ask('one', timeout=5)
+
+    assert refs[0].metrics()['processed'] == 6
+    assert refs[1].metrics()['processed'] == 1
+    assert ActorRegistry.metrics(Sampled)['processed'] == 7
+    for ref in refs:
+        ref.stop()
+
+
+def test_sampling_survives_dropped_envelopes():
+    class Sampled(ThreadingActor):
+        collect_metrics = True
+        metrics_sample_every = 2
+
+    ref = Sampled.start()
+    metrics = ref._metrics
+    # 记了时间的信件没有到达 actor(例如被信箱的 drop 策略丢掉).
+    metrics.enqueued(Envelope('lost'))
+    for i in range(4):
+        ref.ask(i, timeout=5)
+
+    assert ref.metrics()['queue_wait']['count'] >= 1
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for _ in range(99):
+        histogram.add(0.000010)
+    histogram.add(0.5)
+
+    summary = histogram.summary()
+    assert summary['count'] == 100
+    assert 0.000010 <= summary['p50'] <= 0.000020
+    assert summary['p99'] <= 0.000020
+    assert summary['max'] == 0.5
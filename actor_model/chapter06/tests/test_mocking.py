@@ -1,13 +1,12 @@
 from collections.abc import Callable
 
 import pytest
-from ..threading import ThreadingActor
 from ..actor_register import ActorRegistry
 
 
 @pytest.fixture
-def actor_class():
-    class ActorForMocking(ThreadingActor):
+def actor_class(runtime):
+    class ActorForMocking(runtime.actor_class):
         _a_rw_property = "a_rw_property"
 
         @property
@@ -28,7 +27,7 @@ def actor_class():
 def proxy(actor_class):
     proxy = actor_class.start().proxy()
     yield proxy
-    proxy.stop()
+    proxy.actor_ref.stop()
 
 
 @pytest.fixture
@@ -0,0 +1,197 @@
+import multiprocessing
+import os
+
+import pytest
+
+from ..persistence import EventSourcedActor
+
+GetMessages = object()
+
+
+class Store(EventSourcedActor):
+    event_segment_size = 4096
+    event_fsync_interval = None
+
+    def __init__(self):
+        super().__init__()
+        self.stored_messages = []
+
+    def on_receive(self, message):
+        if message is GetMessages:
+            return self.stored_messages
+        return self.persist(message)
+
+    def apply_event(self, event):
+        self.stored_messages.append(event)
+
+    def snapshot_state(self):
+        return self.stored_messages
+
+    def restore_state(self, state):
+        self.stored_messages = state
+
+
+@pytest.fixture
+def store_class(tmp_path):
+    return type('Store', (Store,), {'persistence_path': str(tmp_path)})
+
+
+def snapshots(tmp_path):
+    return sorted(os.listdir(tmp_path / 'snapshots'))
+
+
+def wait_snapshot(ref):
+    thread = ref._actor._snapshot_thread
+    if thread is not None:
+        thread.join(5)
+
+
+def test_recovers_from_events(store_class):
+    ref = store_class.start()
+    for i in range(5):
+        ref.tell(i)
+    assert ref.ask(GetMessages, timeout=5) == [0, 1, 2, 3, 4]
+    ref.stop()
+
+    ref = store_class.start()
+    proxy = ref.proxy()
+    assert proxy.recovered_snapshot_seq.get(timeout=5) == 0
+    assert proxy.recovered_events.get(timeout=5) == 5
+    assert ref.ask(GetMessages, timeout=5) == [0, 1, 2, 3, 4]
+    assert ref.ask('more', timeout=5) == 6
+    ref.stop()
+
+
+def test_snapshot_every_n_events(store_class, tmp_path):
+    store_class.snapshot_every = 10
+    ref = store_class.start()
+    for i in range(25):
+        ref.ask(i, timeout=5)
+        wait_snapshot(ref)
+    ref.stop()
+
+    assert snapshots(tmp_path) == [f'{seq:020d}.snapshot' for seq in (10, 20)]
+    ref = store_class.start()
+    proxy = ref.proxy()
+    assert proxy.recovered_snapshot_seq.get(timeout=5) == 20
+    assert proxy.recovered_events.get(timeout=5) == 5
+    assert ref.ask(GetMessages, timeout=5) == list(range(25))
+    ref.stop()
+
+
+def test_snapshot_interval(store_class, tmp_path):
+    store_class.snapshot_interval = 0
+    ref = store_class.start()
+    ref.ask('a', timeout=5)
+    wait_snapshot(ref)
+    ref.stop()
+
+    assert snapshots(tmp_path) == [f'{1:020d}.snapshot']
+
+
+def test_snapshot_truncates_event_log(store_class, tmp_path):
+    store_class.snapshot_every = 50
+    store_class.snapshot_keep = 1
+    ref = store_class.start()
+    for i in range(200):
+        ref.ask('x' * 100, timeout=5)
+        wait_snapshot(ref)
+    ref.stop()
+
+    events = tmp_path / 'events'
+    assert len([name for name in os.listdir(events) if name.endswith('.seg')]) < 3
+    ref = store_class.start()
+    assert len(ref.ask(GetMessages, timeout=5)) == 200
+    ref.stop()
+
+
+class FailingStore(Store):
+    collect_metrics = True
+    snapshot_every = 3
+    failures = 1
+
+    def _write_snapshot_file(self, seq, data):
+        if self.failures:
+            self.failures -= 1
+            raise OSError('disk full')
+        super()._write_snapshot_file(seq, data)
+
+
+def test_failed_snapshot_is_recorded_and_retried(tmp_path):
+    store_class = type('Store', (FailingStore,), {'persistence_path': str(tmp_path)})
+    ref = store_class.start()
+    for i in range(3):
+        ref.ask(i, timeout=5)
+    wait_snapshot(ref)
+
+    assert snapshots(tmp_path) == []
+    assert isinstance(ref.proxy().snapshot_error.get(timeout=5), OSError)
+    # 下一个事件就重试, 不再等 snapshot_every 个.
+    ref.ask(3, timeout=5)
+    wait_snapshot(ref)
+    assert snapshots(tmp_path) == [f'{4:020d}.snapshot']
+    assert ref.proxy().snapshot_error.get(timeout=5) is None
+    assert ref.metrics()['exception_types'] == {'OSError': 1}
+    ref.stop()
+
+
+def test_falls_back_to_older_snapshot(store_class, tmp_path):
+    store_class.snapshot_every = 3
+    ref = store_class.start()
+    for i in range(7):
+        ref.ask(i, timeout=5)
+        wait_snapshot(ref)
+    ref.stop()
+    latest = tmp_path / 'snapshots' / snapshots(tmp_path)[-1]
+    latest.write_bytes(latest.read_bytes()[:-1])
+
+    ref = store_class.start()
+    proxy = ref.proxy()
+    assert proxy.recovered_snapshot_seq.get(timeout=5) == 3
+    assert ref.ask(GetMessages, timeout=5) == list(range(7))
+    ref.stop()
+
+
+def _persist_and_crash(path):
+    store_class = type('Store', (Store,), {'persistence_path': path, 'snapshot_every': 4})
+    ref = store_class.start()
+    for i in range(10):
+        ref.ask(i)
+        wait_snapshot(ref)
+    os._exit(0)
+
+
+def test_recovers_after_crash(tmp_path):
+    process = multiprocessing.get_context('fork').Process(
+        target=_persist_and_crash, args=(str(tmp_path),)
+    )
+    process.start()
+    process.join(10)
+    assert process.exitcode == 0
+
+    store_class = type('Store', (Store,), {'persistence_path': str(tmp_path)})
+    ref = store_class.start()
+    proxy = ref.proxy()
+    assert proxy.recovered_snapshot_seq.get(timeout=5) == 8
+    assert ref.ask(GetMessages, timeout=5) == list(range(10))
+    ref.stop()
+
+
+def test_recovery_error_is_raised_from_start(store_class):
+    class Broken(store_class):
+        def apply_event(self, event):
+            raise RuntimeError('bad event')
+
+    ref = store_class.start()
+    ref.tell('event')
+    ref.stop()
+
+    with pytest.raises(RuntimeError):
+        Broken.start()
+    # 目录没有被占着.
+    store_class.start().stop()
+
+
+def test_path_is_required():
+    with pytest.raises(ValueError):
+        Store.start()
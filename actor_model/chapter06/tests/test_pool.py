@@ -0,0 +1,293 @@
+import threading
+import time
+
+import pytest
+
+from ..actor_register import ActorRegistry
+from ..future import get_all
+from ..pool import ElasticPool, WorkStealingPool, stateless
+from ..routing import Router, RoutingStrategy
+from ..threading import ThreadingActor
+
+
+class Resolver(ThreadingActor):
+    def __init__(self, gate):
+        super().__init__()
+        self.gate = gate
+        self.seen = []
+
+    @stateless
+    def resolve(self, ip):
+        return ip, self.actor_urn
+
+    def block(self):
+        self.gate.wait(5)
+
+    def block_on(self, event):
+        event.wait(5)
+
+    def record(self, value):
+        self.seen.append(value)
+        return self.actor_urn
+
+    def on_receive(self, message):
+        return message, self.actor_urn
+
+
+class First(RoutingStrategy):
+    """所有信件都分给第一个成员."""
+
+    def select(self, message, routees):
+        return routees[0]
+
+
+@pytest.fixture
+def gate():
+    gate = threading.Event()
+    yield gate
+    gate.set()
+    ActorRegistry.stop_all()
+
+
+@pytest.fixture
+def pool(gate):
+    pool = WorkStealingPool.start(Resolver, 3, gate, strategy=First())
+    # 第一个成员阻塞住, 分给它的信件只能被别人偷走.
+    pool.routees[0].proxy().block()
+    return pool
+
+
+def test_members_are_registered_under_the_actor_class_name(pool):
+    assert len(ActorRegistry.get_by_class_name("Resolver")) == 3
+    assert set(ActorRegistry.get_by_class(Resolver)) == set(pool.routees)
+
+
+def test_idle_members_steal_stateless_calls(pool):
+    busy = pool.routees[0]
+    resolve = pool.proxy().resolve
+
+    results = get_all([resolve(i) for i in range(20)], timeout=5)
+
+    assert [ip for ip, _ in results] == list(range(20))
+    assert busy.actor_urn not in {urn for _, urn in results}
+    assert pool.stolen == 20
+
+
+def test_stateless_tell_and_ask_can_be_stolen(pool):
+    busy = pool.routees[0]
+
+    pool.tell("told", stateless=True)
+    answer, urn = pool.ask("asked", timeout=5, stateless=True)
+
+    assert answer == "asked"
+    assert urn != busy.actor_urn
+
+
+def test_ordered_messages_wait_for_their_own_member(pool, gate):
+    busy = pool.routees[0]
+    record = pool.proxy().record
+    futures = [record(i) for i in range(5)]
+
+    assert pool.stolen == 0
+    gate.set()
+
+    assert get_all(futures, timeout=5) == [busy.actor_urn] * 5
+    assert busy.proxy().seen.get(timeout=5) == list(range(5))
+
+
+def test_stopping_a_member_hands_its_stateless_work_to_the_others(gate):
+    pool = WorkStealingPool.start(Resolver, 2, gate, strategy=First())
+    first, second = pool.routees
+    first_gate = threading.Event()
+    first.proxy().block_on(first_gate)
+    second.proxy().block()
+    stop = first.stop(block=False)
+    # 停止消息排在前面, 这些信件要等 first 停止以后交给 second.
+    futures = [pool.ask(i, block=False, stateless=True) for i in range(3)]
+
+    first_gate.set()
+    assert stop.get(timeout=5) is True
+    gate.set()
+
+    assert get_all(futures, timeout=5) == [(i, second.actor_urn) for i in range(3)]
+
+
+@pytest.fixture
+def elastic(gate):
+    pool = ElasticPool.start(Resolver, 1, gate, max_size=3, interval=None)
+    pool.scale_up_after = 2
+    pool.scale_down_after = 3
+    return pool
+
+
+def fill_backlog(pool, count):
+    """阻塞住所有成员, 每个成员积压 count 封信件."""
+    for routee in pool.routees:
+        routee.proxy().block()
+        for _ in range(count):
+            routee.tell("queued")
+
+
+def test_elastic_pool_scales_up_after_sustained_backlog(elastic):
+    fill_backlog(elastic, 10)
+
+    elastic._tick()
+    assert elastic.size == 1  # 一次尖峰不扩容
+    elastic._tick()
+    assert elastic.size == 2
+    assert len(ActorRegistry.get_by_class(Resolver)) == 2
+
+
+def test_elastic_pool_respects_max_size(elastic):
+    fill_backlog(elastic, 10)
+    for _ in range(10):
+        elastic._tick()
+        fill_backlog(elastic, 10)
+
+    assert elastic.size == 3
+    assert elastic.stats["scale_up"] == 2
+
+
+def test_elastic_pool_scales_down_when_idle(elastic, gate):
+    elastic._scale_up(2)
+    gate.set()
+    removed = []
+    for _ in range(3):
+        before = elastic.routees
+        elastic._tick()
+        removed += [ref for ref in before if ref not in elastic.routees]
+
+    assert elastic.size == 2
+    assert removed and removed[0].actor_stopped.wait(5)
+    for _ in range(10):
+        elastic._tick()
+    assert elastic.size == 1
+
+
+def test_elastic_pool_holds_size_in_the_dead_band(elastic):
+    elastic._scale_up(1)
+    # 每个成员积压 2 封, 在 scale_down_depth 和 scale_up_depth 之间.
+    fill_backlog(elastic, 2)
+    for _ in range(10):
+        elastic._tick()
+
+    assert elastic.size == 2
+
+
+def test_elastic_pool_scales_up_on_latency(elastic):
+    elastic.scale_up_latency = 0.01
+    elastic._latency = 0.5
+
+    elastic._tick()
+    elastic._tick()
+
+    assert elastic.size == 2
+
+
+def test_elastic_pool_records_ask_latency(elastic, gate):
+    gate.set()
+    elastic.latency_alpha = 1
+    proxy = elastic.proxy()
+
+    proxy.resolve("ip").get(timeout=5)
+    elastic.ask("message", timeout=5)
+
+    assert 0 < elastic._latency < 1
+
+
+def test_elastic_pool_background_autoscale(gate):
+    pool = ElasticPool.start(Resolver, 1, gate, max_size=2, interval=0.01)
+    pool.scale_up_after = 1
+    fill_backlog(pool, 10)
+
+    deadline = time.monotonic() + 5
+    while pool.size < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.size == 2
+    gate.set()
+    assert pool.stop(timeout=5) is True
+    # stop 以后不再扩容.
+    pool.scale_up_latency = 0.01
+    pool._latency = 1
+    pool._tick()
+    assert pool.size == 2
+
+
+def test_elastic_pool_latency_decays_without_traffic(elastic, gate):
+    gate.set()
+    elastic._scale_up(1)
+    elastic.scale_up_latency = 0.01
+    elastic._latency = 0.5
+
+    for _ in range(30):
+        elastic._tick()
+
+    assert elastic._latency < 0.01
+    assert elastic.size == 1
+
+
+def test_elastic_pool_keeps_one_routee_with_min_size_zero(gate):
+    gate.set()
+    pool = ElasticPool.start(Resolver, 0, gate, max_size=2, interval=None)
+    pool.scale_down_after = 1
+    for _ in range(5):
+        pool._tick()
+    assert pool.size == 1
+
+    pool.scale_up_after = 1
+    gate.clear()
+    fill_backlog(pool, 10)
+    pool._tick()
+    assert pool.size == 2
+
+
+def test_elastic_pool_start_matches_router_start(gate):
+    gate.set()
+    pool = ElasticPool.start(Resolver, 3, gate, max_size=4, interval=None)
+
+    assert pool.size == 3 and pool.min_size == 3
+    assert pool.stop(timeout=5) is True
+
+
+def test_elastic_pool_latency_from_many_threads(elastic):
+    def record():
+        for _ in range(1000):
+            elastic._record_latency(time.monotonic())(None)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert elastic._latency_samples == 4000
+
+
+def test_elastic_pool_from_existing_routees(gate):
+    gate.set()
+    routees = [Resolver.start(gate) for _ in range(2)]
+    pool = ElasticPool(routees)
+    pool.scale_down_after = 1
+
+    pool._tick()
+    assert pool.size == 1
+    assert pool.ask("message", timeout=5)[0] == "message"
+
+    # 不知道怎么启动新成员, 积压再多也不扩容.
+    gate.clear()
+    fill_backlog(pool, 10)
+    for _ in range(5):
+        pool._tick()
+    assert pool.size == 1
+
+
+def test_elastic_pool_of_routers(gate):
+    gate.set()
+    routers = [Router.start(Resolver, 2, gate) for _ in range(2)]
+    pool = ElasticPool(routers)
+    pool.scale_down_after = 1
+
+    pool._tick()
+
+    assert pool.size == 1
+    assert pool.ask("message", timeout=5)[0] == "message"
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from ..actor_register import ActorRegistry
+from ..envelope import Envelope
+from ..inbox import PriorityInbox
+from ..messages import _ActorStop
+from ..threading import ThreadingActor
+
+
+def test_envelope_priority_defaults_to_zero():
+    assert Envelope("message").priority == 0
+
+
+def test_lower_priority_number_comes_first_and_ties_are_fifo():
+    inbox = PriorityInbox()
+    inbox.put(Envelope("a"))
+    inbox.put(Envelope("urgent", priority=-1))
+    inbox.put(Envelope("b"))
+    inbox.put(Envelope("bulk", priority=5))
+
+    assert [inbox.get().message for _ in range(4)] == ["urgent", "a", "b", "bulk"]
+
+
+def test_stop_message_jumps_the_queue():
+    inbox = PriorityInbox()
+    inbox.put(Envelope("work", priority=-100))
+    inbox.put(Envelope(_ActorStop()))
+
+    assert isinstance(inbox.get().message, _ActorStop)
+
+
+@pytest.fixture
+def busy_actor_class():
+    class BusyActor(ThreadingActor):
+        inbox_class = PriorityInbox
+
+        def __init__(self, gate):
+            super().__init__()
+            self.gate = gate
+            self.handled = []
+
+        def on_start(self):
+            # 先挡住, 让信件在信箱里积压.
+            self.gate.wait(5)
+
+        def on_receive(self, message):
+            self.handled.append(message)
+            return len(self.handled)
+
+    yield BusyActor
+    ActorRegistry.stop_all()
+
+
+def test_urgent_ask_is_not_delayed_by_backlog(busy_actor_class):
+    gate = threading.Event()
+    actor_ref = busy_actor_class.start(gate)
+    for i in range(1000):
+        actor_ref.tell(i)
+    urgent = actor_ref.ask("urgent", block=False, priority=-1)
+    gate.set()
+
+    assert urgent.get(timeout=5) == 1
+
+
+def test_stop_is_not_delayed_by_backlog(busy_actor_class):
+    gate = threading.Event()
+    actor_ref = busy_actor_class.start(gate)
+    for i in range(1000):
+        actor_ref.tell(i, priority=-1)
+    stop_future = actor_ref.stop(block=False)
+    gate.set()
+
+    assert stop_future.get(timeout=5) is True
+    # 停止消息最先处理, 积压的信件都没有被处理.
+    assert actor_ref._actor.handled == []
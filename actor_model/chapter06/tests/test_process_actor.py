@@ -0,0 +1,290 @@
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from multiprocessing import shared_memory
+
+import pytest
+from pykka import ActorDeadError
+
+from ..actor_proxy import traversable
+from ..actor_register import ActorRegistry
+from ..future import get_all
+from ..process import ProcessActor, ProcessActorError
+from ..routing import Router
+from ..transport import SharedMemoryChannel
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+
+    def add(self, n):
+        self.count += n
+        return self.count
+
+
+def _refuse_unpickle():
+    raise ValueError('cannot unpickle')
+
+
+class Unloadable:
+    """pickle 没问题, 另一边解码抛异常."""
+
+    def __reduce__(self):
+        return _refuse_unpickle, ()
+
+
+class Worker(ProcessActor):
+    label = 'worker'
+
+    def __init__(self, base=0):
+        super().__init__()
+        self.base = base
+        self.counter = traversable(Counter())
+        self.messages = []
+
+    def pid(self):
+        return os.getpid()
+
+    def add(self, a, b):
+        return self.base + a + b
+
+    def fail(self):
+        raise ValueError('boom')
+
+    def future(self):
+        return threading.Event()
+
+    def unloadable(self):
+        return Unloadable()
+
+    def crash(self):
+        os._exit(1)
+
+    def on_receive(self, message):
+        self.messages.append(message)
+        return message
+
+
+class SpawnedWorker(Worker):
+    start_method = 'spawn'
+
+
+class BrokenWorker(ProcessActor):
+    def __init__(self):
+        super().__init__()
+        raise ValueError('broken')
+
+
+@pytest.fixture
+def actor_ref():
+    ref = Worker.start(base=10)
+    yield ref
+    if ref.is_alive():
+        ref.stop()
+
+
+def test_actor_runs_in_another_process(actor_ref):
+    assert actor_ref.proxy().pid().get(timeout=5) != os.getpid()
+
+
+def test_ask_and_tell(actor_ref):
+    actor_ref.tell({'command': 'ping'})
+    assert actor_ref.ask('hello', timeout=5) == 'hello'
+    assert actor_ref.proxy().messages.get(timeout=5) == [{'command': 'ping'}, 'hello']
+
+
+def test_proxy_method_call(actor_ref):
+    assert actor_ref.proxy().add(1, 2).get(timeout=5) == 13
+
+
+def test_proxy_sees_instance_attributes_set_in_init(actor_ref):
+    proxy = actor_ref.proxy()
+
+    assert proxy.base.get(timeout=5) == 10
+    assert proxy.label.get(timeout=5) == 'worker'
+    proxy.base = 20
+    assert proxy.add(1, 2).get(timeout=5) == 23
+
+
+def test_proxy_traverses_nested_objects(actor_ref):
+    proxy = actor_ref.proxy()
+
+    assert proxy.counter.add(2).get(timeout=5) == 2
+    assert proxy.counter.add(3).get(timeout=5) == 5
+    assert proxy.counter.count.get(timeout=5) == 5
+
+
+def test_proxy_batch_and_map(actor_ref):
+    proxy = actor_ref.proxy()
+
+    assert proxy.add.map([1, 2], [3, 4]).get(timeout=5) == [14, 16]
+    with proxy.batch() as batch:
+        ok, failed = batch.add(1, 1), batch.fail()
+    assert ok.get(timeout=5) == 12
+    with pytest.raises(ValueError):
+        failed.get(timeout=5)
+
+
+def test_unpicklable_reply_raises(actor_ref):
+    with pytest.raises(ProcessActorError):
+        actor_ref.proxy().future().get(timeout=5)
+
+
+def test_stop_unregisters_and_exits(actor_ref):
+    process = actor_ref._actor.actor_process
+
+    assert ActorRegistry.get_by_urn(actor_ref.actor_urn) is actor_ref
+    assert actor_ref.stop(timeout=5) is True
+    assert not actor_ref.is_alive()
+    assert ActorRegistry.get_by_urn(actor_ref.actor_urn) is None
+    process.join(5)
+    assert process.exitcode == 0
+    with pytest.raises(ActorDeadError):
+        actor_ref.tell('late')
+
+
+def test_crash_fails_pending_asks(actor_ref):
+    future = actor_ref.proxy().crash()
+
+    with pytest.raises(ActorDeadError):
+        future.get(timeout=5)
+    assert not actor_ref.is_alive()
+
+
+def test_undecodable_reply_stops_the_stub(actor_ref):
+    process = actor_ref._actor.actor_process
+    future = actor_ref.proxy().unloadable()
+
+    with pytest.raises(ActorDeadError):
+        future.get(timeout=5)
+    assert not actor_ref.is_alive()
+    process.join(5)
+    assert process.exitcode is not None
+
+
+def test_undecodable_message_stops_the_actor(actor_ref):
+    pending = actor_ref.proxy().pid()
+    actor_ref.tell(Unloadable())
+
+    # 解码失败之前发的信件照常回复, 然后 actor 停止, 子进程退出.
+    assert pending.get(timeout=5) == actor_ref._actor.actor_process.pid
+    assert actor_ref.actor_stopped.wait(5)
+    assert not actor_ref.is_alive()
+    actor_ref._actor.actor_process.join(5)
+    assert actor_ref._actor.actor_process.exitcode == 0
+
+
+def test_init_error_is_raised_by_start():
+    with pytest.raises(ProcessActorError) as excinfo:
+        BrokenWorker.start()
+
+    assert isinstance(excinfo.value.__cause__, ValueError)
+
+
+def test_spawn_start_method():
+    ref = SpawnedWorker.start(base=1)
+    try:
+        assert ref.proxy().add(1, 1).get(timeout=10) == 3
+    finally:
+        ref.stop(timeout=10)
+
+
+def test_router_of_process_actors():
+    router = Router.start(Worker, 2, strategy='round_robin')
+    try:
+        pids = get_all([router.proxy().pid() for _ in range(4)], timeout=5)
+        assert len(set(pids)) == 2
+    finally:
+        router.stop(timeout=5)
+
+
+class SharedWorker(Worker):
+    shared_memory_threshold = 1024
+
+    def size(self, data):
+        return type(data).__name__, len(data)
+
+    def echo(self, data):
+        return data
+
+    def fail_with(self, data):
+        raise ValueError(len(data))
+
+
+def _segment_exists(name):
+    try:
+        shared_memory.SharedMemory(name=name).close()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_shared_memory_channel_keeps_payload_types():
+    a, b = multiprocessing.Pipe()
+    sender, receiver = SharedMemoryChannel(a, 1024), SharedMemoryChannel(b, 1024)
+    payload = (b'x' * 4096, bytearray(b'y' * 4096), pickle.PickleBuffer(b'z' * 4096), b'small')
+
+    sender.send(payload)
+    (big, array, view, small), lease = receiver.recv()
+
+    assert big == payload[0] and type(big) is bytes
+    assert array == payload[1] and type(array) is bytearray
+    assert isinstance(view, memoryview) and view.tobytes() == b'z' * 4096
+    assert small == b'small'
+    assert sender.stats['segments'] == 3
+    names = list(sender._owned)
+
+    del view
+    receiver.release(lease)
+    receiver.send('done')
+    assert sender.recv() == ('done', None)
+    assert sender._owned == {} and sender.stats['acked'] == 3
+    assert not any(_segment_exists(name) for name in names)
+    assert receiver._attached == []
+
+
+def test_shared_memory_segment_outlives_sender_while_referenced():
+    a, b = multiprocessing.Pipe()
+    sender, receiver = SharedMemoryChannel(a, 1024), SharedMemoryChannel(b, 1024)
+
+    sender.send(pickle.PickleBuffer(b'z' * 4096))
+    view, lease = receiver.recv()
+    receiver.release(lease)
+    sender.close()
+
+    # 段已经 unlink, 接收方的映射还在.
+    assert len(receiver._attached) == 1
+    assert view.tobytes() == b'z' * 4096
+    del view
+    receiver.close()
+    assert receiver._attached == []
+
+
+def test_process_actor_passes_large_payloads_through_shared_memory():
+    ref = SharedWorker.start()
+    try:
+        proxy = ref.proxy()
+        channel = ref.actor_inbox.channel
+        data = b'x' * 100000
+
+        assert proxy.size(data).get(timeout=5) == ('bytes', 100000)
+        assert proxy.size(bytearray(data)).get(timeout=5) == ('bytearray', 100000)
+        assert proxy.size(pickle.PickleBuffer(data)).get(timeout=5) == ('memoryview', 100000)
+        assert proxy.echo(data).get(timeout=5) == data
+        proxy.fail_with(data)
+        assert channel.stats['segments'] == 5
+        # 子进程处理完(包括抛异常的)都 ack 了.
+        _wait_for(lambda: channel.stats['acked'] == 5)
+        assert channel._owned == {}
+    finally:
+        ref.stop(timeout=5)
@@ -0,0 +1,109 @@
+import pytest
+
+from ..actor_proxy import traversable
+from ..actor_register import ActorRegistry
+from ..exceptions import ActorDeadError, BatchAborted
+
+
+class Nested:
+    def double(self, value):
+        return value * 2
+
+
+@pytest.fixture
+def proxy(runtime):
+    class Resolver(runtime.actor_class):
+        def __init__(self):
+            super().__init__()
+            self.nested = traversable(Nested())
+            self.messages = 0
+
+        def resolve(self, ip, suffix=".example"):
+            if ip == "bad":
+                raise ValueError(ip)
+            return ip + suffix
+
+        def _handle_receive(self, message):
+            self.messages += 1
+            return super()._handle_receive(message)
+
+    yield Resolver.start().proxy()
+    ActorRegistry.stop_all()
+
+
+def test_map_sends_all_calls_in_one_message(proxy):
+    future = proxy.resolve.map(["a", "b", "c"])
+
+    assert future.get(timeout=5) == ["a.example", "b.example", "c.example"]
+    assert proxy.messages.get(timeout=5) == 2  # map + 这次取值
+
+
+def test_map_zips_several_iterables(proxy):
+    future = proxy.resolve.map(["a", "b"], [".org", ".net"])
+
+    assert future.get(timeout=5) == ["a.org", "b.net"]
+
+
+def test_map_raises_the_first_failure(proxy):
+    future = proxy.resolve.map(["a", "bad", "c"])
+
+    with pytest.raises(ValueError):
+        future.get(timeout=5)
+
+
+def test_batch_returns_one_future_per_call(proxy):
+    with proxy.batch() as batch:
+        first = batch.resolve("a")
+        second = batch.resolve("b", suffix=".org")
+        nested = batch.nested.double(21)
+
+    assert first.get(timeout=5) == "a.example"
+    assert second.get(timeout=5) == "b.org"
+    assert nested.get(timeout=5) == 42
+    assert proxy.messages.get(timeout=5) == 2
+
+
+def test_batch_failure_only_affects_its_own_future(proxy):
+    with proxy.batch() as batch:
+        bad = batch.resolve("bad")
+        good = batch.resolve("good")
+
+    with pytest.raises(ValueError):
+        bad.get(timeout=5)
+    assert good.get(timeout=5) == "good.example"
+
+
+def test_batch_is_not_sent_when_the_block_raises(proxy):
+    with pytest.raises(RuntimeError):
+        with proxy.batch() as batch:
+            future = batch.resolve("a")
+            nested = batch.nested.double(1)
+            raise RuntimeError
+
+    assert proxy.messages.get(timeout=5) == 1
+    # 已经返回的 future 不会一直等下去.
+    with pytest.raises(BatchAborted):
+        future.get(timeout=0)
+    with pytest.raises(BatchAborted):
+        nested.get(timeout=0)
+
+
+def test_batch_to_a_stopped_actor_fails_its_futures(proxy):
+    batch = proxy.batch()
+    future = batch.resolve("a")
+    nested = batch.nested.double(1)
+    proxy.actor_ref.stop(timeout=5)
+
+    with pytest.raises(ActorDeadError):
+        batch.send()
+    with pytest.raises(ActorDeadError):
+        future.get(timeout=5)
+    with pytest.raises(ActorDeadError):
+        nested.get(timeout=5)
+
+
+def test_batch_only_accepts_method_calls(proxy):
+    batch = proxy.batch()
+
+    with pytest.raises(AttributeError):
+        batch.messages
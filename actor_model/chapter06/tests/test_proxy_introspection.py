@@ -0,0 +1,137 @@
+import pytest
+
+from ..actor_proxy import ActorProxy, CallableProxy, _class_attrs_cache, traversable
+from ..actor_register import ActorRegistry
+from ..threading import ThreadingActor
+
+
+class Inner:
+    def inner_method(self):
+        return "inner"
+
+    inner_value = "inner value"
+
+
+class ActorWithMembers(ThreadingActor):
+    cat = "dog"
+
+    def __init__(self):
+        super().__init__()
+        self.inner = traversable(Inner())
+
+    def method(self):
+        return "method"
+
+    def add_attr(self, name, value):
+        setattr(self, name, value)
+
+
+@pytest.fixture
+def actor_ref():
+    actor_ref = ActorWithMembers.start()
+    yield actor_ref
+    ActorRegistry.stop_all()
+
+
+def test_creating_a_proxy_does_not_introspect(actor_ref):
+    proxy = actor_ref.proxy()
+
+    assert proxy._known_attrs == {}
+
+
+def test_class_attributes_are_cached_per_class(actor_ref):
+    first = actor_ref.proxy()
+    first.method
+    second = ActorWithMembers.start().proxy()
+
+    assert second._get_class_attrs() is _class_attrs_cache[ActorWithMembers]
+    assert second.method().get(timeout=5) == "method"
+    assert second.cat.get(timeout=5) == "dog"
+
+
+def test_only_the_accessed_path_is_introspected(actor_ref):
+    proxy = actor_ref.proxy()
+
+    assert proxy.inner.inner_method().get(timeout=5) == "inner"
+    assert set(proxy._known_attrs) == {("inner",), ("inner", "inner_method")}
+
+
+def test_instance_attribute_added_later_is_found(actor_ref):
+    proxy = actor_ref.proxy()
+    with pytest.raises(AttributeError):
+        proxy.late
+
+    proxy.add_attr("late", "value").get(timeout=5)
+
+    assert proxy.late.get(timeout=5) == "value"
+
+
+def test_setting_an_attribute_through_the_proxy_forgets_its_info(actor_ref):
+    proxy = actor_ref.proxy()
+    assert isinstance(proxy.inner, type(proxy))
+
+    proxy.inner = "no longer traversable"
+
+    assert proxy.inner.get(timeout=5) == "no longer traversable"
+    assert ("inner", "inner_method") not in proxy._known_attrs
+
+
+def test_private_and_missing_attributes_are_not_exposed(actor_ref):
+    proxy = actor_ref.proxy()
+
+    with pytest.raises(AttributeError):
+        proxy._actor_loop
+    with pytest.raises(AttributeError):
+        proxy.inner.missing
+
+
+def test_dir_lists_class_and_instance_attributes(actor_ref):
+    names = dir(actor_ref.proxy())
+
+    assert {"cat", "method", "inner", "stop"} <= set(names)
+    assert "_actor_loop" not in names
+
+
+def test_callable_proxy_for_class_method(actor_ref):
+    assert isinstance(actor_ref.proxy().method, CallableProxy)
+
+
+def test_missing_attribute_is_not_introspected_again(actor_ref):
+    inner = actor_ref.proxy().inner
+
+    for _ in range(10):
+        assert not hasattr(inner, "missing")
+
+    assert inner._introspection_stats == {"introspections": 1, "missing_hits": 9}
+    assert ("inner", "missing") in inner._missing_attrs
+
+
+def test_missing_attrs_cache_is_bounded(actor_ref, monkeypatch):
+    monkeypatch.setattr(ActorProxy, "missing_attrs_cache_size", 3)
+    proxy = actor_ref.proxy()
+
+    for i in range(10):
+        assert not hasattr(proxy, f"missing_{i}")
+
+    assert list(proxy._missing_attrs) == [("missing_7",), ("missing_8",), ("missing_9",)]
+
+
+def test_invalidate_attrs_rescans_nested_paths(actor_ref):
+    proxy = actor_ref.proxy()
+    assert not hasattr(proxy.inner, "later")
+    actor_ref._actor.inner.later = "now"
+    assert not hasattr(proxy.inner, "later")
+
+    proxy._invalidate_attrs(("inner",))
+
+    assert proxy.inner.later.get(timeout=5) == "now"
+
+
+def test_invalidate_class_attrs(actor_ref):
+    actor_class = type("Patched", (ActorWithMembers,), {})
+    actor_class.start().proxy().method
+    actor_class.patched = lambda self: "patched"
+
+    ActorProxy._invalidate_class_attrs(actor_class)
+
+    assert actor_class.start().proxy().patched().get(timeout=5) == "patched"
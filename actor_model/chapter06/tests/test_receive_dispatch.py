@@ -0,0 +1,121 @@
+import pytest
+
+from .. import actor
+from ..actor_register import ActorRegistry
+from ..messages import ProxyCall
+from ..threading import ThreadingActor
+
+
+class Point(tuple):
+    pass
+
+
+class Inner:
+    def name(self):
+        return "first"
+
+
+class OtherInner:
+    def name(self):
+        return "second"
+
+
+class Calculator(ThreadingActor):
+    def __init__(self):
+        super().__init__()
+        self.inner = Inner()
+
+    def add(self, a, b):
+        return a + b
+
+    def swap_add(self):
+        self.add = lambda a, b: "swapped"
+
+    def swap_inner(self):
+        self.inner = OtherInner()
+
+    def on_receive(self, message):
+        return ("received", message)
+
+
+class Logged(Calculator):
+    def __init__(self):
+        super().__init__()
+        self.log = []
+
+    def _receive_other(self, message):
+        self.log.append(message)
+        return super()._receive_other(message)
+
+    def _receive_proxy_call(self, message):
+        self.log.append(message.attr_path)
+        return super()._receive_proxy_call(message)
+
+
+@pytest.fixture
+def proxy():
+    yield Calculator.start().proxy()
+    ActorRegistry.stop_all()
+
+
+def test_setting_an_attribute_through_the_proxy_is_seen(proxy):
+    assert proxy.add(1, 1).get(timeout=5) == 2
+
+    proxy.add = lambda a, b: a * b
+
+    assert proxy.add(3, 3).get(timeout=5) == 9
+
+
+def test_methods_replaced_by_the_actor_are_seen(proxy):
+    assert proxy.add(1, 1).get(timeout=5) == 2
+
+    proxy.swap_add().get(timeout=5)
+
+    assert proxy.add(1, 1).get(timeout=5) == "swapped"
+
+
+def test_children_replaced_by_the_actor_are_seen(proxy):
+    assert proxy.actor_ref.ask(ProxyCall(("inner", "name"), (), {}), timeout=5) == "first"
+
+    proxy.swap_inner().get(timeout=5)
+
+    assert proxy.actor_ref.ask(ProxyCall(("inner", "name"), (), {}), timeout=5) == "second"
+
+
+def test_subclass_of_internal_message_is_dispatched_by_mro(proxy):
+    class TracedCall(ProxyCall):
+        __slots__ = ()
+
+    message = TracedCall(attr_path=("add",), args=(2, 3), kwargs={})
+
+    assert proxy.actor_ref.ask(message, timeout=5) == 5
+    assert Calculator._receive_handlers[TracedCall] is Calculator._receive_proxy_call
+
+
+def test_user_messages_go_to_on_receive(proxy):
+    # tuple 子类不是内部消息.
+    message = Point((1, 2))
+
+    assert proxy.actor_ref.ask(message, timeout=5) == ("received", message)
+    assert Calculator._receive_handlers[Point] is Calculator._receive_other
+
+
+def test_subclass_overrides_receive_methods(proxy):
+    # 先让父类的表记下这些类型.
+    proxy.add(1, 1).get(timeout=5)
+    proxy.actor_ref.ask("hello", timeout=5)
+
+    ref = Logged.start()
+    assert ref.proxy().add(1, 2).get(timeout=5) == 3
+    assert ref.ask("hello", timeout=5) == ("received", "hello")
+
+    assert ref.proxy().log.get(timeout=5) == [("add",), "hello"]
+
+
+def test_handler_table_is_bounded(proxy):
+    ref = proxy.actor_ref
+    for i in range(actor._RECEIVE_HANDLERS_SIZE + 10):
+        message_type = type(f"Message{i}", (), {})
+        assert ref.ask(message_type(), timeout=5)[0] == "received"
+
+    assert len(Calculator._receive_handlers) <= actor._RECEIVE_HANDLERS_SIZE
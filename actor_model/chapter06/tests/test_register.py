@@ -42,3 +42,21 @@ def test_register_stop_all(actor_class):
     actor_class().start()
     assert ActorRegistry.stop_all()
 
+
+
+def test_register_indexes_follow_subclasses_and_unregister(actor_class):
+    class SubActor(actor_class):
+        pass
+
+    parent_ref = actor_class.start()
+    child_ref = SubActor.start()
+
+    assert ActorRegistry.get_by_class(actor_class) == [parent_ref, child_ref]
+    assert ActorRegistry.get_by_class(SubActor) == [child_ref]
+    assert ActorRegistry.get_by_class_name('SubActor') == [child_ref]
+
+    child_ref.stop()
+    assert ActorRegistry.get_by_urn(child_ref.actor_urn) is None
+    assert ActorRegistry.get_by_class(actor_class) == [parent_ref]
+    assert ActorRegistry.get_by_class_name('SubActor') == []
+    ActorRegistry.stop_all()
@@ -0,0 +1,236 @@
+import threading
+import time
+
+import pytest
+from pykka import ActorDeadError
+
+from ..actor_proxy import traversable
+from ..exceptions import MailboxFull, Timeout
+from ..future import get_all
+from ..remote import ActorServer, RemoteActorRef, RemoteError, RemoteNode, _get_connection
+from ..threading import ThreadingActor
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+
+    def add(self, n):
+        self.count += n
+        return self.count
+
+
+def _refuse_unpickle():
+    raise ValueError('cannot unpickle')
+
+
+class Unloadable:
+    """pickle 没问题, 另一边解码抛异常."""
+
+    def __reduce__(self):
+        return _refuse_unpickle, ()
+
+
+class Greeter(ThreadingActor):
+    greeting = 'hello'
+
+    def __init__(self):
+        super().__init__()
+        self.counter = traversable(Counter())
+        self.received = []
+
+    def greet(self, name):
+        return f'{self.greeting} {name}'
+
+    def event(self):
+        return threading.Event()
+
+    def unloadable(self):
+        return Unloadable()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def on_receive(self, message):
+        self.received.append(message)
+        return message
+
+
+@pytest.fixture
+def server():
+    server = ActorServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def actor_ref():
+    ref = Greeter.start()
+    yield ref
+    if ref.is_alive():
+        ref.stop()
+
+
+@pytest.fixture
+def remote_ref(server, actor_ref):
+    return RemoteNode(server.address).get_by_urn(actor_ref.actor_urn)
+
+
+def test_get_by_urn_returns_remote_ref(remote_ref, actor_ref):
+    assert isinstance(remote_ref, RemoteActorRef)
+    assert remote_ref.actor_urn == actor_ref.actor_urn
+    assert remote_ref.actor_class_name == 'Greeter'
+    assert remote_ref.is_alive()
+
+
+def test_unknown_urn_returns_none(server):
+    assert RemoteNode(server.address).get_by_urn('urn:uuid:missing') is None
+
+
+def test_get_by_class_name(server, actor_ref):
+    refs = RemoteNode(server.address).get_by_class_name('Greeter')
+
+    assert [ref.actor_urn for ref in refs] == [actor_ref.actor_urn]
+
+
+def test_tell_and_ask(remote_ref, actor_ref):
+    remote_ref.tell('one')
+    assert remote_ref.ask('two', timeout=5) == 'two'
+    assert actor_ref.proxy().received.get(timeout=5) == ['one', 'two']
+
+
+def test_proxy_calls_and_attributes(remote_ref):
+    proxy = remote_ref.proxy()
+
+    assert proxy.greet('world').get(timeout=5) == 'hello world'
+    assert proxy.greeting.get(timeout=5) == 'hello'
+    proxy.greeting = 'hi'
+    assert proxy.greet('world').get(timeout=5) == 'hi world'
+    assert proxy.counter.add(2).get(timeout=5) == 2
+    assert proxy.counter.count.get(timeout=5) == 2
+
+
+def test_many_actors_share_one_connection(server):
+    refs = [Greeter.start() for _ in range(5)]
+    try:
+        node = RemoteNode(server.address)
+        remotes = [node.get_by_urn(ref.actor_urn) for ref in refs]
+        futures = [remote.proxy().greet(i) for i, remote in enumerate(remotes)]
+
+        assert get_all(futures, timeout=5) == [f'hello {i}' for i in range(5)]
+        assert len({remote.actor_inbox.channel.connection for remote in remotes}) == 1
+    finally:
+        for ref in refs:
+            ref.stop()
+
+
+def test_unpicklable_reply_raises_remote_error(remote_ref):
+    with pytest.raises(RemoteError):
+        remote_ref.proxy().event().get(timeout=5)
+
+
+def test_undecodable_reply_fails_only_its_future(remote_ref):
+    proxy = remote_ref.proxy()
+    with pytest.raises(RemoteError):
+        proxy.unloadable().get(timeout=5)
+
+    assert proxy.greet('again').get(timeout=5) == 'hello again'
+    assert remote_ref.is_alive()
+
+
+def test_undecodable_request_gets_an_error_reply(remote_ref, actor_ref):
+    remote_ref.tell(Unloadable())
+    with pytest.raises(RemoteError):
+        remote_ref.ask(Unloadable(), timeout=5)
+
+    assert remote_ref.ask('ok', timeout=5) == 'ok'
+    assert actor_ref.proxy().received.get(timeout=5) == ['ok']
+
+
+def test_stop_through_remote_ref(remote_ref, actor_ref):
+    assert remote_ref.stop(timeout=5) is True
+
+    assert not remote_ref.is_alive()
+    actor_ref.actor_stopped.wait(5)
+    assert not actor_ref.is_alive()
+    with pytest.raises(ActorDeadError):
+        remote_ref.tell('late')
+
+
+def test_ask_dead_actor_marks_ref_dead(remote_ref, actor_ref):
+    actor_ref.stop()
+
+    with pytest.raises(ActorDeadError):
+        remote_ref.ask('hello', timeout=5)
+    assert not remote_ref.is_alive()
+
+
+def test_server_stop_fails_pending_asks(server, remote_ref, actor_ref):
+    future = remote_ref.proxy().sleep(0.5)
+
+    server.stop()
+    with pytest.raises(ActorDeadError):
+        future.get(timeout=5)
+    assert not remote_ref.is_alive()
+
+
+def test_reconnects_after_connection_closed(server, remote_ref, actor_ref):
+    _get_connection(server.address).close()
+    assert not remote_ref.is_alive()
+
+    ref = RemoteNode(server.address).get_by_urn(actor_ref.actor_urn)
+    assert ref.proxy().greet('again').get(timeout=5) == 'hello again'
+
+
+class Bounded(ThreadingActor):
+    inbox_capacity = 1
+
+    def __init__(self, gate, busy):
+        super().__init__()
+        self.gate = gate
+        self.busy = busy
+
+    def on_receive(self, message):
+        self.busy.set()
+        self.gate.wait(5)
+        return message
+
+
+@pytest.mark.parametrize('overflow', ['raise', 'block'])
+def test_full_inbox_does_not_break_the_connection(server, actor_ref, overflow):
+    gate, busy = threading.Event(), threading.Event()
+    bounded_class = type('Bounded', (Bounded,), {'inbox_overflow': overflow})
+    bounded = bounded_class.start(gate, busy)
+    try:
+        node = RemoteNode(server.address)
+        remote = node.get_by_urn(bounded.actor_urn)
+        other = node.get_by_urn(actor_ref.actor_urn)
+        first = remote.ask('first', block=False)
+        # 等 actor 拿走第一封, 信箱再放一封就满了.
+        assert busy.wait(5)
+        remote.tell('fills the inbox')
+        remote.tell('dropped')
+
+        with pytest.raises(MailboxFull):
+            remote.ask('rejected', timeout=5)
+        assert other.is_alive()
+        assert other.ask('still served', timeout=5) == 'still served'
+
+        gate.set()
+        assert first.get(timeout=5) == 'first'
+        assert remote.ask('after', timeout=5) == 'after'
+    finally:
+        gate.set()
+        bounded.stop()
+
+
+def test_request_timeout_forgets_the_future(server):
+    connection = _get_connection(server.address)
+    send = connection.send
+    connection.send = lambda head, body: None
+    try:
+        with pytest.raises(Timeout):
+            connection.request('lookup', None, timeout=0.01)
+    finally:
+        connection.send = send
+    assert connection._requests == {}
@@ -0,0 +1,204 @@
+import threading
+
+import pytest
+from pykka import ActorDeadError
+
+from ..actor_register import ActorRegistry
+from ..routing import ConsistentHash, Router, RoutingStrategy, SmallestMailbox
+from ..threading import ThreadingActor
+
+
+class Worker(ThreadingActor):
+    def __init__(self, gate=None):
+        super().__init__()
+        self.gate = gate
+
+    def whoami(self, key=None):
+        return self.actor_urn
+
+    def wait(self):
+        self.gate.wait(5)
+
+    def on_receive(self, message):
+        return self.actor_urn
+
+
+@pytest.fixture
+def stop_all():
+    yield
+    ActorRegistry.stop_all()
+
+
+def urns(router):
+    return [routee.actor_urn for routee in router.routees]
+
+
+def test_round_robin(stop_all):
+    router = Router.start(Worker, 3)
+
+    answers = [router.ask("who", timeout=5) for _ in range(6)]
+
+    assert answers == urns(router) * 2
+
+
+def test_router_proxy_routes_method_calls(stop_all):
+    router = Router.start(Worker, 3)
+    proxy = router.proxy()
+
+    answers = [proxy.whoami().get(timeout=5) for _ in range(3)]
+
+    assert answers == urns(router)
+
+
+def test_random_uses_all_routees(stop_all):
+    router = Router.start(Worker, 3, strategy='random')
+
+    answers = {router.ask("who", timeout=5) for _ in range(100)}
+
+    assert answers == set(urns(router))
+
+
+def test_smallest_mailbox_skips_a_busy_actor(stop_all):
+    gate = threading.Event()
+    router = Router.start(Worker, 2, gate, strategy=SmallestMailbox())
+    busy, idle = router.routees
+    busy.proxy().wait()
+    for _ in range(3):
+        busy.tell("queued")
+
+    answers = [router.ask("who", timeout=5) for _ in range(4)]
+    gate.set()
+
+    assert answers == [idle.actor_urn] * 4
+
+
+def test_consistent_hash_sends_the_same_key_to_the_same_actor(stop_all):
+    router = Router.start(Worker, 5, strategy='consistent_hash')
+    proxy = router.proxy()
+
+    first = [proxy.whoami(key).get(timeout=5) for key in range(20)]
+    second = [proxy.whoami(key).get(timeout=5) for key in range(20)]
+
+    assert first == second
+    assert len(set(first)) > 1
+
+
+def test_consistent_hash_only_moves_keys_of_the_removed_actor(stop_all):
+    strategy = ConsistentHash(key=lambda message: message)
+    router = Router.start(Worker, 4, strategy=strategy)
+    before = {key: router.ask(key, timeout=5) for key in range(200)}
+    removed = router.routees[0]
+
+    removed.stop()
+    after = {key: router.ask(key, timeout=5) for key in range(200)}
+
+    for key, urn in before.items():
+        if urn != removed.actor_urn:
+            assert after[key] == urn
+    assert removed.actor_urn not in after.values()
+
+
+def test_broadcast_ask_returns_all_answers(stop_all):
+    router = Router.start(Worker, 3, strategy='broadcast')
+
+    assert router.ask("who", timeout=5) == urns(router)
+    assert router.proxy().whoami().get(timeout=5) == urns(router)
+
+
+def test_stopped_routees_are_removed(stop_all):
+    router = Router.start(Worker, 3)
+    router.routees[1].stop()
+
+    answers = {router.ask("who", timeout=5) for _ in range(6)}
+
+    assert len(router.routees) == 2
+    assert answers == set(urns(router))
+
+
+def test_stop_stops_all_routees():
+    router = Router.start(Worker, 3)
+    routees = router.routees
+
+    assert router.stop(timeout=5) is True
+    assert not any(routee.is_alive() for routee in routees)
+    assert not router.is_alive()
+    with pytest.raises(ActorDeadError):
+        router.tell("anyone")
+
+
+def test_stop_with_an_already_stopped_routee():
+    router = Router.start(Worker, 3)
+    first = router.routees[0]
+    assert first.stop(timeout=5) is True
+
+    assert router.stop(timeout=5) is True
+    assert not any(routee.is_alive() for routee in router.routees)
+
+
+def test_stop_without_routees_left():
+    router = Router.start(Worker, 2)
+    for routee in router.routees:
+        routee.stop(timeout=5)
+    router._remove_dead()
+    assert router.routees == []
+
+    assert router.stop(timeout=5) is True
+    assert router.stop(block=False).get(timeout=5) is True
+    with pytest.raises(ActorDeadError):
+        router.ask("who", timeout=5)
+
+
+def test_custom_strategy(stop_all):
+    class Last(RoutingStrategy):
+        def select(self, message, routees):
+            return routees[-1]
+
+    router = Router.start(Worker, 3, strategy=Last())
+
+    assert router.ask("who", timeout=5) == urns(router)[-1]
+
+
+def test_consistent_hash_rejects_keys_without_a_stable_repr(stop_all):
+    router = Router.start(Worker, 3, strategy='consistent_hash')
+
+    with pytest.raises(TypeError):
+        router.proxy().whoami(object())
+    assert router.proxy().whoami(("a", 1, None)).get(timeout=5) in urns(router)
+
+
+def test_consistent_hash_custom_key_for_proxy_calls(stop_all):
+    strategy = ConsistentHash(key=lambda message: message.args[0]["id"])
+    router = Router.start(Worker, 5, strategy=strategy)
+    proxy = router.proxy()
+
+    first = [proxy.whoami({"id": i}).get(timeout=5) for i in range(20)]
+
+    assert first == [proxy.whoami({"id": i}).get(timeout=5) for i in range(20)]
+    assert len(set(first)) > 1
+
+
+def test_custom_strategy_sees_proxy_calls(stop_all):
+    class ByMethod(RoutingStrategy):
+        def select(self, message, routees):
+            return routees[0] if message.attr_path == ("whoami",) else routees[-1]
+
+    router = Router.start(Worker, 3, strategy=ByMethod())
+
+    assert router.proxy().whoami().get(timeout=5) == urns(router)[0]
+
+
+def test_nested_routers_report_their_depth(stop_all):
+    gate = threading.Event()
+    inner = [Router.start(Worker, 2, gate) for _ in range(2)]
+    outer = Router(inner, strategy='smallest_mailbox')
+    for routee in inner[0].routees:
+        routee.proxy().wait()
+        routee.tell("queued")
+
+    assert inner[0].actor_inbox.qsize() >= 2
+    assert outer.ask("who", timeout=5) in urns(inner[1])
+
+    gate.set()
+    assert outer.stop(timeout=5) is True
+    assert inner[0].actor_stopped.wait(5)
+    assert inner[0].actor_stopped.is_set()
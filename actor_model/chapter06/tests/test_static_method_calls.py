@@ -1,13 +1,11 @@
 import threading
 
 import pytest
-from ..threading import ThreadingActor
-from ..threading import ThreadingFuture
 
 
 @pytest.fixture(scope="module")
-def actor_class():
-    class ActorA(ThreadingActor):
+def actor_class(runtime):
+    class ActorA(runtime.actor_class):
         cat = "dog"
 
         def __init__(self, events):
@@ -55,7 +53,7 @@ def events():
 def proxy(actor_class, events):
     proxy = actor_class.start(events).proxy()
     yield proxy
-    proxy.stop()
+    proxy.actor_ref.stop()
 
 
 def test_functional_method_call_returns_correct_value(proxy):
@@ -65,13 +63,13 @@ def test_functional_method_call_returns_correct_value(proxy):
 
 # 可观察
 # fixme 访问方法 返回的future.
-def test_side_effect_of_method_call_is_observable(proxy):
+def test_side_effect_of_method_call_is_observable(runtime, proxy):
     assert proxy.cat.get() == "dog"
     # set cat {'callable': True, 'traversable': False}
-    # ThreadingFuture; actor_ref.ask()
+    # runtime.future_class; actor_ref.ask()
     future = proxy.set_cat("eagle")
     assert future.get() is None
-    assert isinstance(proxy.cat, ThreadingFuture)
+    assert isinstance(proxy.cat, runtime.future_class)
     assert proxy.cat.get() == "eagle"
 
 
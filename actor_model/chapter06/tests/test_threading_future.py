@@ -0,0 +1,92 @@
+import queue
+import sys
+import threading
+
+import pytest
+
+from ..exceptions import Timeout
+from ..threading import ThreadingFuture
+
+
+@pytest.fixture
+def future():
+    return ThreadingFuture()
+
+
+def test_get_returns_the_value_set(future):
+    future.set("value")
+
+    assert future.get(timeout=0) == "value"
+    assert future.get() == "value"
+
+
+def test_get_times_out(future):
+    with pytest.raises(Timeout):
+        future.get(timeout=0.01)
+
+
+def test_set_exception_is_reraised_by_get(future):
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        future.set_exception(sys.exc_info())
+
+    with pytest.raises(ValueError):
+        future.get(timeout=0)
+    with pytest.raises(ValueError):
+        future.get(timeout=0)
+
+
+def test_set_twice_fails(future):
+    future.set(1)
+
+    with pytest.raises(queue.Full):
+        future.set(2)
+    with pytest.raises(queue.Full):
+        future.set_exception((ValueError, ValueError(), None))
+
+
+def test_all_waiting_threads_are_woken_up(future):
+    results = []
+
+    def wait():
+        results.append(future.get(timeout=5))
+
+    threads = [threading.Thread(target=wait) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    future.set("done")
+    for thread in threads:
+        thread.join()
+
+    assert results == ["done"] * 5
+
+
+def test_future_has_no_instance_dict(future):
+    assert not hasattr(future, "__dict__")
+
+
+def test_concurrent_set_keeps_the_first_value():
+    for _ in range(200):
+        future = ThreadingFuture()
+        barrier = threading.Barrier(4)
+        errors = []
+
+        def set_value(value):
+            barrier.wait()
+            try:
+                if value % 2:
+                    future.set(value)
+                else:
+                    future.set_exception((ValueError, ValueError(value), None))
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=set_value, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(errors) == 3
+        assert all(isinstance(error, queue.Full) for error in errors)
@@ -16,44 +16,79 @@ from typing import Any, Optional
 from .exceptions import Timeout
 from .future import Future
 from .actor import Actor
+from .inbox import BoundedInbox
 from pykka import _compat
 
 
+# set/set_exception 检查 _done 和设置结果要一起做, 两个线程同时 set 时后一个抛 queue.Full.
+# 所有 future 共用一把: 拿锁的时间很短, 不用每个 future 多创建一把锁.
+_set_lock = threading.Lock()
+
+
 @dataclass
 class ThreadingFutureResult:
     values: Optional[Any] = None
 
 
 class ThreadingFuture(Future):
+    """
+    每次 ask() 都会创建一个 future, 所以要尽量轻:
+    没有 ``queue.Queue`` (三个 Condition + deque) 和结果字典,
+    只有一把锁加上 value/exc_info 两个槽位.
+
+    锁在创建时就锁住, set() 时释放; get() 拿到锁马上再释放,
+    其他等待的线程也能依次拿到.
+    """
+
+    __slots__ = ['_lock', '_done', '_value', '_exc_info']
+
+    def _is_done(self):
+        return self._done
+
     def __init__(self):
         super(ThreadingFuture, self).__init__()
-        self._queue = _compat.queue.Queue(maxsize=1)
-        self._data = None
+        self._lock = threading.Lock()
+        self._lock.acquire()  # 还没有结果
+        self._done = False
+        self._value = None
+        self._exc_info = None
 
     def get(self, timeout=None):
-        try:
-            # get_hook 没有捆绑函数  Raise NotImplementedError
+        if self._get_hook is not None:
+            # 绑定了 get_hook (例如 ActorRef.stop 的结果转换)
             return super(ThreadingFuture, self).get(timeout=timeout)
-        except NotImplementedError:
-            # 返回NotImplementedError错误的时候
-            pass
-        # 返回NotImplementedError错误的时候 会执行下列代码...
-        try:
-            if self._data is None:
-                self._data = self._queue.get(True, timeout)
-            if 'exc_info' in self._data:
-                _compat.reraise(*self._data['exc_info'])
-            else:
-                return self._data['value']
-        except _compat.queue.Empty:
-            raise Timeout('{} seconds'.format(timeout))
+
+        if not self._done:
+            if timeout is None:
+                self._lock.acquire()
+            elif not self._lock.acquire(timeout=max(timeout, 0)):
+                raise Timeout('{} seconds'.format(timeout))
+            self._lock.release()
+
+        if self._exc_info is not None:
+            _compat.reraise(*self._exc_info)
+        return self._value
 
     def set(self, value=None):
-        self._queue.put({'value': value}, block=False)
+        with _set_lock:
+            if self._done:
+                # 和原来 Queue(maxsize=1) 一样, 只能 set 一次.
+                raise queue.Full
+            self._value = value
+            self._done = True
+        self._lock.release()
+        self._run_callbacks()
 
     def set_exception(self, exc_info=None):
         assert exc_info is None or len(exc_info) == 3
-        self._queue.put({'exc_info': exc_info or sys.exc_info()})
+        exc_info = exc_info or sys.exc_info()
+        with _set_lock:
+            if self._done:
+                raise queue.Full
+            self._exc_info = exc_info
+            self._done = True
+        self._lock.release()
+        self._run_callbacks()
 
 
 # Threading Actor
@@ -61,9 +96,25 @@ class ThreadingActor(Actor):
     # 非守护进程
     use_daemon_thread = False
 
-    @staticmethod
-    def _create_actor_inbox():
-        return queue.Queue()
+    #: 信箱的类型, 按 actor 类选择. 例如 :class:`inbox.MPSCInbox`.
+    inbox_class = queue.Queue
+
+    #: 信箱容量, None 表示不限. 设置以后使用 :class:`inbox.BoundedInbox`.
+    inbox_capacity = None
+
+    #: 信箱满了的处理策略, 见 :data:`inbox.OVERFLOW_POLICIES`.
+    inbox_overflow = 'block'
+
+    #: ``block`` 策略下 tell/ask 最多等待的秒数, None 表示一直等.
+    inbox_put_timeout = None
+
+    @classmethod
+    def _create_actor_inbox(cls):
+        if cls.inbox_capacity is not None:
+            return BoundedInbox(
+                cls.inbox_capacity, cls.inbox_overflow, cls.inbox_put_timeout
+            )
+        return cls.inbox_class()
 
     @staticmethod
     def _create_future():
@@ -0,0 +1,274 @@
+"""
+进程 actor(:mod:`process`)收发消息用的通道.
+
+:class:`Channel` 把消息 pickle 以后整个写进 Pipe: 大的 payload 要复制好几次
+(pickle 一次, 写管道, 读管道, unpickle 再一次).
+
+:class:`SharedMemoryChannel` 用 pickle protocol 5 的 out-of-band buffer,
+大于 ``threshold`` 的 buffer 放进 ``multiprocessing.shared_memory``, 管道里
+只传段的名字::
+
+    发送方: pickle(buffer_callback) --> 大 buffer 复制进共享内存段 --> 'S' 帧(段名) + 数据帧
+    接收方: 打开段 --> pickle.loads(buffers=[段的 memoryview]) --> 处理完 release --> 'A' 帧(ack)
+    发送方: 收到 ack --> unlink 段
+
+- ``pickle.PickleBuffer`` 和 NumPy 数组在接收方直接引用共享内存, 不复制.
+- ``bytearray`` 和 ``bytes`` 在接收方从共享内存复制一次(它们必须拥有自己的内存).
+  它们只在消息的前几层(参数, 列表, 字典)里被找出来, 更深的照常写在数据里.
+- 段属于发送方, 收到 ack 以后 unlink; 接收方处理完(或者还被引用着)
+  的映射在引用都没了以后再 close. 通道关闭时还没 ack 的段全部 unlink.
+
+帧的第一个字节区分类型: codec(pickle)数据总是以 ``\\x80`` 开头, 控制帧用 ``S`` / ``A``.
+"""
+import pickle
+import threading
+import time
+from multiprocessing import shared_memory
+
+from .codec import default_codec
+from .messages import ProxyBatchCall, ProxyCall, ProxySetAttr
+
+__all__ = ['Channel', 'SharedMemoryChannel']
+
+_SEGMENTS = b'S'
+_ACK = b'A'
+
+# 在消息里找大 bytes 的最大深度: 帧 -> 消息 -> args -> 参数 -> 列表的元素.
+_MAX_WRAP_DEPTH = 5
+
+
+class Channel:
+    """
+    ``multiprocessing.Pipe`` 的一端, 收发 codec 编码过的对象.
+    Connection.send 不是线程安全的, 发送拿一把锁.
+
+    :param codec: :class:`codec.Codec`, 默认 :data:`codec.default_codec`
+
+    ``recv()`` 返回 ``(obj, lease)``, obj 用完以后调用 ``release(lease)``;
+    这个类的 lease 总是 None.
+    """
+
+    def __init__(self, conn, codec=None):
+        self.conn = conn
+        self.codec = codec or default_codec
+        self._send_lock = threading.Lock()
+
+    def dumps(self, obj):
+        return self.codec.dumps(obj)
+
+    def send(self, obj):
+        # 先 pickle 再拿锁, pickle 失败不会在管道里留下半条消息.
+        data = self.dumps(obj)
+        with self._send_lock:
+            self.conn.send_bytes(data)
+
+    def recv(self):
+        return self.codec.loads(self.conn.recv_bytes()), None
+
+    def release(self, lease):
+        pass
+
+    def poll(self, timeout):
+        return self.conn.poll(timeout)
+
+    def close(self, timeout=0):
+        """:param timeout: 等对方 ack 的秒数(有共享内存段的通道用)"""
+        self.conn.close()
+
+
+class _OutOfBand:
+    """
+    大的 bytes/bytearray: pickle 成 out-of-band buffer,
+    接收方得到的还是原来的类型.
+    """
+
+    __slots__ = ['data']
+
+    def __init__(self, data):
+        self.data = data
+
+    def __reduce_ex__(self, protocol):
+        return type(self.data), (pickle.PickleBuffer(self.data),)
+
+
+def _wrap_large_bytes(obj, threshold, depth=0):
+    """
+    pickle 总是把 bytes/bytearray 写在数据里(reducer_override 也管不到它们),
+    先把前几层里大的包成 :class:`_OutOfBand`. 没有变化的容器原样返回.
+    """
+    if depth > _MAX_WRAP_DEPTH:
+        return obj
+    obj_type = type(obj)
+    if obj_type is bytes or obj_type is bytearray:
+        return _OutOfBand(obj) if len(obj) >= threshold else obj
+    depth += 1
+    if obj_type is tuple or obj_type is list:
+        items = [_wrap_large_bytes(item, threshold, depth) for item in obj]
+        if all(a is b for a, b in zip(items, obj)):
+            return obj
+        return obj_type(items)
+    if obj_type is dict:
+        items = {key: _wrap_large_bytes(value, threshold, depth) for key, value in obj.items()}
+        if all(items[key] is value for key, value in obj.items()):
+            return obj
+        return items
+    if obj_type is ProxyCall:
+        args = _wrap_large_bytes(obj.args, threshold, depth)
+        kwargs = _wrap_large_bytes(obj.kwargs, threshold, depth)
+        if args is obj.args and kwargs is obj.kwargs:
+            return obj
+        return ProxyCall(obj.attr_path, args, kwargs)
+    if obj_type is ProxySetAttr:
+        value = _wrap_large_bytes(obj.value, threshold, depth)
+        return obj if value is obj.value else ProxySetAttr(obj.attr_path, value)
+    if obj_type is ProxyBatchCall:
+        calls = _wrap_large_bytes(obj.calls, threshold, depth)
+        return obj if calls is obj.calls else ProxyBatchCall(calls)
+    return obj
+
+
+class _Lease:
+    """接收方收到的一条消息用到的共享内存段."""
+
+    __slots__ = ['names', 'segments']
+
+    def __init__(self, names, segments):
+        self.names = names
+        # [(SharedMemory, memoryview), ...]
+        self.segments = segments
+
+
+class SharedMemoryChannel(Channel):
+    """
+    大 buffer 走共享内存的通道.
+
+    :param threshold: 大于等于这个字节数的 buffer 放进共享内存
+    :param codec: 同 :class:`Channel`, pickle 协议要是 5
+
+    :attr:`stats`: ``segments`` 创建的段数, ``shared_bytes`` 经共享内存传的字节数,
+    ``acked`` 收到 ack 回收的段数.
+    """
+
+    def __init__(self, conn, threshold=64 * 1024, codec=None):
+        super().__init__(conn, codec)
+        self.threshold = threshold
+        self.stats = {'segments': 0, 'shared_bytes': 0, 'acked': 0}
+        # 发出去还没 ack 的段: 段名 -> SharedMemory(已经 close, 只等 unlink)
+        self._owned = {}
+        self._owned_lock = threading.Condition()
+        # 收到的段, 还被消息里的对象引用着, 不能 close, 以后再试.
+        self._attached = []
+
+    def dumps(self, obj):
+        return self._dumps(obj)[0]
+
+    def _dumps(self, obj):
+        buffers = []
+
+        def buffer_callback(buffer):
+            try:
+                nbytes = buffer.raw().nbytes
+            except BufferError:
+                # 不连续的 buffer 只能写在数据里.
+                return True
+            if nbytes < self.threshold or nbytes == 0:
+                return True
+            buffers.append(buffer)
+            return False
+
+        data = self.codec.dumps(
+            _wrap_large_bytes(obj, self.threshold), buffer_callback=buffer_callback
+        )
+        return data, buffers
+
+    def send(self, obj):
+        data, buffers = self._dumps(obj)
+        segments = [self._share(buffer) for buffer in buffers]
+        with self._send_lock:
+            if segments:
+                self.conn.send_bytes(_SEGMENTS + pickle.dumps(segments))
+            self.conn.send_bytes(data)
+
+    def _share(self, buffer):
+        """把 buffer 复制进新的共享内存段, 返回 (段名, 字节数)."""
+        raw = buffer.raw()
+        segment = shared_memory.SharedMemory(create=True, size=raw.nbytes)
+        segment.buf[:raw.nbytes] = raw
+        # 发送方不再需要映射, 段本身等 ack 以后再 unlink.
+        segment.close()
+        with self._owned_lock:
+            self._owned[segment.name] = segment
+        self.stats['segments'] += 1
+        self.stats['shared_bytes'] += raw.nbytes
+        return segment.name, raw.nbytes
+
+    def recv(self):
+        while True:
+            frame = self.conn.recv_bytes()
+            kind = frame[:1]
+            if kind == _ACK:
+                self._unlink(pickle.loads(frame[1:]), acked=True)
+            elif kind == _SEGMENTS:
+                return self._recv_shared(pickle.loads(frame[1:]))
+            else:
+                return self.codec.loads(frame), None
+
+    def _recv_shared(self, names_and_sizes):
+        segments = []
+        for name, nbytes in names_and_sizes:
+            segment = shared_memory.SharedMemory(name=name)
+            segments.append((segment, segment.buf[:nbytes]))
+        data = self.conn.recv_bytes()
+        obj = self.codec.loads(data, buffers=[view for _, view in segments])
+        return obj, _Lease([name for name, _ in names_and_sizes], segments)
+
+    def release(self, lease):
+        """消息处理完了: 尽量 close 映射, 通知发送方回收."""
+        if lease is None:
+            return
+        self._attached.extend(lease.segments)
+        lease.segments = []
+        self._close_attached()
+        try:
+            with self._send_lock:
+                self.conn.send_bytes(_ACK + pickle.dumps(lease.names))
+        except OSError:
+            # 发送方已经没了, 它关闭通道的时候会 unlink.
+            pass
+
+    def _close_attached(self):
+        still_used = []
+        for segment, view in self._attached:
+            try:
+                view.release()
+                segment.close()
+            except BufferError:
+                # 消息里的对象(例如 memoryview, NumPy 数组)还引用着这块内存.
+                still_used.append((segment, view))
+        self._attached = still_used
+
+    def _unlink(self, names, acked=False):
+        with self._owned_lock:
+            segments = [self._owned.pop(name, None) for name in names]
+            if not self._owned:
+                self._owned_lock.notify_all()
+        for segment in segments:
+            if segment is not None:
+                if acked:
+                    self.stats['acked'] += 1
+                try:
+                    segment.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def close(self, timeout=0):
+        """
+        等最多 timeout 秒, 让对方 ack 还没回收的段, 然后全部 unlink.
+        """
+        deadline = time.monotonic() + timeout
+        with self._owned_lock:
+            while self._owned and time.monotonic() < deadline:
+                self._owned_lock.wait(deadline - time.monotonic())
+        self._unlink(list(self._owned))
+        self._close_attached()
+        super().close()